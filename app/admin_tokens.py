@@ -0,0 +1,121 @@
+"""Signed, expiring admin session tokens."""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class AdminTokens:
+    """
+    Issues and verifies stateless admin session tokens.
+
+    A token is `<payload>.<signature>`: base64url JSON claims (sub, iat,
+    exp, jti) and their HMAC-SHA256. Verifying one is a hash and a dict
+    lookup, with no database or bcrypt work, so every admin event and API
+    call can check it. Logout revokes the token's jti; revocations live in
+    memory until the token would have expired anyway.
+
+    A token issued with a `scope` (e.g. a short-lived ticket for one
+    endpoint) verifies only when that scope is asked for, so it cannot be
+    used as a general session token.
+    """
+
+    def __init__(
+        self,
+        secret: bytes,
+        ttl: int = config.ADMIN_TOKEN_TTL,
+        max_revoked: int = 1000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._secret = secret
+        self.ttl = ttl
+        self.max_revoked = max_revoked
+        self._clock = clock
+        self._lock = threading.Lock()
+        # jti -> exp
+        self._revoked: Dict[str, int] = {}
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, username: str, ttl: Optional[int] = None, scope: Optional[str] = None) -> str:
+        """Create a token for an authenticated admin, optionally limited to `scope`."""
+        now = int(self._clock())
+        claims = {"sub": username, "iat": now, "exp": now + (ttl or self.ttl), "jti": secrets.token_urlsafe(9)}
+        if scope is not None:
+            claims["scope"] = scope
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token: Optional[str], scope: Optional[str] = None) -> Optional[dict]:
+        """
+        Claims of a valid token, or None if it is malformed, forged,
+        expired, revoked or issued for a different scope.
+        """
+        # Tokens are base64url; anything else cannot be signed or compared
+        if not token or not token.isascii():
+            return None
+        payload, _, signature = token.partition(".")
+        if not signature or not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if claims.get("exp", 0) <= self._clock() or claims.get("jti") in self._revoked:
+            return None
+        if claims.get("scope") != scope:
+            return None
+        return claims
+
+    def revoke(self, token: Optional[str]) -> bool:
+        """
+        Revoke a token (logout).
+
+        Returns:
+            True if the token was valid and is now revoked
+        """
+        claims = self.verify(token)
+        if claims is None:
+            return False
+        now = self._clock()
+        with self._lock:
+            for jti, exp in list(self._revoked.items()):
+                if exp <= now:
+                    del self._revoked[jti]
+            if len(self._revoked) >= self.max_revoked:
+                # Drop the revocation closest to expiring on its own
+                del self._revoked[min(self._revoked, key=self._revoked.get)]
+            self._revoked[claims["jti"]] = claims["exp"]
+        return True
+
+
+def _secret() -> bytes:
+    if config.ADMIN_TOKEN_SECRET:
+        return config.ADMIN_TOKEN_SECRET.encode("utf-8")
+    if config.APP_ENV == "production":
+        logger.warning(
+            "ADMIN_TOKEN_SECRET is not set: admin sessions end on restart and are not shared between workers"
+        )
+    return secrets.token_bytes(32)
+
+
+# Process-wide token issuer/verifier
+admin_tokens = AdminTokens(_secret())
@@ -1,10 +1,111 @@
 """FastAPI route handlers."""
-from typing import Optional
-from fastapi import APIRouter, Query
+import asyncio
+import json
+import time
+from typing import AsyncIterator, List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBasic, HTTPBasicCredentials, HTTPBearer
+
+from app import server_timing
+from app.admin_tokens import admin_tokens
+from app.metrics import CONTENT_TYPE, REGISTRY, submit_timings
+from app.password_verifier import AuthRejectedError, AuthThrottledError
+from app.profiler import MAX_SECONDS, ProfilerBusyError, collapse, profiler
+from app.query_stats import query_stats
+from app.change_feed import change_feed
+from app.records import FeedbackFilters, FeedbackRecord
+from app.services import AuthService, CourierService, DashboardService, DeadLetterService, FeedbackService
+from app.startup import readiness
+from app.sync import flush_scheduler, retry_scheduler
+from config import config
+
+_basic_auth = HTTPBasic(auto_error=False)
+_bearer_auth = HTTPBearer(auto_error=False)
+
+
+async def require_admin(
+    request: Request,
+    bearer: Optional[HTTPAuthorizationCredentials] = Depends(_bearer_auth),
+    basic: Optional[HTTPBasicCredentials] = Depends(_basic_auth),
+) -> str:
+    """
+    Authenticate an admin by session token (Bearer) or HTTP Basic.
+
+    Tokens from POST /api/admin/token are checked without touching the
+    database; Basic credentials cost a bcrypt check on the limited
+    password verifier pool.
+    """
+    if bearer is not None:
+        claims = admin_tokens.verify(bearer.credentials)
+        if claims is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired admin token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return claims["sub"]
+
+    admin = None
+    if basic is not None:
+        try:
+            admin = await AuthService.authenticate_async(
+                basic.username,
+                basic.password,
+                client_ip=request.client.host if request.client else "",
+            )
+        except AuthRejectedError as e:
+            raise HTTPException(
+                status_code=(
+                    status.HTTP_429_TOO_MANY_REQUESTS if isinstance(e, AuthThrottledError)
+                    else status.HTTP_503_SERVICE_UNAVAILABLE
+                ),
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)},
+            )
+    if admin is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin credentials",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    return admin.username
+
+
+# Stream tickets: long enough to open the stream, short enough that one
+# leaked through a URL in an access log is soon useless
+STREAM_TICKET_TTL = 60
+STREAM_TICKET_SCOPE = "feedback_stream"
+
+
+async def require_stream_access(
+    request: Request,
+    ticket: Optional[str] = Query(None),
+    bearer: Optional[HTTPAuthorizationCredentials] = Depends(_bearer_auth),
+    basic: Optional[HTTPBasicCredentials] = Depends(_basic_auth),
+) -> str:
+    """
+    Authenticate the feedback stream by ticket (?ticket=) or as require_admin.
+
+    A browser EventSource cannot send an Authorization header, so it
+    opens the stream with a ticket from POST /api/admin/feedback/stream/ticket.
+    """
+    if ticket is None:
+        return await require_admin(request, bearer, basic)
+    claims = admin_tokens.verify(ticket, scope=STREAM_TICKET_SCOPE)
+    if claims is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired stream ticket",
+        )
+    return claims["sub"]
 
-from app.services import FeedbackService, CourierService
 
 router = APIRouter(prefix="/api", tags=["api"])
+# Every admin route requires an admin (see require_admin)
+admin_router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+metrics_router = APIRouter(tags=["metrics"])
+health_router = APIRouter(tags=["health"])
 
 
 @router.post("/feedback")
@@ -13,13 +114,67 @@ async def create_feedback(feedback_data: dict):
     return FeedbackService.create_feedback(feedback_data)
 
 
-@router.get("/feedback/{feedback_id}")
+@router.post("/feedback/batch")
+async def create_feedback_batch(request: Request):
+    """
+    Create feedback entries flushed from a client-side offline queue.
+
+    The body is parsed regardless of Content-Type so browsers can post it as
+    text/plain and skip the CORS preflight. Items are either positional
+    queue entries or feedback dicts. Items from concurrent flushes are
+    coalesced into shared, concurrency-capped transactions.
+    """
+    body = await request.body()
+    try:
+        with server_timing.timed("validation"):
+            payload = json.loads(body)
+            items = payload["items"] if isinstance(payload, dict) else payload
+            if not isinstance(items, list):
+                raise TypeError("items must be a list")
+            # Before any per-item work, so oversized batches are cheap to reject
+            if len(items) > config.MAX_QUEUE_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Batch exceeds {config.MAX_QUEUE_SIZE} items"
+                )
+            records = [
+                FeedbackRecord.from_dict(item) if isinstance(item, dict)
+                else FeedbackRecord.from_queue_entry(item)
+                for item in items
+            ]
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid batch payload: {e}"
+        )
+
+    # Writes run on the shared flush scheduler, outside this request's
+    # context, so its DB time is reported here
+    with server_timing.timed("db"):
+        results = await flush_scheduler.submit(records)
+    return {"results": results}
+
+
+# Reads of stored feedback and of the sync status (which lists dead-lettered
+# submissions) are admin-only: feedback holds customers' comments whatever
+# their publish consent. They keep their /api paths; submitting stays public.
+@router.get("/sync/status", dependencies=[Depends(require_admin)])
+async def get_sync_status():
+    """Get offline queue flush and retry metrics and dead-lettered items."""
+    return {
+        "metrics": retry_scheduler.metrics(),
+        "flush": flush_scheduler.metrics(),
+        "dead_letters": DeadLetterService.list_dead_letters(),
+    }
+
+
+@router.get("/feedback/{feedback_id}", dependencies=[Depends(require_admin)])
 async def get_feedback(feedback_id: int):
     """Get feedback by ID."""
     return FeedbackService.get_feedback(feedback_id)
 
 
-@router.get("/feedback")
+@router.get("/feedback", dependencies=[Depends(require_admin)])
 async def list_feedback(courier_id: Optional[int] = Query(None)):
     """List feedback, optionally filtered by courier."""
     return FeedbackService.list_feedback(courier_id)
@@ -29,3 +184,171 @@ async def list_feedback(courier_id: Optional[int] = Query(None)):
 async def get_courier(courier_id: int):
     """Get courier information."""
     return CourierService.get_courier(courier_id)
+
+
+@admin_router.post("/token")
+async def issue_admin_token(admin: str = Depends(require_admin)):
+    """Exchange admin credentials for a signed session token."""
+    token = admin_tokens.issue(admin)
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "expires_in": admin_tokens.ttl,
+    }
+
+
+@admin_router.post("/logout")
+async def revoke_admin_token(
+    bearer: Optional[HTTPAuthorizationCredentials] = Depends(_bearer_auth),
+):
+    """Revoke the session token used for this request."""
+    return {"revoked": admin_tokens.revoke(bearer.credentials if bearer else None)}
+
+
+@admin_router.get("/latency")
+async def get_submit_latency(reset: bool = Query(False)):
+    """
+    Get per-stage submit latency histograms.
+
+    Stages are validation, queueing, db_write, commit, state_push and
+    total; each reports count, sum, mean, p50/p95/p99 (seconds) and
+    cumulative bucket counts. Pass reset=true to start a new window.
+    """
+    snapshot = submit_timings.snapshot()
+    if reset:
+        submit_timings.reset()
+    return {"stages": snapshot}
+
+
+@admin_router.get("/queries")
+async def get_query_stats(
+    limit: int = Query(10, ge=1, le=500),
+    sort: Literal["total", "max", "count", "mean", "rows"] = Query("total"),
+    reset: bool = Query(False),
+):
+    """
+    Get the top-N statements by fingerprint (literals stripped).
+
+    Each entry reports count, total/mean/max time (ms), rows, how many
+    executions were slow and the last slow execution's query plan. Pass
+    reset=true to start a new window.
+    """
+    report = query_stats.top(limit, sort)
+    if reset:
+        query_stats.reset()
+    return {"slow_query_ms": query_stats.slow_query_ms, "queries": report}
+
+
+@admin_router.post("/feedback/stream/ticket")
+async def issue_stream_ticket(admin: str = Depends(require_admin)):
+    """Issue a short-lived ticket that opens the feedback stream from a browser."""
+    return {
+        "ticket": admin_tokens.issue(admin, ttl=STREAM_TICKET_TTL, scope=STREAM_TICKET_SCOPE),
+        "expires_in": STREAM_TICKET_TTL,
+    }
+
+
+# On the public router so a ticket can stand in for the admin_router auth
+@router.get("/admin/feedback/stream", dependencies=[Depends(require_stream_access)])
+async def stream_feedback(
+    request: Request,
+    after_id: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Stream new feedback as server-sent events.
+
+    Each row is an `event: feedback` whose event id is the feedback id, so
+    a client that reconnects resumes after the last row it saw
+    (Last-Event-ID, or ?after_id= for EventSource). Without either, the
+    stream starts after the newest feedback. Rows are pushed as feedback
+    is written, with no polling; the stream ends after
+    DASHBOARD_LIVE_SECONDS and the client reconnects.
+
+    Browsers authenticate with ?ticket= (see issue_stream_ticket). A ticket
+    is only checked when the stream opens, so a browser reconnect needs a
+    fresh ticket: on `error`, close the EventSource and open a new one.
+    """
+    if last_event_id and last_event_id.isdigit():
+        after_id = int(last_event_id)
+    if after_id is None:
+        after_id = await asyncio.to_thread(DashboardService.high_water_id)
+    return StreamingResponse(
+        _feedback_events(request, after_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Idle seconds between SSE comments that keep proxies from closing the stream
+_KEEPALIVE_SECONDS = 15
+
+
+async def _feedback_events(request: Request, after_id: int) -> AsyncIterator[str]:
+    deadline = time.monotonic() + config.DASHBOARD_LIVE_SECONDS
+    filters = FeedbackFilters()
+    # Taken before the first read, so a write during it wakes the loop again
+    sequence = change_feed.sequence
+    changed = True
+    last_sent = time.monotonic()
+    yield "retry: 3000\n\n"
+    while time.monotonic() < deadline and not await request.is_disconnected():
+        while changed:
+            rows = await asyncio.to_thread(DashboardService.rows_since, filters, after_id)
+            for row in rows:
+                yield f"id: {row.id}\nevent: feedback\ndata: {json.dumps(row.to_dict())}\n\n"
+            if rows:
+                after_id = rows[-1].id
+                last_sent = time.monotonic()
+            changed = len(rows) == DashboardService.TAIL_BATCH
+        if time.monotonic() - last_sent >= _KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+        current = await DashboardService.wait_for_writes(sequence)
+        changed, sequence = current != sequence, current
+
+
+@admin_router.get("/profile", response_class=Response)
+async def get_profile(
+    seconds: float = Query(10, gt=0, le=MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    focus: List[str] = Query([]),
+    admin: str = Depends(require_admin),
+):
+    """
+    Sample the live process's stacks and return them as collapsed stacks.
+
+    focus narrows the profile to stacks through a function (e.g.
+    submit_feedback, load_feedback) or a preset ("api" for /api routes,
+    "states" for Reflex event handlers), rooted at that frame. The result
+    can be fed to flamegraph.pl or opened in speedscope.
+    """
+    try:
+        stacks, samples = await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000, focus)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    return Response(
+        content=collapse(stacks),
+        media_type="text/plain",
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{int(time.time())}.folded"',
+            "X-Profile-Samples": str(samples),
+        },
+    )
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Expose app, DB and queue metrics in the Prometheus text format."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@health_router.get("/ready")
+async def ready():
+    """Readiness probe: 200 once warmup has finished, 503 before."""
+    report = readiness.snapshot()
+    return JSONResponse(
+        report,
+        status_code=status.HTTP_200_OK if readiness.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
@@ -0,0 +1,68 @@
+"""
+Headless API server: the FastAPI app and routers without Reflex or the UI.
+
+Ingestion workers that only serve /api can run this instead of `reflex
+run`; nothing here imports Reflex, the pages or the Jazz provider.
+
+    python -m app.api_server --port 8001 --workers 4
+"""
+import argparse
+import logging
+import os
+import time
+
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+
+def create_api() -> FastAPI:
+    """Build the FastAPI app with its middleware and routers."""
+    from app import startup
+    from app.api_routes import admin_router, health_router, metrics_router, router
+    from app.metrics import MetricsMiddleware
+    from app.server_timing import ServerTimingMiddleware, TimedJSONResponse
+
+    api = FastAPI(default_response_class=TimedJSONResponse)
+    api.add_middleware(MetricsMiddleware)
+    api.add_middleware(ServerTimingMiddleware)
+
+    @api.on_event("startup")
+    async def on_startup():
+        """Check the schema, then warm up in the background (see /ready)."""
+        # Only init DB if not in test mode
+        if os.getenv("APP_ENV") != "testing":
+            await startup.start()
+
+    api.include_router(router)
+    api.include_router(health_router)
+    api.include_router(admin_router)
+    api.include_router(metrics_router)
+    return api
+
+
+def main(argv=None):
+    """Serve the API with uvicorn."""
+    parser = argparse.ArgumentParser(description="Run the feedback API without the Reflex UI.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        # Each worker process builds its own app from the factory
+        uvicorn.run(
+            "app.api_server:create_api", factory=True,
+            host=args.host, port=args.port, workers=args.workers,
+        )
+        return
+    api = create_api()
+    logger.info("API app built in %.0fms", (time.perf_counter() - start) * 1000)
+    uvicorn.run(api, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,13 @@
 """Main Reflex application."""
 import os
 import reflex as rx
-from fastapi import FastAPI
 from config import config
-from app.database import create_db_and_tables
-from app.api_routes import router
+from app.api_server import create_api
+from app.loop_monitor import loop_monitor
+from app.metrics import Gauge
 
-# Setup FastAPI
-api = FastAPI()
-
-
-@api.on_event("startup")
-def on_startup():
-    """Initialize database on startup."""
-    # Only init DB if not in test mode
-    if os.getenv("APP_ENV") != "testing":
-        create_db_and_tables()
-
-
-# Include API routes
-api.include_router(router)
+# Setup FastAPI (the same app `python -m app.api_server` serves on its own)
+api = create_api()
 
 # Only create Reflex app if not in testing mode
 if os.getenv("APP_ENV") != "testing":
@@ -27,6 +15,7 @@ if os.getenv("APP_ENV") != "testing":
     from app.pages.login import login_page
     from app.pages.admin_dashboard import dashboard_page
     from app.jazz import jazz_provider
+    from app.offline_queue import SCRIPT_SRC as OFFLINE_QUEUE_SRC
 
     # Create Reflex app
     app = rx.App(
@@ -71,10 +60,26 @@ if os.getenv("APP_ENV") != "testing":
             ]
             if config.USE_JAZZ_SYNC
             else []
+        )
+        + (
+            [
+                rx.script(src=OFFLINE_QUEUE_SRC),
+            ]
+            if config.ENABLE_OFFLINE_MODE
+            else []
         ),
         api_transformer=api,
     )
 
+    Gauge(
+        "reflex_active_sessions",
+        "Connected Reflex websocket sessions.",
+        fn=lambda: len(app.event_namespace.sid_to_token) if app.event_namespace else 0,
+    )
+
+    if config.LOOP_MONITOR_ENABLED:
+        app.register_lifespan_task(loop_monitor.lifespan)
+
     # Add pages
     if config.USE_JAZZ_SYNC:
         app.add_page(
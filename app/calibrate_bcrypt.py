@@ -0,0 +1,101 @@
+"""
+Pick a bcrypt cost for this machine.
+
+Benchmarks bcrypt verification at increasing costs and recommends the
+highest one whose median check time stays within the target:
+
+    python -m app.calibrate_bcrypt --target-ms 250 --env-file .env
+
+With --env-file the recommendation is saved as BCRYPT_ROUNDS; existing
+admin hashes are upgraded on their next successful login.
+"""
+import argparse
+import re
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import bcrypt
+
+# bcrypt's valid cost range; below 10 is too weak for production
+MIN_ROUNDS = 4
+MAX_ROUNDS = 16
+RECOMMENDED_MIN_ROUNDS = 10
+
+
+def benchmark(rounds: int, samples: int = 3) -> float:
+    """Median seconds to verify a password hashed at `rounds`."""
+    password = b"calibration-password"
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.checkpw(password, hashed)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target_ms: float,
+    min_rounds: int = MIN_ROUNDS,
+    max_rounds: int = MAX_ROUNDS,
+    samples: int = 3,
+) -> Dict:
+    """
+    Benchmark costs from min_rounds up until one exceeds the target.
+
+    Returns:
+        {"timings_ms": {rounds: median ms}, "recommended": rounds or None}
+    """
+    timings: Dict[int, float] = {}
+    recommended: Optional[int] = None
+    for rounds in range(min_rounds, max_rounds + 1):
+        elapsed_ms = benchmark(rounds, samples) * 1000
+        timings[rounds] = round(elapsed_ms, 1)
+        if elapsed_ms > target_ms:
+            break
+        recommended = rounds
+    return {"timings_ms": timings, "recommended": recommended}
+
+
+def save_rounds(env_file: Path, rounds: int):
+    """Set BCRYPT_ROUNDS in an env file, replacing any existing value."""
+    lines = env_file.read_text().splitlines() if env_file.exists() else []
+    setting = f"BCRYPT_ROUNDS={rounds}"
+    pattern = re.compile(r"^\s*BCRYPT_ROUNDS\s*=")
+    if any(pattern.match(line) for line in lines):
+        lines = [setting if pattern.match(line) else line for line in lines]
+    else:
+        lines.append(setting)
+    env_file.write_text("\n".join(lines) + "\n")
+
+
+def main(argv=None):
+    """Run the calibration and print (or save) the recommended cost."""
+    parser = argparse.ArgumentParser(description="Recommend a bcrypt cost for a target verification time.")
+    parser.add_argument("--target-ms", type=float, default=250, help="Target time per password check")
+    parser.add_argument("--samples", type=int, default=3, help="Checks timed per cost (median is used)")
+    parser.add_argument("--max-rounds", type=int, default=MAX_ROUNDS)
+    parser.add_argument("--env-file", type=Path, help="Save the recommendation as BCRYPT_ROUNDS here")
+    args = parser.parse_args(argv)
+
+    result = calibrate(args.target_ms, max_rounds=args.max_rounds, samples=args.samples)
+    for rounds, elapsed_ms in result["timings_ms"].items():
+        print(f"  cost {rounds:2d}: {elapsed_ms:8.1f} ms")
+
+    recommended = result["recommended"]
+    if recommended is None:
+        print(f"Even cost {MIN_ROUNDS} exceeds {args.target_ms:.0f}ms; raise the target.")
+        return 1
+    print(f"Recommended: BCRYPT_ROUNDS={recommended}")
+    if recommended < RECOMMENDED_MIN_ROUNDS:
+        print(f"Warning: costs below {RECOMMENDED_MIN_ROUNDS} are weak; consider a higher target.")
+    if args.env_file:
+        save_rounds(args.env_file, recommended)
+        print(f"Saved to {args.env_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+"""In-process change feed: feedback writes wake live dashboard views instead of polling."""
+import asyncio
+import logging
+import threading
+from typing import Callable, List, Set, Tuple
+
+from app.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_CHANGES_PUBLISHED = Counter(
+    "feedback_changes_published_total",
+    "Feedback writes announced on the change feed (local commits and other workers' writes).",
+)
+
+
+class ChangeFeed:
+    """
+    Announces committed feedback writes to listeners and async waiters.
+
+    Writers call publish() after they commit. The feed carries no rows,
+    only a sequence number that increases with every write; a woken waiter
+    reads what is new by id (see DashboardService.rows_since), so a burst
+    of writes costs one query per waiter, not one per write. Sync listeners
+    (e.g. the dashboard result cache) run inside publish().
+
+    publish() may be called from any thread; waiters are woken on their
+    own event loops.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._sequence = 0
+
+    @property
+    def sequence(self) -> int:
+        """Number of writes published so far."""
+        return self._sequence
+
+    @property
+    def waiters(self) -> int:
+        """Coroutines currently waiting for a write."""
+        return len(self._waiters)
+
+    def subscribe(self, listener: Callable[[], None]):
+        """Call `listener()` on every published write."""
+        self._listeners.append(listener)
+
+    def publish(self):
+        """Record a committed feedback write and wake every waiter."""
+        FEEDBACK_CHANGES_PUBLISHED.inc()
+        for listener in self._listeners:
+            listener()
+        with self._lock:
+            self._sequence += 1
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's loop has shut down
+                pass
+
+    async def wait(self, after: int, timeout: float) -> int:
+        """
+        Wait until a write newer than sequence `after` is published.
+
+        Returns:
+            The current sequence; equal to `after` if `timeout` expired
+        """
+        if self._sequence != after:
+            return self._sequence
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(entry)
+        try:
+            # A publish between the first check and registering is caught here
+            if self._sequence == after:
+                try:
+                    await asyncio.wait_for(entry[1].wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                self._waiters.discard(entry)
+        return self._sequence
+
+
+# Process-wide feed; the feedback write paths publish to it
+change_feed = ChangeFeed()
@@ -0,0 +1,200 @@
+"""Cross-worker cache coherence: notice other processes' writes and drop stale caches."""
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.metrics import Counter
+from config import config
+
+logger = logging.getLogger(__name__)
+
+CACHE_COHERENCE_INVALIDATIONS = Counter(
+    "cache_coherence_invalidations_total",
+    "In-process caches dropped because another process wrote to a table they cache.",
+    labelnames=("table",),
+)
+
+# Identifies this process's rows in the cache_version table
+WRITER_ID = uuid.uuid4().hex
+
+# Tables whose writes are announced to other processes
+TRACKED_TABLES = ("courier", "feedback")
+
+_TRIGGER = """
+CREATE TEMP TRIGGER IF NOT EXISTS cache_version_{table}_{op} AFTER {op} ON main.{table}
+BEGIN
+    INSERT INTO cache_version (name, writer, version) VALUES ('{table}', '{writer}', 1)
+    ON CONFLICT (name, writer) DO UPDATE SET version = version + 1;
+END
+"""
+
+
+def track_writes(engine: Engine, writer: str = WRITER_ID):
+    """
+    Count this process's writes to TRACKED_TABLES in cache_version.
+
+    Each pooled SQLite connection gets TEMP triggers (visible only to that
+    connection) that bump the (table, writer) row in the same transaction
+    as the write, so other processes can tell which tables changed and
+    that the change was not theirs. Connections checked out before the
+    tables exist get their triggers on a later checkout.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    def install(dbapi_connection, connection_record, connection_proxy):
+        if connection_record.info.get("write_tracking") is dbapi_connection:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            for table in TRACKED_TABLES:
+                for op in ("INSERT", "UPDATE", "DELETE"):
+                    cursor.execute(_TRIGGER.format(table=table, op=op, writer=writer))
+        except Exception as e:
+            logger.debug("Write tracking not installed yet: %s", e)
+            return
+        finally:
+            cursor.close()
+        connection_record.info["write_tracking"] = dbapi_connection
+
+    event.listen(engine, "checkout", install)
+
+
+class DataVersionWatcher:
+    """
+    Detects database writes made by other processes.
+
+    Each worker keeps its own courier and dashboard caches; a write in one
+    worker would leave the others stale. The watcher holds one dedicated
+    SQLite connection and reads `PRAGMA data_version`, which changes
+    whenever another connection commits. That includes this process's own
+    pooled connections, so on a change the watcher reads the cache_version
+    counters kept by track_writes() and runs only the invalidations
+    subscribed to tables another writer changed. Checks are lazy (callers
+    run check() before reading a cache) and at most one per `interval`,
+    which bounds staleness.
+
+    Only SQLite has data_version; on other databases check() does nothing.
+    Writes from processes without track_writes() (e.g. the sqlite3 shell)
+    are not seen; the caches' TTLs cover those.
+    """
+
+    def __init__(self, interval: float = config.CACHE_COHERENCE_INTERVAL_MS / 1000, writer: str = WRITER_ID):
+        self.interval = interval
+        self.writer = writer
+        self._subscribers: Dict[str, List[Callable[[], None]]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._engine: Optional[Engine] = None
+        self._connection = None
+        self._version: Optional[int] = None
+        # (table, writer) -> last seen counter, other writers only
+        self._counters: Dict[Tuple[str, str], int] = {}
+        self._next_check = 0.0
+
+    def subscribe(self, invalidate: Callable[[], None], table: str):
+        """Run `invalidate` whenever another process has written to `table`."""
+        self._subscribers[table].append(invalidate)
+
+    def check(self, engine: Engine) -> bool:
+        """
+        Invalidate caches if another process wrote since the last check.
+
+        Cheap when called often: between checks it is a clock read, and a
+        caller that finds another thread checking does not wait.
+
+        Returns:
+            True if caches were invalidated
+        """
+        if self.interval <= 0:
+            return False
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._next_check = now + self.interval
+            if engine is not self._engine:
+                self._bind(engine)
+                return False
+            if self._connection is None:
+                return False
+            version = self._read()
+            if version == self._version:
+                return False
+            self._version = version
+            tables = self._changed_tables()
+        except Exception as e:
+            logger.warning("Cache coherence check failed: %s", e)
+            self._close()
+            self._engine = None
+            return False
+        finally:
+            self._lock.release()
+        if not tables:
+            return False
+        self._invalidate(tables)
+        return True
+
+    def close(self):
+        """Release the watcher's connection."""
+        with self._lock:
+            self._close()
+            self._engine = None
+
+    def _bind(self, engine: Engine):
+        self._close()
+        self._engine = engine
+        if engine.dialect.name != "sqlite":
+            logger.info("Cache coherence needs SQLite data_version; %s caches rely on their TTLs", engine.dialect.name)
+            return
+        # Outside the pool: data_version is per connection, so it must
+        # always be read on the same one
+        self._connection = engine.raw_connection()
+        self._connection.detach()
+        self._version = self._read()
+        self._changed_tables()
+
+    def _read(self) -> int:
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute("PRAGMA data_version")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def _changed_tables(self) -> Set[str]:
+        """Tables other writers changed since the last read of their counters."""
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute("SELECT name, writer, version FROM cache_version WHERE writer != ?", (self.writer,))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        changed = {name for name, writer, version in rows if self._counters.get((name, writer)) != version}
+        self._counters = {(name, writer): version for name, writer, version in rows}
+        return changed
+
+    def _close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+        self._connection = None
+        self._version = None
+        self._counters = {}
+
+    def _invalidate(self, tables: Set[str]):
+        for table in sorted(tables):
+            CACHE_COHERENCE_INVALIDATIONS.labels(table).inc()
+            for invalidate in self._subscribers.get(table, ()):
+                invalidate()
+
+
+# Process-wide watcher; services subscribe their caches to it
+coherence = DataVersionWatcher()
@@ -0,0 +1,144 @@
+"""Process-wide cache of dashboard query results, shared by all admin sessions."""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple, TypeVar
+
+from app.metrics import Counter, Gauge
+from config import config
+
+T = TypeVar("T")
+
+DASHBOARD_CACHE_REQUESTS = Counter(
+    "dashboard_cache_requests_total",
+    "Dashboard query results by cache result (hit or miss).",
+    labelnames=("result",),
+)
+
+
+def _sizeof(value: Any) -> int:
+    """Rough deep size of a cached result (rows, tuples, strings, numbers)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(_sizeof(item) for item in value)
+    elif hasattr(value, "__slots__"):
+        size += sum(_sizeof(getattr(value, name)) for name in value.__slots__)
+    return size
+
+
+class ResultCache:
+    """
+    LRU of query results, kept fresh by a write version.
+
+    Every feedback write bumps the version after it commits. A result is
+    stored with the version read before its query ran and is served only
+    while that is still the current version, so a result that may predate
+    a write is never returned, even if it was stored after the write.
+    Identical queries from different sessions share one entry.
+    """
+
+    def __init__(self, max_entries: int = config.DASHBOARD_CACHE_SIZE):
+        self.max_entries = max_entries
+        # key -> (version, value, size in bytes)
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> int:
+        """Current write version."""
+        return self._version
+
+    @property
+    def entries(self) -> int:
+        """Results currently cached."""
+        return len(self._entries)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Estimated size of the cached results."""
+        return self._bytes
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def bump(self):
+        """Record a committed feedback write; all cached results become stale."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_or_load(self, key: Hashable, load: Callable[[], T]) -> T:
+        """
+        Cached result for `key`, or `load()` it and cache it.
+
+        `load` runs outside the lock, so concurrent misses for the same key
+        may both query; the cache never blocks one session on another.
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == self._version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                DASHBOARD_CACHE_REQUESTS.labels("hit").inc()
+                return cached[1]
+            self.misses += 1
+            version = self._version
+        DASHBOARD_CACHE_REQUESTS.labels("miss").inc()
+
+        value = load()
+        self._put(key, version, value)
+        return value
+
+    def _put(self, key: Hashable, version: int, value: Any):
+        if self.max_entries <= 0:
+            return
+        size = _sizeof(value)
+        with self._lock:
+            if version != self._version:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (version, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        """Drop all cached results and reset the statistics (tests)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by every admin session in this process
+dashboard_cache = ResultCache()
+
+Gauge(
+    "dashboard_cache_entries",
+    "Dashboard query results cached.",
+    fn=lambda: dashboard_cache.entries,
+)
+
+Gauge(
+    "dashboard_cache_bytes",
+    "Estimated memory used by cached dashboard results.",
+    fn=lambda: dashboard_cache.memory_bytes,
+)
+
+Gauge(
+    "dashboard_cache_hit_ratio",
+    "Share of dashboard queries served from the cache.",
+    fn=lambda: dashboard_cache.hit_ratio,
+)
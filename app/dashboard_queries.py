@@ -0,0 +1,163 @@
+"""Latest-wins dashboard queries: a newer filter state interrupts the query for an older one."""
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session
+
+from app.metrics import Counter
+
+T = TypeVar("T")
+
+DASHBOARD_FILTER_CHANGES = Counter(
+    "dashboard_filter_changes_total",
+    "Filter changes received from the admin dashboard.",
+)
+
+DASHBOARD_QUERIES = Counter(
+    "dashboard_queries_total",
+    "Dashboard table queries by outcome (completed, cancelled, discarded, failed).",
+    labelnames=("outcome",),
+)
+
+
+class QueryCancelled(Exception):
+    """The query was superseded and interrupted before it finished."""
+
+
+class CancellableQuery:
+    """
+    A query that another thread can interrupt.
+
+    The worker attaches its session's connection. Every statement checks
+    for cancellation before it runs (before_cursor_execute), so a cancel
+    that lands between statements is never lost. A statement already
+    running is aborted by a progress handler on SQLite, or by the driver's
+    cancel() elsewhere (e.g. psycopg2). The lock keeps cancel() from
+    reaching a connection that has already gone back to the pool.
+    """
+
+    # SQLite VM instructions between cancellation checks
+    PROGRESS_INTERVAL = 1000
+
+    def __init__(self):
+        self.cancelled = False
+        self._connection = None
+        self._dbapi_connection = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def attached(self, session: Session) -> Iterator[None]:
+        """
+        Make the statements `session` runs in this block cancellable (worker thread).
+
+        Exit the block before the session closes, so the hooks are gone
+        before its connection goes back to the pool.
+        """
+        connection = session.connection()
+        dbapi_connection = connection.connection.dbapi_connection
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled()
+            self._connection = connection
+            self._dbapi_connection = dbapi_connection
+            event.listen(connection, "before_cursor_execute", self._check)
+            if hasattr(dbapi_connection, "set_progress_handler"):
+                dbapi_connection.set_progress_handler(self._should_abort, self.PROGRESS_INTERVAL)
+        try:
+            yield
+        finally:
+            with self._lock:
+                event.remove(connection, "before_cursor_execute", self._check)
+                if hasattr(dbapi_connection, "set_progress_handler"):
+                    dbapi_connection.set_progress_handler(None, 0)
+                self._connection = None
+                self._dbapi_connection = None
+
+    def cancel(self):
+        """Mark cancelled and interrupt the running statement, if any."""
+        with self._lock:
+            self.cancelled = True
+            connection = self._dbapi_connection
+            # SQLite polls _should_abort; other drivers are told directly
+            if connection is None or hasattr(connection, "set_progress_handler"):
+                return
+            interrupt = getattr(connection, "cancel", None)
+            if interrupt is not None:
+                interrupt()
+
+    def _check(self, *args):
+        if self.cancelled:
+            raise QueryCancelled()
+
+    def _should_abort(self) -> int:
+        return 1 if self.cancelled else 0
+
+
+class LatestQueries:
+    """
+    Runs at most one dashboard query per client.
+
+    Starting a query for a client cancels the one still running for it, so
+    a burst of filter changes costs one finished query instead of one per
+    change. Bookkeeping happens on the event loop thread; queries run in
+    worker threads.
+    """
+
+    def __init__(self):
+        self._running: Dict[str, CancellableQuery] = {}
+
+    async def run(self, key: str, fn: Callable[[CancellableQuery], T]) -> T:
+        """
+        Run `fn(query)` in a worker thread, cancelling the previous query for `key`.
+
+        `fn` should run its statements inside `with query.attached(session):`.
+
+        Raises:
+            QueryCancelled: A newer query for `key` started first
+        """
+        self.cancel(key)
+        query = CancellableQuery()
+        self._running[key] = query
+        try:
+            result = await asyncio.to_thread(self._execute, query, fn)
+        except QueryCancelled:
+            DASHBOARD_QUERIES.labels("cancelled").inc()
+            raise
+        except asyncio.CancelledError:
+            query.cancel()
+            raise
+        except Exception:
+            DASHBOARD_QUERIES.labels("failed").inc()
+            raise
+        finally:
+            if self._running.get(key) is query:
+                del self._running[key]
+        DASHBOARD_QUERIES.labels("completed").inc()
+        return result
+
+    def cancel(self, key: str) -> bool:
+        """Cancel the running query for `key`; True if there was one."""
+        query: Optional[CancellableQuery] = self._running.pop(key, None)
+        if query is None:
+            return False
+        query.cancel()
+        return True
+
+    @staticmethod
+    def _execute(query: CancellableQuery, fn: Callable[[CancellableQuery], T]) -> T:
+        if query.cancelled:
+            raise QueryCancelled()
+        try:
+            return fn(query)
+        except DBAPIError as e:
+            if query.cancelled:
+                raise QueryCancelled() from e
+            raise
+
+
+# Process-wide runner, keyed by the dashboard client's token
+dashboard_queries = LatestQueries()
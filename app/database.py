@@ -1,16 +1,25 @@
 """Database models and initialization."""
 import datetime
+import hashlib
 import logging
-from typing import Optional
+from typing import Optional, Tuple
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateIndex, CreateTable
 from sqlmodel import SQLModel, Field, create_engine, Session, select
 import bcrypt
 
+from app.coherence import track_writes
+from app.metrics import instrument_engine
+from app.query_stats import query_stats
 from config import config
 
 logger = logging.getLogger(__name__)
 
 # Create engine with configuration
 engine = create_engine(config.DATABASE_URL, connect_args=config.connect_args)
+instrument_engine(engine)
+query_stats.install(engine)
+track_writes(engine)
 
 
 class Courier(SQLModel, table=True):
@@ -46,9 +55,55 @@ class AdminUser(SQLModel, table=True):
     created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
 
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+class DeadLetter(SQLModel, table=True):
+    """Offline-queue item that kept failing to store, held for the admin."""
+
+    __tablename__ = "dead_letter"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    order_id: str = Field(index=True, unique=True)
+    attempts: int
+    reason: str
+    record: str  # FeedbackRecord JSON
+    failed_at: float  # Unix time of the last failure
+
+
+class CacheVersion(SQLModel, table=True):
+    """Per-process write counters for cached tables (see app.coherence)."""
+
+    __tablename__ = "cache_version"
+
+    name: str = Field(primary_key=True)
+    writer: str = Field(primary_key=True)
+    version: int = 0
+
+
+class AppMeta(SQLModel, table=True):
+    """Key/value settings the application stores about its own database."""
+
+    __tablename__ = "app_meta"
+
+    key: str = Field(primary_key=True)
+    value: str
+
+
+# Bump when the seed data below changes, so existing databases are re-seeded
+SEED_VERSION = 1
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    """Hash a password using bcrypt at `rounds` (default BCRYPT_ROUNDS)."""
+    salt = bcrypt.gensalt(rounds or config.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12), or None if unparseable."""
+    parts = hashed_password.split("$")
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -59,15 +114,81 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
             hashed_password.encode("utf-8")
         )
     except Exception as e:
-        logger.error(f"Password verification error: {e}")
+        logger.error("Password verification error: %s", e)
         return False
 
 
-def create_db_and_tables():
-    """Initialize database tables and seed default data."""
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and upgrade its hash to the configured cost.
+
+    Returns:
+        Tuple of (matches, new hash). The new hash is set only when the
+        password matches and the stored hash's cost differs from
+        BCRYPT_ROUNDS; the caller should store it.
+    """
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if hash_rounds(hashed_password) == config.BCRYPT_ROUNDS:
+        return True, None
+    return True, hash_password(plain_password)
+
+
+def schema_fingerprint() -> str:
+    """
+    Hash of the DDL for every table and index plus the seed inputs.
+
+    Changes whenever a model, the SQL dialect, SEED_VERSION or the default
+    admin settings change.
+    """
+    digest = hashlib.sha256()
+    for table in SQLModel.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(engine)).encode("utf-8"))
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(str(CreateIndex(index).compile(engine)).encode("utf-8"))
+    seed = f"{SEED_VERSION}|{config.DEFAULT_ADMIN_USERNAME}|{bool(config.DEFAULT_ADMIN_PASSWORD)}"
+    digest.update(seed.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _stored_fingerprint() -> Optional[str]:
+    """Fingerprint recorded by the last schema setup, or None."""
+    try:
+        with Session(engine) as session:
+            meta = session.get(AppMeta, "schema_fingerprint")
+            return meta.value if meta else None
+    except SQLAlchemyError:
+        # Fresh database without the app_meta table
+        return None
+
+
+def _store_fingerprint(fingerprint: str):
+    with Session(engine) as session:
+        session.merge(AppMeta(key="schema_fingerprint", value=fingerprint))
+        session.commit()
+
+
+def create_db_and_tables(force: bool = False) -> bool:
+    """
+    Initialize database tables and seed default data.
+
+    Skipped when the stored schema fingerprint matches the current one, so
+    restarts do no DDL or seed queries. Rows deleted by hand are therefore
+    not re-seeded until the fingerprint changes (or force=True).
+
+    Returns:
+        True if tables were created/seeded, False if skipped
+    """
+    fingerprint = schema_fingerprint()
+    if not force and _stored_fingerprint() == fingerprint:
+        logger.info("Schema unchanged (%s), skipping DDL and seeding", fingerprint[:12])
+        return False
+
     SQLModel.metadata.create_all(engine)
     _seed_default_admin()
     _seed_sample_courier()
+    _store_fingerprint(fingerprint)
+    return True
 
 
 def _seed_default_admin():
@@ -91,7 +212,7 @@ def _seed_default_admin():
             )
             session.add(admin)
             session.commit()
-            logger.info(f"Default admin created: {config.DEFAULT_ADMIN_USERNAME}")
+            logger.info("Default admin created: %s", config.DEFAULT_ADMIN_USERNAME)
 
 
 def _seed_sample_courier():
@@ -0,0 +1,147 @@
+"""
+Non-blocking logging: records are queued by the caller and written by a
+background listener thread.
+
+Application code only formats the message and puts the record on a bounded
+in-memory queue; stream and file I/O happen on the listener thread. When
+the queue is full, new INFO/DEBUG records are dropped, and WARNING and above
+evict the oldest queued record so errors still get through. Drops are
+counted (log_records_dropped_total).
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Sequence
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message (+ exc, static fields)."""
+
+    def __init__(self, static_fields: Optional[Dict[str, str]] = None):
+        super().__init__()
+        self.static_fields = static_fields or {}
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **self.static_fields,
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a random `rate` fraction of INFO and DEBUG records.
+
+    WARNING and above always pass, as do loggers listed in `exempt` (for
+    example app.access, which samples itself).
+    """
+
+    def __init__(self, rate: float, exempt: Sequence[str] = ()):
+        super().__init__()
+        self.rate = rate
+        self.exempt = frozenset(exempt)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1 or record.name in self.exempt:
+            return True
+        return random.random() < self.rate
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller (see module docstring)."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may change later), but leave traceback
+        # formatting to the listener: the queue is in-process, so exc_info
+        # can travel as is.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno >= logging.WARNING:
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+        with self._drop_lock:
+            self.dropped += 1
+
+
+# Handler and listener installed by install()
+_queue_handler: Optional[BoundedQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def install(
+    handlers: Sequence[logging.Handler],
+    formatter: logging.Formatter,
+    queue_size: int = 10_000,
+    sample_rate: float = 1.0,
+    exempt: Sequence[str] = (),
+) -> BoundedQueueHandler:
+    """
+    Route logging through a bounded queue to `handlers` on a listener thread.
+
+    Args:
+        handlers: Destination handlers (written from the listener thread)
+        formatter: Formatter applied to every destination handler
+        queue_size: Records buffered before dropping
+        sample_rate: Fraction of INFO/DEBUG records kept
+        exempt: Logger names never sampled
+
+    Returns:
+        The queue handler to attach to the root logger
+    """
+    global _queue_handler, _listener
+    if _listener is not None:
+        _listener.stop()
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _queue_handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size))
+    if sample_rate < 1:
+        _queue_handler.addFilter(SamplingFilter(sample_rate, exempt))
+    _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _queue_handler
+
+
+def stop():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+atexit.register(stop)
@@ -0,0 +1,226 @@
+"""Event-loop health: loop lag, blocking calls and background-task state locks."""
+import asyncio
+import contextlib
+import functools
+import inspect
+import logging
+import sys
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from app.metrics import Counter, Gauge, Histogram
+from config import config
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between a scheduled event-loop wakeup and when it ran.",
+)
+
+EVENT_LOOP_BLOCKS = Counter(
+    "event_loop_blocked_total",
+    "Event-loop stalls over the blocking threshold, by innermost app frame.",
+    labelnames=("site",),
+)
+
+BACKGROUND_TASK_SECONDS = Histogram(
+    "reflex_background_task_seconds",
+    "Background event handler run time.",
+    labelnames=("handler",),
+)
+
+STATE_LOCK_WAIT_SECONDS = Histogram(
+    "reflex_state_lock_wait_seconds",
+    "Time a background handler waited to enter `async with self`.",
+    labelnames=("handler",),
+)
+
+STATE_LOCK_HOLD_SECONDS = Histogram(
+    "reflex_state_lock_hold_seconds",
+    "Time a background handler held the state lock, including the state push on exit.",
+    labelnames=("handler",),
+)
+
+# Name of the tracked background handler running in the current task
+_current_handler: ContextVar[Optional[str]] = ContextVar("background_handler", default=None)
+
+# Handler name -> number of running instances (event-loop thread only)
+_running: Dict[str, int] = {}
+
+
+def track_background(fn: Callable) -> Callable:
+    """
+    Count running instances and run time of a background event handler.
+
+    Apply below @rx.event(background=True); works for coroutine and
+    async-generator handlers. state_lock() inside the handler is attributed
+    to it.
+    """
+    name = fn.__qualname__
+
+    @contextlib.contextmanager
+    def tracked():
+        token = _current_handler.set(name)
+        _running[name] = _running.get(name, 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            BACKGROUND_TASK_SECONDS.labels(name).observe(time.perf_counter() - start)
+            _running[name] -= 1
+            _current_handler.reset(token)
+
+    if inspect.isasyncgenfunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with tracked():
+                async for update in fn(*args, **kwargs):
+                    yield update
+    else:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with tracked():
+                return await fn(*args, **kwargs)
+
+    return wrapper
+
+
+@contextlib.asynccontextmanager
+async def state_lock(state) -> AsyncIterator:
+    """
+    `async with self` for background handlers, timing lock wait and hold.
+
+    Use as `async with state_lock(self):`. Everything inside runs with the
+    state locked and blocks other events for this client, so keep database
+    calls and other slow work outside the block.
+    """
+    handler = _current_handler.get() or "untracked"
+    start = time.perf_counter()
+    acquired = None
+    try:
+        async with state:
+            acquired = time.perf_counter()
+            STATE_LOCK_WAIT_SECONDS.labels(handler).observe(acquired - start)
+            yield state
+    finally:
+        if acquired is not None:
+            STATE_LOCK_HOLD_SECONDS.labels(handler).observe(time.perf_counter() - acquired)
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and reports blocking calls with their stack.
+
+    A probe task sleeps for `interval` and records how late it woke up. A
+    watchdog thread checks the probe's heartbeat; when the loop has not run
+    it for longer than `block_threshold`, the loop thread's current stack
+    is logged once per stall and counted by the innermost app frame.
+    """
+
+    def __init__(
+        self,
+        interval: float = config.LOOP_MONITOR_INTERVAL_MS / 1000,
+        block_threshold: float = config.LOOP_BLOCK_THRESHOLD_MS / 1000,
+    ):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self._heartbeat = 0.0
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._probe_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the monitor is attached to a loop."""
+        return self._probe_task is not None and not self._probe_task.done()
+
+    def start(self):
+        """Start monitoring the running event loop (idempotent)."""
+        if self.running:
+            return
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._probe_task = asyncio.get_running_loop().create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            "Event-loop monitor started (interval %.0fms, blocking threshold %.0fms)",
+            self.interval * 1000, self.block_threshold * 1000,
+        )
+
+    async def stop(self):
+        """Stop the probe task and the watchdog thread."""
+        self._stop.set()
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._probe_task
+            self._probe_task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self) -> AsyncIterator[None]:
+        """Run the monitor for the lifetime of the app (a Reflex lifespan task)."""
+        self.start()
+        try:
+            yield
+        finally:
+            await self.stop()
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG_SECONDS.observe(max(loop.time() - scheduled, 0.0))
+            self._heartbeat = time.monotonic()
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.block_threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.block_threshold or reported == heartbeat:
+                continue
+            reported = heartbeat
+            self._report(stalled)
+
+    def _report(self, stalled: float):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        site = _app_site(frame)
+        EVENT_LOOP_BLOCKS.labels(site).inc()
+        logger.warning(
+            "Event loop blocked for %.0fms+ in %s:\n%s",
+            stalled * 1000, site, "".join(traceback.format_stack(frame)),
+        )
+
+
+def _app_site(frame) -> str:
+    """'module:function' of the innermost application frame in a stack."""
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and module != __name__:
+            return f"{module}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "other"
+
+
+Gauge(
+    "reflex_background_tasks_running",
+    "Running background event handlers, by handler.",
+    labelnames=("handler",),
+    fn=lambda: dict(_running),
+)
+
+# Process-wide monitor, started by the Reflex app's lifespan
+loop_monitor = LoopMonitor()
@@ -0,0 +1,509 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters and histograms keep one value array per thread, so recording a
+sample is a thread-local lookup plus a few list increments: writers never
+share a cell and never take a lock. Reads (scrapes, snapshots) sum the
+per-thread arrays, which may be a few increments stale but never corrupt.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import logging_pipeline, server_timing
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Bucket upper bounds for item counts (e.g. write-batch sizes)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 200, 500, 1000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _ShardedCells:
+    """Fixed-size numeric cells with one copy per writing thread."""
+
+    __slots__ = ("_size", "_local", "_shards", "_lock")
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[list] = []
+        self._lock = threading.Lock()
+
+    def local(self) -> list:
+        """This thread's cells (created on first use)."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = [0] * self._size
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def totals(self) -> list:
+        """Cell-wise sum over all threads."""
+        totals = [0] * self._size
+        for shard in list(self._shards):
+            for index, value in enumerate(shard):
+                totals[index] += value
+        return totals
+
+    def reset(self):
+        """Zero every thread's cells in place."""
+        for shard in list(self._shards):
+            shard[:] = [0] * self._size
+
+
+class Registry:
+    """Set of named metrics rendered together by /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric"):
+        """Add a metric; names must be unique."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric name: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional["_Metric"]:
+        """Look up a registered metric by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format (0.0.4)."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Default registry served by /metrics
+REGISTRY = Registry()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base for metrics, optionally split into children by label values."""
+
+    TYPE = "untyped"
+
+    def __init__(
+        self,
+        name: str = "",
+        help: str = "",
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._children_lock = threading.Lock()
+        if name and registry is not None:
+            registry.register(self)
+
+    def labels(self, *values) -> "_Metric":
+        """Child metric for the given label values (created on first use)."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._children_lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _own_samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """(name suffix, labels, value) tuples for exposition."""
+        if not self.labelnames:
+            yield from self._own_samples()
+            return
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            for suffix, extra, value in child._own_samples():
+                yield suffix, {**labels, **extra}, value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    TYPE = "counter"
+
+    def __init__(self, name: str = "", help: str = "", labelnames: Sequence[str] = (), **kwargs):
+        super().__init__(name, help, labelnames, **kwargs)
+        self._cells = _ShardedCells(1)
+
+    def _new_child(self) -> "Counter":
+        return Counter()
+
+    def inc(self, amount: float = 1):
+        """Add `amount` (>= 0)."""
+        self._cells.local()[0] += amount
+
+    @property
+    def value(self) -> float:
+        """Current total."""
+        return self._cells.totals()[0]
+
+    def _own_samples(self):
+        yield "", {}, self.value
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down.
+
+    Either set() explicitly or computed at scrape time by `fn`, which may
+    return a number or a {label value: number} dict (for one label name).
+    """
+
+    TYPE = "gauge"
+
+    def __init__(
+        self,
+        name: str = "",
+        help: str = "",
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], Union[float, Dict[str, float]]]] = None,
+        **kwargs,
+    ):
+        super().__init__(name, help, () if fn else labelnames, **kwargs)
+        self._fn = fn
+        self._fn_labelnames = tuple(labelnames) if fn else ()
+        self._value = 0.0
+
+    def _new_child(self) -> "Gauge":
+        return Gauge()
+
+    def set(self, value: float):
+        """Set the current value."""
+        self._value = value
+
+    @property
+    def value(self) -> Union[float, Dict[str, float]]:
+        """Current value (calls `fn` if given)."""
+        return self._fn() if self._fn else self._value
+
+    def _own_samples(self):
+        value = self.value
+        if isinstance(value, dict):
+            for label_value, item in value.items():
+                yield "", {self._fn_labelnames[0]: label_value}, item
+        else:
+            yield "", {}, value
+
+
+class CallbackCounter(Gauge):
+    """Counter whose total is read from `fn` at scrape time."""
+
+    TYPE = "counter"
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram (durations in seconds unless other buckets are
+    given).
+
+    Observations are O(log buckets) with constant memory, so it can stay on
+    the hot path in production. Quantiles are estimated by linear
+    interpolation inside the bucket that contains them.
+    """
+
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str = "",
+        help: str = "",
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        **kwargs,
+    ):
+        super().__init__(name, help, labelnames, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Cells: one per bucket, +Inf, then sum and count
+        self._cells = _ShardedCells(len(self.buckets) + 3)
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(buckets=self.buckets)
+
+    def reset(self):
+        """Discard all observations."""
+        self._cells.reset()
+        for child in list(self._children.values()):
+            child.reset()
+
+    def observe(self, value: float):
+        """Record one observation."""
+        shard = self._cells.local()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def _totals(self) -> Tuple[list, float, int]:
+        totals = self._cells.totals()
+        return totals[:-2], totals[-2], totals[-1]
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-quantile (0..1), or None without observations."""
+        counts, _, total = self._totals()
+        return self._quantile(counts, total, q)
+
+    def _quantile(self, counts: List[int], total: int, q: float) -> Optional[float]:
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict:
+        """Count, sum, quantile estimates and cumulative bucket counts."""
+        counts, total_sum, total = self._totals()
+
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            running += count
+            cumulative["+Inf" if bound == math.inf else str(bound)] = running
+
+        return {
+            "count": total,
+            "sum": round(total_sum, 6),
+            "mean": round(total_sum / total, 6) if total else None,
+            "p50": self._quantile(counts, total, 0.5),
+            "p95": self._quantile(counts, total, 0.95),
+            "p99": self._quantile(counts, total, 0.99),
+            "buckets": cumulative,
+        }
+
+    def _own_samples(self):
+        counts, total_sum, total = self._totals()
+        running = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            running += count
+            yield "_bucket", {"le": "+Inf" if bound == math.inf else _format_value(float(bound))}, running
+        yield "_sum", {}, total_sum
+        yield "_count", {}, total
+
+
+class StageTimings:
+    """Per-stage latency histograms for the feedback submit path."""
+
+    STAGES = ("validation", "queueing", "db_write", "commit", "state_push", "total")
+
+    def __init__(self, stages: Sequence[str] = STAGES, histogram: Optional[Histogram] = None):
+        self._histogram = histogram or Histogram(labelnames=("stage",))
+        self._histograms = {stage: self._histogram.labels(stage) for stage in stages}
+
+    def observe(self, stage: str, seconds: float):
+        """Record a duration for a stage."""
+        self._histograms[stage].observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one observation of `stage`."""
+        with self._histograms[stage].time():
+            yield
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Histogram snapshots keyed by stage."""
+        return {stage: histogram.snapshot() for stage, histogram in self._histograms.items()}
+
+    def reset(self):
+        """Discard all observations."""
+        for histogram in self._histograms.values():
+            histogram.reset()
+
+
+# Application metrics
+
+# Submit-path stage timings, shared by all sessions
+submit_timings = StageTimings(histogram=Histogram(
+    "feedback_submit_stage_seconds",
+    "Feedback submit latency by stage.",
+    labelnames=("stage",),
+))
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by method, route template and status.",
+    labelnames=("method", "route", "status"),
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time by statement type.",
+    labelnames=("statement",),
+)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a pooled database connection.",
+)
+
+FLUSH_BATCH_SIZE = Histogram(
+    "feedback_flush_batch_size",
+    "Items per offline-queue flush transaction.",
+    buckets=SIZE_BUCKETS,
+)
+
+SYNC_OUTCOMES = Counter(
+    "feedback_sync_outcomes_total",
+    "Offline-queue items flushed, by outcome.",
+    labelnames=("status",),
+)
+
+COURIER_CACHE_REQUESTS = Counter(
+    "courier_cache_requests_total",
+    "Courier lookups by cache result (hit or miss).",
+    labelnames=("result",),
+)
+
+LOG_RECORDS_DROPPED = CallbackCounter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+    fn=logging_pipeline.dropped_records,
+)
+
+
+def instrument_engine(engine: Engine):
+    """
+    Record statement timings and pool checkout waits for an engine.
+
+    Safe to call more than once per engine.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    # Pools have no "before checkout" event, so time Pool.connect() itself.
+    # Switching the instance's class keeps the timing across engine.dispose(),
+    # which recreates the pool from its class.
+    if not getattr(engine.pool, "_timed_checkout", False):
+        engine.pool.__class__ = _timed_pool_class(type(engine.pool))
+
+
+def _timed_pool_class(base: type) -> type:
+    """Subclass of a pool class that times connection checkouts."""
+
+    class TimedPool(base):
+        _timed_checkout = True
+
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def _statement_type(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERY_SECONDS.labels(_statement_type(statement)).observe(elapsed)
+    server_timing.add("db", elapsed)
+
+
+def _handle_error(context):
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Label by route template, not raw path, to bound cardinality
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, status_code[0]).observe(
+                time.perf_counter() - start
+            )
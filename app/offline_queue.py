@@ -0,0 +1,75 @@
+"""Bridge to the browser-side offline queue (assets/offline_queue.js)."""
+import json
+
+import reflex as rx
+
+from app.records import FeedbackRecord
+from config import config
+
+# Paths the queue script and its service worker are served from (files in
+# assets/ are served at /)
+SCRIPT_SRC = "/offline_queue.js"
+WORKER_SRC = "/sw.js"
+
+# Route of the batch endpoint queued items are flushed to
+BATCH_ROUTE = "/api/feedback/batch"
+
+
+class OfflineQueueBridge:
+    """
+    Build JavaScript snippets that drive the client-side offline queue.
+
+    Queued feedback lives in the customer's browser (IndexedDB, falling back
+    to localStorage), so the server only mirrors the pending count. Each
+    method returns code for rx.call_script(); the script's promise result is
+    passed to the callback event.
+    """
+
+    @staticmethod
+    def batch_url() -> str:
+        """Absolute URL of the batch endpoint, as seen by the browser."""
+        return rx.config.get_config().api_url.rstrip("/") + BATCH_ROUTE
+
+    @staticmethod
+    def install() -> str:
+        """
+        Register the Background Sync service worker plus the online and
+        pagehide (sendBeacon) listeners, so queued items are delivered even
+        after the tab is closed. Flushes triggered by reconnecting are
+        delayed by a random 0..SYNC_RETRY_DELAY seconds to spread the load.
+        Resolves to the browser's online status.
+        """
+        url = json.dumps(OfflineQueueBridge.batch_url())
+        jitter_ms = config.SYNC_RETRY_DELAY * 1000
+        return (
+            f"window.feedbackQueue.install({url}, {config.MAX_QUEUE_SIZE}, "
+            f"{json.dumps(WORKER_SRC)}, {jitter_ms})"
+        )
+
+    @staticmethod
+    def enqueue(record: FeedbackRecord) -> str:
+        """
+        Store a record in the browser queue.
+        Resolves to the new pending count.
+        """
+        entry = json.dumps(record.to_queue_entry())
+        return f"window.feedbackQueue.enqueue({entry}, {config.MAX_QUEUE_SIZE})"
+
+    @staticmethod
+    def count() -> str:
+        """
+        Count pending items.
+        Resolves to an int.
+        """
+        return "window.feedbackQueue.count()"
+
+    @staticmethod
+    def flush() -> str:
+        """
+        Post due items to the batch endpoint in chunks; items the server
+        asks to retry are skipped until their retry_after has elapsed.
+        Always resolves, to {synced, remaining}; remaining is -1 if the
+        flush itself failed.
+        """
+        url = json.dumps(OfflineQueueBridge.batch_url())
+        return f"window.feedbackQueue.flush({url}, {config.MAX_QUEUE_SIZE})"
@@ -1,5 +1,28 @@
 import reflex as rx
-from ..states.admin_state import AdminState
+from ..states.admin_state import FEEDBACK_VIEWPORT_ID, ROW_HEIGHT_PX, VIEWPORT_ROWS, AdminState
+
+# Typing a date fires one change per keystroke; send only the last one.
+# Rating chips are not debounced (that would drop toggles); a newer click
+# interrupts the query for the previous one instead.
+FILTER_DEBOUNCE_MS = 300
+
+# The table follows the viewport at most every SCROLL_THROTTLE_MS while
+# scrolling, and once more SCROLL_SETTLE_MS after it stops: throttling is
+# leading-edge only and would drop the final position on its own.
+SCROLL_THROTTLE_MS = 100
+SCROLL_SETTLE_MS = 150
+
+COLUMNS = [
+    "ID",
+    "Order ID",
+    "Courier",
+    "Rating",
+    "Comment",
+    "Reasons",
+    "Consent",
+    "Follow-up",
+    "Date",
+]
 
 
 def header() -> rx.Component:
@@ -30,7 +53,7 @@ def filters() -> rx.Component:
                 rx.el.label("From Date", class_name="font-mono text-sm font-medium"),
                 rx.el.input(
                     type="date",
-                    on_change=AdminState.set_filter_from_date,
+                    on_change=AdminState.update_from_date.debounce(FILTER_DEBOUNCE_MS),
                     value=AdminState.filter_from_date,  # FIXED: Use value instead of default_value
                     class_name="w-full p-2 border rounded-md font-mono",
                 ),
@@ -40,7 +63,7 @@ def filters() -> rx.Component:
                 rx.el.label("To Date", class_name="font-mono text-sm font-medium"),
                 rx.el.input(
                     type="date",
-                    on_change=AdminState.set_filter_to_date,
+                    on_change=AdminState.update_to_date.debounce(FILTER_DEBOUNCE_MS),
                     value=AdminState.filter_to_date,  # FIXED: Use value
                     class_name="w-full p-2 border rounded-md font-mono",
                 ),
@@ -85,39 +108,129 @@ def filters() -> rx.Component:
     )
 
 
+def sync_panel() -> rx.Component:
+    """Offline queue items that ran out of sync retries."""
+    return rx.cond(
+        AdminState.dead_letters.length() > 0,
+        rx.el.div(
+            rx.el.div(
+                rx.el.h3(
+                    "Failed Offline Submissions",
+                    class_name="text-lg font-semibold font-mono text-red-700",
+                ),
+                rx.el.div(
+                    rx.el.span(
+                        "Retries: ",
+                        AdminState.sync_metrics["retries_scheduled"].to_string(),
+                        " · Recovered: ",
+                        AdminState.sync_metrics["recovered"].to_string(),
+                        class_name="text-xs font-mono text-gray-500",
+                    ),
+                    rx.el.button(
+                        "Retry",
+                        on_click=AdminState.retry_dead_letters,
+                        class_name="bg-blue-600 text-white font-mono text-sm py-1 px-3 rounded-lg hover:bg-blue-700",
+                    ),
+                    rx.el.button(
+                        "Clear",
+                        on_click=AdminState.clear_dead_letters,
+                        class_name="bg-gray-500 text-white font-mono text-sm py-1 px-3 rounded-lg hover:bg-gray-600",
+                    ),
+                    class_name="flex items-center gap-4",
+                ),
+                class_name="flex items-center justify-between mb-3",
+            ),
+            rx.foreach(
+                AdminState.dead_letters,
+                lambda item: rx.el.div(
+                    rx.el.span(item["order_id"], class_name="font-semibold"),
+                    rx.el.span(item["attempts"].to_string(), " attempts"),
+                    rx.el.span(item["failed_at"]),
+                    rx.el.span(item["reason"], class_name="truncate text-gray-500"),
+                    class_name="grid grid-cols-4 gap-4 text-sm font-mono text-gray-700 py-1",
+                ),
+            ),
+            class_name="bg-red-50 p-4 rounded-lg border border-red-200 mb-6",
+        ),
+    )
+
+
+def spacer_row(height) -> rx.Component:
+    """Empty row standing in for rows outside the loaded window."""
+    return rx.el.tr(rx.el.td(col_span=len(COLUMNS), style={"height": height.to_string() + "px", "padding": "0"}))
+
+
+def scroll_position() -> rx.event.EventSpec:
+    """Send the table viewport's scroll offset to AdminState.scroll_table."""
+    return rx.call_script(
+        f"document.getElementById('{FEEDBACK_VIEWPORT_ID}').scrollTop",
+        callback=AdminState.scroll_table,
+    )
+
+
 def feedback_table() -> rx.Component:
+    """
+    Windowed feedback table.
+
+    Only the loaded window of rows is in the DOM; spacer rows keep the
+    scrollbar proportional to the full result, and scrolling asks the
+    backend for the rows that come into view. New feedback is pushed in
+    while the table is live (AdminState.watch_feedback).
+    """
     return rx.el.div(
+        rx.el.div(
+            rx.cond(
+                AdminState.live,
+                rx.el.span("● Live", class_name="text-xs font-mono text-green-600"),
+                rx.el.button(
+                    "Resume live updates",
+                    on_click=AdminState.watch_feedback,
+                    class_name="text-xs font-mono text-blue-600 hover:underline",
+                ),
+            ),
+            rx.el.button(
+                "Reload",
+                on_click=AdminState.reload_feedback,
+                class_name="text-xs font-mono text-blue-600 hover:underline",
+            ),
+            rx.el.span(
+                AdminState.total_rows.to_string(),
+                " entries",
+                class_name="text-sm font-mono text-gray-500",
+            ),
+            class_name="flex justify-end items-center gap-3 mb-2",
+        ),
         rx.el.div(
             rx.el.table(
                 rx.el.thead(
                     rx.el.tr(
                         rx.foreach(
-                            [
-                                "ID",
-                                "Order ID",
-                                "Courier",
-                                "Rating",
-                                "Comment",
-                                "Reasons",
-                                "Consent",
-                                "Follow-up",
-                                "Date",
-                            ],
+                            COLUMNS,
                             lambda col: rx.el.th(
                                 col,
                                 class_name="p-3 text-left text-xs font-mono font-semibold uppercase text-gray-500",
                             ),
                         ),
-                        class_name="bg-gray-50",
+                        class_name="bg-gray-50 sticky top-0 z-[1]",
                     )
                 ),
-                rx.el.tbody(rx.foreach(AdminState.parsed_feedbacks, feedback_row)),
+                rx.el.tbody(
+                    spacer_row(AdminState.top_spacer_px),
+                    rx.foreach(AdminState.visible_feedbacks, feedback_row),
+                    spacer_row(AdminState.bottom_spacer_px),
+                ),
                 class_name="min-w-full divide-y divide-gray-200",
             ),
-            class_name="overflow-x-auto rounded-lg border border-gray-200 shadow-sm",
+            id=FEEDBACK_VIEWPORT_ID,
+            on_scroll=[
+                scroll_position().throttle(SCROLL_THROTTLE_MS),
+                scroll_position().debounce(SCROLL_SETTLE_MS),
+            ],
+            style={"max_height": f"{ROW_HEIGHT_PX * VIEWPORT_ROWS}px"},
+            class_name="overflow-auto rounded-lg border border-gray-200 shadow-sm bg-white",
         ),
         rx.cond(
-            AdminState.filtered_feedbacks.length() == 0,
+            AdminState.total_rows == 0,
             rx.el.div(
                 rx.el.p(
                     "No feedback found matching your criteria.",
@@ -172,7 +285,7 @@ def feedback_row(feedback: dict) -> rx.Component:
                         class_name="bg-blue-100 text-blue-800 text-xs font-mono mr-2 px-2.5 py-0.5 rounded-full",
                     ),
                 ),
-                class_name="flex flex-wrap gap-1",
+                class_name="flex gap-1 overflow-hidden max-w-xs",
             ),
             class_name="p-3",
         ),
@@ -204,6 +317,7 @@ def feedback_row(feedback: dict) -> rx.Component:
             ),
             class_name="p-3 text-sm font-mono text-gray-500 whitespace-nowrap",
         ),
+        style={"height": f"{ROW_HEIGHT_PX}px"},
         class_name="hover:bg-gray-50 transition-colors",
     )
 
@@ -214,10 +328,12 @@ def dashboard_page() -> rx.Component:
     return rx.el.div(
         header(),
         rx.el.main(
+            sync_panel(),
             filters(),
             feedback_table(),
             class_name="container mx-auto p-4 md:p-6"
         ),
         class_name="bg-gray-50 min-h-screen font-['JetBrains_Mono']",
         on_mount=AdminState.check_auth_and_load,  # FIXED: Add auth check on mount
+        on_unmount=AdminState.stop_watching,
     )
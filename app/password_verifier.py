@@ -0,0 +1,150 @@
+"""Password verification off the event loop, with bounded queueing and per-client limits."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from app.database import verify_and_update, verify_password
+from app.metrics import Counter, Gauge, Histogram
+from config import config
+
+AUTH_VERIFY_WAIT_SECONDS = Histogram(
+    "auth_verify_wait_seconds",
+    "Time a password check waited for a free verifier thread.",
+)
+
+AUTH_VERIFY_SECONDS = Histogram(
+    "auth_verify_seconds",
+    "bcrypt verification time.",
+)
+
+AUTH_REJECTIONS = Counter(
+    "auth_rejections_total",
+    "Login attempts rejected before verification, by reason (throttled, busy).",
+    labelnames=("reason",),
+)
+
+
+class AuthRejectedError(RuntimeError):
+    """A login attempt was refused without checking the password."""
+
+    reason = "rejected"
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AuthThrottledError(AuthRejectedError):
+    """Too many concurrent attempts for the same username or client IP."""
+
+    reason = "throttled"
+
+
+class AuthBusyError(AuthRejectedError):
+    """The verifier queue is full."""
+
+    reason = "busy"
+
+
+class PasswordVerifier:
+    """
+    Runs bcrypt checks on a small dedicated thread pool.
+
+    bcrypt costs ~250ms of CPU per check, so verification never runs on the
+    event loop, and at most `workers + max_queue` checks are outstanding:
+    further attempts fail fast with AuthBusyError instead of queueing behind
+    a burst. Each username and client IP may have at most `per_key_limit`
+    attempts in flight (AuthThrottledError). Bookkeeping happens on the
+    event loop thread, so it needs no locks.
+    """
+
+    def __init__(
+        self,
+        workers: int = config.AUTH_WORKERS,
+        max_queue: int = config.AUTH_MAX_QUEUE,
+        per_key_limit: int = config.AUTH_MAX_CONCURRENT_PER_KEY,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.per_key_limit = per_key_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-verify")
+        self._outstanding = 0
+        self._in_flight: Dict[str, int] = {}
+
+    @property
+    def outstanding(self) -> int:
+        """Checks queued or running."""
+        return self._outstanding
+
+    async def verify(self, password: str, password_hash: str, username: str, client_ip: str = "") -> bool:
+        """
+        Check a password against its bcrypt hash.
+
+        Raises:
+            AuthThrottledError: The username or IP already has per_key_limit
+                attempts in flight
+            AuthBusyError: The verifier queue is full
+        """
+        return await self._run(verify_password, password, password_hash, username, client_ip)
+
+    async def verify_and_update(
+        self, password: str, password_hash: str, username: str, client_ip: str = "",
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Like verify, but also returns a new hash when the stored one was made
+        with another cost (see database.verify_and_update).
+        """
+        return await self._run(verify_and_update, password, password_hash, username, client_ip)
+
+    async def _run(self, check: Callable, password: str, password_hash: str, username: str, client_ip: str):
+        keys = self._claim(username, client_ip)
+        try:
+            self._outstanding += 1
+            try:
+                return await asyncio.wrap_future(
+                    self._executor.submit(self._timed, check, password, password_hash, time.perf_counter())
+                )
+            finally:
+                self._outstanding -= 1
+        finally:
+            self._release(keys)
+
+    def _claim(self, username: str, client_ip: str) -> Tuple[str, ...]:
+        keys = tuple(key for key in (f"user:{username}", f"ip:{client_ip}" if client_ip else "") if key)
+        if any(self._in_flight.get(key, 0) >= self.per_key_limit for key in keys):
+            AUTH_REJECTIONS.labels(AuthThrottledError.reason).inc()
+            raise AuthThrottledError("Too many concurrent login attempts")
+        if self._outstanding >= self.workers + self.max_queue:
+            AUTH_REJECTIONS.labels(AuthBusyError.reason).inc()
+            raise AuthBusyError("Login service is busy")
+        for key in keys:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        return keys
+
+    def _release(self, keys: Tuple[str, ...]):
+        for key in keys:
+            remaining = self._in_flight[key] - 1
+            if remaining:
+                self._in_flight[key] = remaining
+            else:
+                del self._in_flight[key]
+
+    @staticmethod
+    def _timed(check: Callable, password: str, password_hash: str, submitted: float):
+        started = time.perf_counter()
+        AUTH_VERIFY_WAIT_SECONDS.observe(started - submitted)
+        try:
+            return check(password, password_hash)
+        finally:
+            AUTH_VERIFY_SECONDS.observe(time.perf_counter() - started)
+
+
+# Process-wide verifier shared by the admin UI and the admin API
+password_verifier = PasswordVerifier()
+
+Gauge(
+    "auth_verify_outstanding",
+    "Password checks queued or running.",
+    fn=lambda: password_verifier.outstanding,
+)
@@ -0,0 +1,127 @@
+"""On-demand stack-sampling profiler for the live process."""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Focus presets: a name maps to module prefixes whose frames root the stack
+FOCUS_PRESETS: Dict[str, Tuple[str, ...]] = {
+    "api": ("app.api_routes",),
+    "states": ("app.states.",),
+}
+
+MAX_SECONDS = 60
+MIN_INTERVAL = 0.001
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+class SamplingProfiler:
+    """
+    Wall-clock profiler that samples every thread's stack from a helper
+    thread.
+
+    Nothing is installed while it is idle; during a run the cost is one
+    sys._current_frames() walk per interval. Results are collapsed stacks
+    ("root;child;leaf count" per line), which flamegraph.pl, speedscope
+    and similar tools read directly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """Whether a profile is in progress."""
+        return self._lock.locked()
+
+    def profile(
+        self,
+        seconds: float,
+        interval: float = 0.005,
+        focus: Sequence[str] = (),
+    ) -> Tuple[Counter, int]:
+        """
+        Sample stacks for `seconds` (blocking; call from a worker thread).
+
+        Args:
+            seconds: Duration, capped at MAX_SECONDS
+            interval: Delay between samples in seconds
+            focus: Function names (e.g. submit_feedback) or FOCUS_PRESETS
+                names. When given, only stacks passing through a matching
+                frame are kept, trimmed to start at that frame.
+
+        Returns:
+            Tuple of (collapsed stack counts, number of samples taken)
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            return self._sample(
+                min(seconds, MAX_SECONDS), max(interval, MIN_INTERVAL), _Focus(focus)
+            )
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, interval: float, focus: "_Focus") -> Tuple[Counter, int]:
+        stacks: Counter = Counter()
+        samples = 0
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + seconds
+
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = focus.trim(_frame_labels(frame))
+                if stack:
+                    stacks[";".join(stack)] += 1
+            samples += 1
+            time.sleep(interval)
+
+        return stacks, samples
+
+
+class _Focus:
+    """Matcher for the frames a profile is narrowed to."""
+
+    def __init__(self, focus: Iterable[str]):
+        self.modules: Tuple[str, ...] = ()
+        self.functions = set()
+        for name in focus:
+            if name in FOCUS_PRESETS:
+                self.modules += FOCUS_PRESETS[name]
+            elif name:
+                self.functions.add(name)
+
+    def trim(self, stack: List[str]) -> Optional[List[str]]:
+        """Stack from the first matching frame down, or None if none match."""
+        if not self.modules and not self.functions:
+            return stack
+        for index, label in enumerate(stack):
+            module, _, function = label.rpartition(":")
+            if function in self.functions or module.startswith(self.modules):
+                return stack[index:]
+        return None
+
+
+def _frame_labels(frame) -> List[str]:
+    """Root-first "module:function" labels for a frame's stack."""
+    labels = []
+    while frame is not None:
+        labels.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def collapse(stacks: Counter) -> str:
+    """Render stack counts in the collapsed (folded) flamegraph format."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# Process-wide profiler (one run at a time)
+profiler = SamplingProfiler()
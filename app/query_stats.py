@@ -0,0 +1,175 @@
+"""Per-statement query statistics and slow-query logging."""
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_NAMED_PARAM = re.compile(r"(?<!:):\w+|%\(\w+\)s|%s|\$\d+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Bucket for statements beyond the fingerprint limit
+OVERFLOW_FINGERPRINT = "<other>"
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """
+    Normalize a statement so executions that differ only in values group
+    together: literals and bind parameters become ?, IN lists collapse to
+    (?...) and whitespace is squeezed.
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _NAMED_PARAM.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(?...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+class QueryStats:
+    """
+    Aggregate statement timings per fingerprint.
+
+    Tracks count, total and max duration and rows (the DB-API rowcount:
+    rows affected for DML; drivers such as sqlite3 report none for SELECT).
+    Statements slower than slow_query_ms are logged with their query plan.
+    """
+
+    def __init__(
+        self,
+        slow_query_ms: float = config.SLOW_QUERY_MS,
+        max_fingerprints: int = config.QUERY_STATS_MAX_FINGERPRINTS,
+    ):
+        self.slow_query_ms = slow_query_ms
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._stats: Dict[str, dict] = {}
+
+    def install(self, engine: Engine):
+        """Attach cursor hooks to an engine (idempotent)."""
+        if event.contains(engine, "before_cursor_execute", self._before):
+            return
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        event.listen(engine, "handle_error", self._error)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_stats_start"].pop()
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        key = self.record(statement, elapsed, rows)
+
+        if self.slow_query_ms and elapsed * 1000 >= self.slow_query_ms:
+            plan = None if executemany else self._explain(conn, statement, parameters)
+            with self._lock:
+                entry = self._stats.get(key)
+                if entry is not None:
+                    entry["slow"] += 1
+                    entry["last_plan"] = plan
+            logger.warning(
+                "Slow query (%.1fms, %d rows): %s%s",
+                elapsed * 1000, rows, key, "\n  plan: %s" % plan if plan else "",
+            )
+
+    def _error(self, context):
+        if context.connection is not None:
+            starts = context.connection.info.get("query_stats_start")
+            if starts:
+                starts.pop()
+
+    def record(self, statement: str, elapsed: float, rows: int = 0) -> str:
+        """
+        Add one execution to its fingerprint's totals.
+
+        Returns:
+            The fingerprint the execution was counted under
+        """
+        key = fingerprint(statement)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    key = OVERFLOW_FINGERPRINT
+                    entry = self._stats.get(key)
+                if entry is None:
+                    entry = self._stats[key] = {
+                        "count": 0, "total": 0.0, "max": 0.0, "rows": 0, "slow": 0, "last_plan": None,
+                    }
+            entry["count"] += 1
+            entry["total"] += elapsed
+            entry["rows"] += rows
+            if elapsed > entry["max"]:
+                entry["max"] = elapsed
+        return key
+
+    @staticmethod
+    def _explain(conn, statement: str, parameters) -> Optional[str]:
+        """Query plan for a statement, via a separate raw DB-API cursor."""
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters)
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        except Exception as e:
+            logger.debug("Could not explain statement: %s", e)
+            return None
+        # SQLite rows are (id, parent, notused, detail); others are one column
+        return " | ".join(str(row[-1]) for row in rows)
+
+    def top(self, limit: int = 10, sort: str = "total") -> List[dict]:
+        """
+        Worst fingerprints first.
+
+        Args:
+            limit: Number of entries to return
+            sort: One of total, max, count, mean, rows
+
+        Returns:
+            Entries with times in milliseconds
+        """
+        with self._lock:
+            items = [(key, dict(entry)) for key, entry in self._stats.items()]
+
+        report = [
+            {
+                "fingerprint": key,
+                "count": entry["count"],
+                "total_ms": round(entry["total"] * 1000, 3),
+                "mean_ms": round(entry["total"] * 1000 / entry["count"], 3),
+                "max_ms": round(entry["max"] * 1000, 3),
+                "rows": entry["rows"],
+                "slow": entry["slow"],
+                "last_plan": entry["last_plan"],
+            }
+            for key, entry in items
+        ]
+        sort_key = {
+            "total": "total_ms", "max": "max_ms", "count": "count", "mean": "mean_ms", "rows": "rows",
+        }[sort]
+        report.sort(key=lambda item: item[sort_key], reverse=True)
+        return report[:limit]
+
+    def reset(self):
+        """Discard all statistics."""
+        with self._lock:
+            self._stats.clear()
+
+
+# Process-wide statistics for the application engine
+query_stats = QueryStats()
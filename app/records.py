@@ -0,0 +1,248 @@
+"""Compact, typed records passed between states, services and queues."""
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+def _parse_reasons(reasons: Any) -> Tuple[str, ...]:
+    """Normalize reasons from a JSON string or sequence into a tuple."""
+    if not reasons:
+        return ()
+    if isinstance(reasons, str):
+        try:
+            reasons = json.loads(reasons)
+        except (json.JSONDecodeError, TypeError):
+            return ()
+    return tuple(reasons)
+
+
+@dataclass(frozen=True, slots=True)
+class FeedbackRecord:
+    """
+    A single feedback submission.
+
+    Used on every internal hop of the submit path (state -> validation ->
+    queue -> DB) instead of ad-hoc dicts. Instances are immutable and carry
+    no per-instance __dict__, so they are cheap to queue and copy.
+    """
+
+    order_id: str
+    courier_id: int
+    rating: int
+    comment: Optional[str] = None
+    reasons: Tuple[str, ...] = ()
+    publish_consent: bool = False
+    timestamp: str = ""
+    request_id: str = ""
+
+    # Column order used by to_row()/from_row() for the feedback table
+    ROW_COLUMNS = (
+        "order_id",
+        "courier_id",
+        "rating",
+        "comment",
+        "reasons",
+        "publish_consent",
+        "needs_follow_up",
+    )
+
+    @property
+    def needs_follow_up(self) -> bool:
+        """Low ratings (<= 4) are flagged for follow-up."""
+        return self.rating <= 4
+
+    def validate(self) -> Tuple[bool, str]:
+        """
+        Validate field values.
+
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        if not self.order_id:
+            return False, "Missing required field: order_id"
+        if not isinstance(self.order_id, str):
+            return False, "order_id must be a string"
+        if self.courier_id is None:
+            return False, "Missing required field: courier_id"
+        if not isinstance(self.rating, int) or self.rating < 1 or self.rating > 5:
+            return False, "Rating must be between 1 and 5"
+        if self.comment is not None and not isinstance(self.comment, str):
+            return False, "Comment must be a string"
+        if len(self.comment or "") > 500:
+            return False, "Comment exceeds 500 characters"
+        return True, ""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FeedbackRecord":
+        """Build a record from a request payload or legacy queue dict."""
+        return cls(
+            order_id=data.get("order_id", ""),
+            courier_id=data.get("courier_id"),
+            rating=data.get("rating", 0),
+            comment=data.get("comment"),
+            reasons=_parse_reasons(data.get("reasons")),
+            publish_consent=bool(data.get("publish_consent", False)),
+            timestamp=data.get("timestamp", ""),
+            request_id=data.get("request_id", ""),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a JSON-compatible dict."""
+        return {
+            "order_id": self.order_id,
+            "courier_id": self.courier_id,
+            "rating": self.rating,
+            "comment": self.comment,
+            "reasons": list(self.reasons),
+            "publish_consent": self.publish_consent,
+            "timestamp": self.timestamp,
+            "request_id": self.request_id,
+        }
+
+    def to_json(self) -> str:
+        """Serialize to a JSON object string."""
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, data: str) -> "FeedbackRecord":
+        """Deserialize from to_json() output."""
+        return cls.from_dict(json.loads(data))
+
+    def to_queue_entry(self) -> List[Any]:
+        """Serialize to a positional list (no repeated keys) for queues."""
+        return [
+            self.order_id,
+            self.courier_id,
+            self.rating,
+            self.comment,
+            list(self.reasons),
+            self.publish_consent,
+            self.timestamp,
+            self.request_id,
+        ]
+
+    @classmethod
+    def from_queue_entry(cls, entry: Sequence[Any]) -> "FeedbackRecord":
+        """Deserialize from to_queue_entry() output."""
+        order_id, courier_id, rating, comment, reasons, consent, timestamp, request_id = entry
+        return cls(
+            order_id, courier_id, rating, comment, tuple(reasons), consent, timestamp, request_id
+        )
+
+    def to_row(self) -> tuple:
+        """Convert to a feedback table row tuple (see ROW_COLUMNS)."""
+        return (
+            self.order_id,
+            self.courier_id,
+            self.rating,
+            self.comment,
+            json.dumps(list(self.reasons)),
+            self.publish_consent,
+            self.needs_follow_up,
+        )
+
+    def to_params(self) -> Dict[str, Any]:
+        """Convert to named bind parameters for a feedback INSERT."""
+        return dict(zip(self.ROW_COLUMNS, self.to_row()))
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "FeedbackRecord":
+        """Build a record from a feedback table row (see ROW_COLUMNS)."""
+        order_id, courier_id, rating, comment, reasons, consent = row[:6]
+        return cls(order_id, courier_id, rating, comment, _parse_reasons(reasons), bool(consent))
+
+
+@dataclass(frozen=True, slots=True)
+class FeedbackRow:
+    """
+    A dashboard row: feedback joined with its courier name.
+
+    Reasons are parsed from JSON once, when the row is loaded, instead of on
+    every filter change.
+    """
+
+    id: int
+    order_id: str
+    courier_name: str
+    rating: int
+    comment: Optional[str]
+    reasons: Tuple[str, ...]
+    publish_consent: bool
+    needs_follow_up: bool
+    created_at: str
+
+    # Column order expected by from_row(), matching the dashboard SELECT
+    COLUMNS = (
+        "id",
+        "order_id",
+        "courier_name",
+        "rating",
+        "comment",
+        "reasons",
+        "publish_consent",
+        "needs_follow_up",
+        "created_at",
+    )
+
+    @property
+    def created_date(self) -> str:
+        """ISO date (YYYY-MM-DD) of created_at, comparable as a string."""
+        return self.created_at[:10]
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "FeedbackRow":
+        """Build a row from a dashboard query result tuple."""
+        id_, order_id, courier_name, rating, comment, reasons, consent, follow_up, created_at = row
+        return cls(
+            id_,
+            order_id,
+            courier_name,
+            rating,
+            comment,
+            _parse_reasons(reasons),
+            bool(consent),
+            bool(follow_up),
+            str(created_at) if created_at is not None else "",
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the dict shape rendered by the dashboard table."""
+        return {
+            "id": self.id,
+            "order_id": self.order_id,
+            "courier_name": self.courier_name,
+            "rating": self.rating,
+            "comment": self.comment,
+            "reasons": list(self.reasons),
+            "publish_consent": self.publish_consent,
+            "needs_follow_up": self.needs_follow_up,
+            "created_at": self.created_at,
+        }
+
+    def to_csv_row(self) -> list:
+        """Convert to a CSV export row."""
+        return [
+            self.id,
+            self.order_id,
+            self.courier_name,
+            self.rating,
+            self.comment or "",
+            json.dumps(list(self.reasons)),
+            self.publish_consent,
+            self.needs_follow_up,
+            self.created_at,
+        ]
+
+
+@dataclass(frozen=True, slots=True)
+class FeedbackFilters:
+    """
+    Dashboard filter settings, applied in SQL by DashboardService.
+
+    Dates are ISO strings (YYYY-MM-DD) as entered in the date inputs; an
+    empty or unparseable date leaves that bound open.
+    """
+
+    from_date: str = ""
+    to_date: str = ""
+    ratings: Tuple[int, ...] = ()
@@ -0,0 +1,121 @@
+"""Per-request timing breakdowns: Server-Timing headers, request IDs and access log."""
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from fastapi.responses import JSONResponse
+
+from config import config
+
+access_logger = logging.getLogger("app.access")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Incoming request IDs are echoed only if they look like an ID
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+# Durations (seconds) accumulated by name for the current request
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("server_timings", default=None)
+
+
+def add(name: str, seconds: float):
+    """Add a duration to the current request's named timing (no-op outside a request)."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Add the duration of the enclosed block to the named timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - start)
+
+
+def format_header(timings: Dict[str, float]) -> str:
+    """Format timings (seconds) as a Server-Timing header value (milliseconds)."""
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that reports its body encoding as the serialize timing."""
+
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding Server-Timing and X-Request-ID to API responses.
+
+    Reports db, validation and serialize (when recorded during the request)
+    and total, and writes a sampled structured access log line. Requests
+    that fail with a 5xx are always logged.
+    """
+
+    def __init__(self, app, path_prefix: str = "/api", sample_rate: Optional[float] = None):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.sample_rate = config.ACCESS_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        token = _timings.set(timings)
+        request_id = self._request_id(scope)
+        status_code = [500]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+                report = {**timings, "total": time.perf_counter() - start}
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", format_header(report).encode("latin-1")))
+                headers.append((REQUEST_ID_HEADER.lower().encode("latin-1"), request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _timings.reset(token)
+            self._log(scope, request_id, status_code[0], timings, time.perf_counter() - start)
+
+    @staticmethod
+    def _request_id(scope) -> str:
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    return candidate
+        return uuid.uuid4().hex
+
+    def _log(self, scope, request_id: str, status_code: int, timings: Dict[str, float], total: float):
+        if status_code < 500 and random.random() >= self.sample_rate:
+            return
+        if not access_logger.isEnabledFor(logging.INFO):
+            return
+        route = getattr(scope.get("route"), "path", None)
+        access_logger.info(json.dumps({
+            "request_id": request_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route,
+            "status": status_code,
+            "total_ms": round(total * 1000, 2),
+            **{f"{name}_ms": round(seconds * 1000, 2) for name, seconds in timings.items()},
+        }))
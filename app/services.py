@@ -1,11 +1,29 @@
 """Business logic services for the application."""
-import json
+import asyncio
+import datetime
 import logging
-from typing import Optional, List
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Iterator, Optional, List, Tuple
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
 from sqlmodel import Session, select
 from fastapi import HTTPException, status
 
-from app.database import Courier, Feedback, AdminUser, engine, verify_password
+from app import server_timing
+from app.change_feed import change_feed
+from app.coherence import coherence
+from app.dashboard_cache import dashboard_cache
+from app.dashboard_queries import CancellableQuery
+from app.database import Courier, DeadLetter, Feedback, AdminUser, engine, verify_and_update
+from app.metrics import COURIER_CACHE_REQUESTS
+from app.password_verifier import password_verifier
+from app.records import FeedbackFilters, FeedbackRecord, FeedbackRow
+from app.sync import retry_scheduler
+from app.utils import latest_by_order_id
+from config import config
 
 logger = logging.getLogger(__name__)
 
@@ -16,59 +34,151 @@ class FeedbackService:
     @staticmethod
     def create_feedback(feedback_data: dict) -> Feedback:
         """Create new feedback entry."""
-        # Validate rating
-        rating = feedback_data.get("rating", 0)
-        if not 1 <= rating <= 5:
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="Rating must be between 1 and 5."
-            )
+        with server_timing.timed("validation"):
+            record = FeedbackRecord.from_dict(feedback_data)
+
+            # Validate rating
+            if not 1 <= record.rating <= 5:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Rating must be between 1 and 5."
+                )
 
         try:
             with Session(engine) as session:
                 # Check for duplicate
-                order_id = feedback_data.get("order_id")
+                order_id = record.order_id
                 existing = session.exec(
-                    select(Feedback).where(Feedback.order_id == order_id)
+                    select(Feedback.id).where(Feedback.order_id == order_id)
                 ).first()
 
-                if existing:
+                if existing is not None:
                     raise HTTPException(
                         status_code=status.HTTP_409_CONFLICT,
                         detail="Feedback for this order already exists."
                     )
 
-                # Auto-flag low ratings for follow-up
-                rating = feedback_data.get("rating", 0)
-                needs_follow_up = rating <= 4
-
-                # Create feedback
-                feedback = Feedback(
-                    order_id=order_id,
-                    courier_id=feedback_data.get("courier_id"),
-                    rating=rating,
-                    comment=feedback_data.get("comment"),
-                    reasons=json.dumps(feedback_data.get("reasons", [])),
-                    publish_consent=feedback_data.get("publish_consent", False),
-                    needs_follow_up=needs_follow_up,
-                )
+                # Create feedback (low ratings are auto-flagged for follow-up)
+                feedback = Feedback(**record.to_params())
 
                 session.add(feedback)
                 session.commit()
+                change_feed.publish()
                 session.refresh(feedback)
 
-                logger.info(f"Feedback created for order {order_id}")
+                logger.info("Feedback created for order %s", order_id)
                 return feedback
 
         except HTTPException:
             raise
         except Exception as e:
-            logger.exception(f"Error creating feedback: {e}")
+            logger.exception("Error creating feedback: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create feedback"
             )
 
+    @staticmethod
+    def create_feedback_batch(records: List[FeedbackRecord]) -> List[dict]:
+        """
+        Create feedback entries from a flushed offline queue in one transaction.
+
+        Records are deduplicated by order_id (the latest wins) and checked
+        against existing rows with a single IN query. Items that failed
+        before are deferred until their backoff elapses. A failed
+        transaction is retried in halves so only the offending items are
+        penalised; each of those gets a per-item retry, or is dead-lettered
+        once its retry window is spent (see app.sync.RetryScheduler).
+
+        Returns:
+            One result per distinct order_id with a status of created,
+            duplicate, invalid, retry (with retry_after seconds) or
+            dead_letter
+        """
+        results = {}
+        pending = []
+        for record in latest_by_order_id(records):
+            is_valid, error_msg = record.validate()
+            if not is_valid:
+                results[record.order_id] = {
+                    "order_id": record.order_id,
+                    "status": "invalid",
+                    "detail": error_msg,
+                }
+                continue
+
+            retry_after = retry_scheduler.retry_after(record.order_id)
+            if retry_after > 0:
+                results[record.order_id] = {
+                    "order_id": record.order_id,
+                    "status": "retry",
+                    "retry_after": round(retry_after, 3),
+                }
+            else:
+                pending.append(record)
+
+        if pending:
+            FeedbackService._store_batch(pending, results)
+
+        return list(results.values())
+
+    @staticmethod
+    def _store_batch(records: List[FeedbackRecord], results: dict):
+        """
+        Store records in one transaction, filling in their results.
+
+        If the transaction fails, the batch is split in half and each half
+        tried on its own, so one bad item costs about 2*log2(n) extra
+        transactions instead of failing its whole batch. Errors from the
+        database itself (locked, unreachable) are not item-specific and
+        fail the batch as a whole without splitting.
+        """
+        try:
+            with Session(engine) as session:
+                order_ids = [record.order_id for record in records]
+                existing = set(session.exec(
+                    select(Feedback.order_id).where(Feedback.order_id.in_(order_ids))
+                ).all())
+
+                outcomes = {}
+                for record in records:
+                    if record.order_id in existing:
+                        outcomes[record.order_id] = "duplicate"
+                    else:
+                        session.add(Feedback(**record.to_params()))
+                        outcomes[record.order_id] = "created"
+
+                session.commit()
+        except Exception as e:
+            if len(records) > 1 and not isinstance(e, OperationalError):
+                logger.warning("Feedback batch of %d failed, retrying in halves: %s", len(records), e)
+                middle = len(records) // 2
+                FeedbackService._store_batch(records[:middle], results)
+                FeedbackService._store_batch(records[middle:], results)
+                return
+            logger.exception("Error creating feedback batch: %s", e)
+            for record in records:
+                delay = retry_scheduler.record_failure(record, str(e))
+                if delay is None:
+                    results[record.order_id] = {
+                        "order_id": record.order_id,
+                        "status": "dead_letter",
+                        "detail": "Failed to create feedback",
+                    }
+                else:
+                    results[record.order_id] = {
+                        "order_id": record.order_id,
+                        "status": "retry",
+                        "retry_after": round(delay, 3),
+                    }
+            return
+
+        change_feed.publish()
+        logger.info("Feedback batch stored: %d item(s)", len(records))
+        for record in records:
+            retry_scheduler.record_success(record.order_id)
+            results[record.order_id] = {"order_id": record.order_id, "status": outcomes[record.order_id]}
+
     @staticmethod
     def get_feedback(feedback_id: int) -> Feedback:
         """Get feedback by ID."""
@@ -91,33 +201,435 @@ class FeedbackService:
             return list(session.exec(query).all())
 
 
+class DeadLetterService:
+    """
+    Durable store for offline-queue items that ran out of sync retries.
+
+    The browser drops an item once the batch endpoint reports it as
+    dead-lettered, so from then on this table holds the only copy until an
+    admin retries or discards it.
+    """
+
+    @staticmethod
+    def store(record: FeedbackRecord, attempts: int, reason: str, failed_at: float):
+        """Keep a failed item, replacing an earlier dead letter for the same order."""
+        with Session(engine) as session:
+            entry = session.exec(
+                select(DeadLetter).where(DeadLetter.order_id == record.order_id)
+            ).first() or DeadLetter(order_id=record.order_id)
+            entry.attempts = attempts
+            entry.reason = reason
+            entry.record = record.to_json()
+            entry.failed_at = failed_at
+            session.add(entry)
+            session.commit()
+
+    @staticmethod
+    def list_dead_letters(limit: int = config.SYNC_DEAD_LETTER_SIZE) -> List[dict]:
+        """The most recent dead letters, newest first."""
+        with Session(engine) as session:
+            entries = session.exec(
+                select(DeadLetter).order_by(DeadLetter.failed_at.desc()).limit(limit)
+            ).all()
+            return [
+                {
+                    "order_id": entry.order_id,
+                    "attempts": entry.attempts,
+                    "reason": entry.reason,
+                    "failed_at": entry.failed_at,
+                    "record": FeedbackRecord.from_json(entry.record).to_dict(),
+                }
+                for entry in entries
+            ]
+
+    @staticmethod
+    def count() -> int:
+        """Number of dead letters stored."""
+        with Session(engine) as session:
+            return session.exec(select(func.count()).select_from(DeadLetter)).one()
+
+    @staticmethod
+    def retry() -> int:
+        """
+        Store every dead letter again through the batch path.
+
+        Items that are now created (or turn out to exist already) are
+        removed; the rest stay for another try.
+
+        Returns:
+            Number of dead letters resolved
+        """
+        with Session(engine) as session:
+            records = [FeedbackRecord.from_json(entry.record) for entry in session.exec(select(DeadLetter)).all()]
+        if not records:
+            return 0
+        results = FeedbackService.create_feedback_batch(records)
+        stored = [r["order_id"] for r in results if r["status"] in ("created", "duplicate")]
+        if stored:
+            with Session(engine) as session:
+                for entry in session.exec(select(DeadLetter).where(DeadLetter.order_id.in_(stored))).all():
+                    session.delete(entry)
+                session.commit()
+        return len(stored)
+
+    @staticmethod
+    def clear() -> int:
+        """Discard all dead letters, returning how many were removed."""
+        with Session(engine) as session:
+            entries = session.exec(select(DeadLetter)).all()
+            for entry in entries:
+                session.delete(entry)
+            session.commit()
+            return len(entries)
+
+
+class DashboardService:
+    """
+    Filtered, paged reads for the admin feedback table.
+
+    Filters, ordering and paging run in SQL, so the dashboard only ever
+    holds the window of rows on screen, whatever the table size. Results
+    are cached per normalized filters and page (see app.dashboard_cache).
+    """
+
+    # Rows per rows_since() read when tailing new feedback
+    TAIL_BATCH = 500
+
+    # Matches FeedbackRow.COLUMNS
+    _COLUMNS = (
+        Feedback.id,
+        Feedback.order_id,
+        Courier.name,
+        Feedback.rating,
+        Feedback.comment,
+        Feedback.reasons,
+        Feedback.publish_consent,
+        Feedback.needs_follow_up,
+        Feedback.created_at,
+    )
+
+    @staticmethod
+    def _parse_date(value: str) -> Optional[datetime.date]:
+        if not value:
+            return None
+        try:
+            return datetime.date.fromisoformat(value)
+        except (ValueError, TypeError):
+            logger.warning("Ignoring invalid filter date %r", value)
+            return None
+
+    @staticmethod
+    def _where(query, filters: FeedbackFilters):
+        from_date = DashboardService._parse_date(filters.from_date)
+        if from_date is not None:
+            query = query.where(Feedback.created_at >= datetime.datetime.combine(from_date, datetime.time.min))
+        to_date = DashboardService._parse_date(filters.to_date)
+        if to_date is not None:
+            # Inclusive of the whole end day
+            end = datetime.datetime.combine(to_date + datetime.timedelta(days=1), datetime.time.min)
+            query = query.where(Feedback.created_at < end)
+        if filters.ratings:
+            query = query.where(Feedback.rating.in_(filters.ratings))
+        return query
+
+    @staticmethod
+    def _rows_query(filters: FeedbackFilters):
+        query = select(*DashboardService._COLUMNS).join(Courier, Feedback.courier_id == Courier.id)
+        # id breaks created_at ties so pages never overlap or skip rows
+        return DashboardService._where(query, filters).order_by(Feedback.created_at.desc(), Feedback.id.desc())
+
+    @staticmethod
+    def _count_query(filters: FeedbackFilters):
+        query = select(func.count(Feedback.id)).join(Courier, Feedback.courier_id == Courier.id)
+        return DashboardService._where(query, filters)
+
+    @staticmethod
+    def _normalized(filters: FeedbackFilters) -> FeedbackFilters:
+        """Equivalent filters compare equal (cache key): dates parsed, ratings sorted."""
+        dates = [DashboardService._parse_date(value) for value in (filters.from_date, filters.to_date)]
+        return FeedbackFilters(
+            *(date.isoformat() if date else "" for date in dates),
+            ratings=tuple(sorted(set(filters.ratings))),
+        )
+
+    @staticmethod
+    def count(filters: FeedbackFilters) -> int:
+        """Number of feedback rows matching the filters."""
+        coherence.check(engine)
+        filters = DashboardService._normalized(filters)
+
+        def load() -> int:
+            with Session(engine) as session:
+                return session.exec(DashboardService._count_query(filters)).one()
+
+        return dashboard_cache.get_or_load(("count", filters), load)
+
+    @staticmethod
+    def page(filters: FeedbackFilters, offset: int, limit: int) -> List[FeedbackRow]:
+        """Rows `offset` to `offset + limit` of the filtered table, newest first."""
+        coherence.check(engine)
+        filters = DashboardService._normalized(filters)
+        offset = max(offset, 0)
+
+        def load() -> Tuple[FeedbackRow, ...]:
+            query = DashboardService._rows_query(filters).offset(offset).limit(limit)
+            with Session(engine) as session:
+                return tuple(FeedbackRow.from_row(row) for row in session.exec(query).all())
+
+        return list(dashboard_cache.get_or_load(("page", filters, offset, limit), load))
+
+    @staticmethod
+    def load_window(
+        filters: FeedbackFilters,
+        offset: int,
+        limit: int,
+        query: Optional[CancellableQuery] = None,
+        until_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> Tuple[int, List[FeedbackRow]]:
+        """
+        Count and first page in one session (a filter change).
+
+        Results are shared with other admin sessions through dashboard_cache
+        until the next feedback write.
+
+        Args:
+            query: Attached to the session so a newer filter change can
+                interrupt it (see app.dashboard_queries)
+            until_id: Only rows with id <= until_id (see high_water_id), so
+                rows written meanwhile arrive through rows_since exactly once
+            after_id: Only rows with id > after_id: what was written since a
+                window up to that id was loaded; the cost follows the new
+                rows, not the table
+
+        Returns:
+            (total matching rows, rows offset..offset + limit)
+        """
+        coherence.check(engine)
+        filters = DashboardService._normalized(filters)
+        offset = max(offset, 0)
+
+        def id_range(statement):
+            if after_id is not None:
+                statement = statement.where(Feedback.id > after_id)
+            return statement if until_id is None else statement.where(Feedback.id <= until_id)
+
+        def load() -> Tuple[int, Tuple[FeedbackRow, ...]]:
+            page = id_range(DashboardService._rows_query(filters)).offset(offset).limit(limit)
+            with Session(engine) as session, query.attached(session) if query else nullcontext():
+                total = session.exec(id_range(DashboardService._count_query(filters))).one()
+                return total, tuple(FeedbackRow.from_row(row) for row in session.exec(page).all())
+
+        total, rows = dashboard_cache.get_or_load(("window", filters, offset, limit, until_id, after_id), load)
+        return total, list(rows)
+
+    @staticmethod
+    def high_water_id() -> int:
+        """Largest feedback id written so far (0 when there is none)."""
+        coherence.check(engine)
+
+        def load() -> int:
+            with Session(engine) as session:
+                return session.exec(select(func.max(Feedback.id))).one() or 0
+
+        return dashboard_cache.get_or_load(("high_water",), load)
+
+    @staticmethod
+    def rows_since(filters: FeedbackFilters, after_id: int, limit: int = TAIL_BATCH) -> List[FeedbackRow]:
+        """
+        Up to `limit` filtered rows with id > after_id, oldest first.
+
+        Tails the table for live views: a caller passes the largest id it
+        has seen and repeats while a full batch comes back. Live sessions
+        woken by the same write share one cached result.
+        """
+        coherence.check(engine)
+        filters = DashboardService._normalized(filters)
+
+        def load() -> Tuple[FeedbackRow, ...]:
+            query = (
+                DashboardService._where(
+                    select(*DashboardService._COLUMNS).join(Courier, Feedback.courier_id == Courier.id),
+                    filters,
+                )
+                .where(Feedback.id > after_id)
+                .order_by(Feedback.id)
+                .limit(limit)
+            )
+            with Session(engine) as session:
+                return tuple(FeedbackRow.from_row(row) for row in session.exec(query).all())
+
+        return list(dashboard_cache.get_or_load(("since", filters, after_id, limit), load))
+
+    @staticmethod
+    async def wait_for_writes(sequence: int, timeout: Optional[float] = None) -> int:
+        """
+        Wait for a feedback write after change feed `sequence`.
+
+        Woken by change_feed as soon as this process commits feedback; no
+        query runs while nothing is written. When the wait times out it runs
+        the cross-worker coherence check (one PRAGMA read on SQLite), which
+        publishes other workers' writes to the feed.
+
+        Args:
+            timeout: Seconds to wait; defaults to the coherence interval,
+                so other workers' writes show up as fast as caches follow them
+
+        Returns:
+            The current sequence; equal to `sequence` if nothing was written
+        """
+        if timeout is None:
+            timeout = coherence.interval if coherence.interval > 0 else 15.0
+        current = await change_feed.wait(sequence, timeout)
+        if current == sequence:
+            coherence.check(engine)
+            current = change_feed.sequence
+        return current
+
+    @staticmethod
+    def iter_rows(filters: FeedbackFilters, batch_size: int = 500) -> Iterator[FeedbackRow]:
+        """All filtered rows, fetched from the cursor in batches (CSV export)."""
+        query = DashboardService._rows_query(filters).execution_options(yield_per=batch_size)
+        with Session(engine) as session:
+            for row in session.exec(query):
+                yield FeedbackRow.from_row(row)
+
+
 class CourierService:
     """Service for courier operations."""
 
+    # courier_id -> (expires_at, courier). Couriers rarely change and are
+    # looked up on every feedback page load, so found couriers are kept in
+    # memory for COURIER_CACHE_TTL seconds (misses are not cached).
+    _cache: "OrderedDict[int, Tuple[float, Courier]]" = OrderedDict()
+    _cache_lock = threading.Lock()
+
     @staticmethod
-    def get_courier(courier_id: int) -> Courier:
-        """Get courier by ID."""
+    def find_courier(courier_id: int) -> Optional[Courier]:
+        """Get courier by ID through the in-process cache, or None."""
+        coherence.check(engine)
+        now = time.monotonic()
+        cached = CourierService._cache.get(courier_id)
+        if cached is not None and cached[0] > now:
+            COURIER_CACHE_REQUESTS.labels("hit").inc()
+            return cached[1]
+
+        COURIER_CACHE_REQUESTS.labels("miss").inc()
         with Session(engine) as session:
             courier = session.get(Courier, courier_id)
-            if not courier:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Courier not found"
-                )
-            return courier
+
+        if courier is not None:
+            CourierService._cache_put([courier], now)
+        return courier
+
+    @staticmethod
+    def prime_cache(limit: int = config.COURIER_CACHE_SIZE) -> int:
+        """
+        Load up to `limit` couriers into the cache (startup warmup).
+
+        Returns:
+            Number of couriers cached
+        """
+        with Session(engine) as session:
+            couriers = session.exec(select(Courier).order_by(Courier.id).limit(limit)).all()
+        CourierService._cache_put(couriers, time.monotonic())
+        return len(couriers) if config.COURIER_CACHE_TTL > 0 else 0
+
+    @staticmethod
+    def _cache_put(couriers: List[Courier], now: float):
+        if config.COURIER_CACHE_TTL <= 0:
+            return
+        with CourierService._cache_lock:
+            for courier in couriers:
+                CourierService._cache[courier.id] = (now + config.COURIER_CACHE_TTL, courier)
+                CourierService._cache.move_to_end(courier.id)
+            while len(CourierService._cache) > config.COURIER_CACHE_SIZE:
+                CourierService._cache.popitem(last=False)
+
+    @staticmethod
+    def clear_cache():
+        """Drop all cached couriers (e.g. after couriers are edited)."""
+        with CourierService._cache_lock:
+            CourierService._cache.clear()
+
+    @staticmethod
+    def get_courier(courier_id: int) -> Courier:
+        """Get courier by ID."""
+        courier = CourierService.find_courier(courier_id)
+        if not courier:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Courier not found"
+            )
+        return courier
+
+
+# Every feedback write makes cached dashboard results stale; feedback
+# writes by other workers are announced here too, so live views follow
+# them. Dashboard rows show courier names, so courier writes drop both.
+change_feed.subscribe(dashboard_cache.bump)
+coherence.subscribe(change_feed.publish, "feedback")
+coherence.subscribe(CourierService.clear_cache, "courier")
+coherence.subscribe(dashboard_cache.bump, "courier")
 
 
 class AuthService:
     """Service for authentication operations."""
 
     @staticmethod
-    def authenticate(username: str, password: str) -> Optional[AdminUser]:
-        """Authenticate admin user."""
+    def find_admin(username: str) -> Optional[AdminUser]:
+        """Get an admin user by username, or None."""
         with Session(engine) as session:
-            admin = session.exec(
+            return session.exec(
                 select(AdminUser).where(AdminUser.username == username)
             ).first()
 
-            if admin and verify_password(password, admin.password_hash):
-                return admin
+    @staticmethod
+    def authenticate(username: str, password: str) -> Optional[AdminUser]:
+        """
+        Authenticate admin user.
+
+        Blocks for the bcrypt check; on the event loop use
+        authenticate_async instead.
+        """
+        admin = AuthService.find_admin(username)
+        if admin is None:
             return None
+        matches, new_hash = verify_and_update(password, admin.password_hash)
+        if new_hash:
+            AuthService._store_rehash(admin, new_hash)
+        return admin if matches else None
+
+    @staticmethod
+    async def authenticate_async(username: str, password: str, client_ip: str = "") -> Optional[AdminUser]:
+        """
+        Authenticate admin user without blocking the event loop.
+
+        The bcrypt check runs on the shared password verifier pool.
+
+        Raises:
+            AuthRejectedError: Too many concurrent attempts for the username
+                or IP, or the verifier queue is full
+        """
+        admin = await asyncio.to_thread(AuthService.find_admin, username)
+        if admin is None:
+            return None
+        matches, new_hash = await password_verifier.verify_and_update(
+            password, admin.password_hash, username=username, client_ip=client_ip,
+        )
+        if new_hash:
+            await asyncio.to_thread(AuthService._store_rehash, admin, new_hash)
+        return admin if matches else None
+
+    @staticmethod
+    def _store_rehash(admin: AdminUser, new_hash: str):
+        """Save a password hash upgraded to the configured bcrypt cost."""
+        with Session(engine) as session:
+            stored = session.get(AdminUser, admin.id)
+            if stored is None:
+                return
+            stored.password_hash = new_hash
+            session.add(stored)
+            session.commit()
+        admin.password_hash = new_hash
+        logger.info("Rehashed password for admin %s at cost %d", admin.username, config.BCRYPT_ROUNDS)
@@ -0,0 +1,126 @@
+"""Startup phases: schema check, warmup and readiness."""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app import database
+from app.database import AdminUser, Courier, Feedback
+from app.services import CourierService
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# The duplicate check run on every submit (see FeedbackState)
+_DUPLICATE_CHECK = text("SELECT 1 FROM feedback WHERE order_id = :order_id")
+
+
+class Readiness:
+    """
+    Startup progress reported by /ready.
+
+    The app serves requests (liveness) as soon as the schema phase is done;
+    it reports ready only after warmup, so load balancers route customers
+    to it once its pool and caches are warm.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.schema_changed: Optional[bool] = None
+        self.phases: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a startup phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def snapshot(self) -> Dict:
+        """Readiness and per-phase timings in milliseconds."""
+        return {
+            "status": "ready" if self.ready else "starting",
+            "schema_changed": self.schema_changed,
+            "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()},
+        }
+
+    def reset(self):
+        """Back to not ready (tests, restarts)."""
+        self.ready = False
+        self.schema_changed = None
+        self.phases.clear()
+
+
+readiness = Readiness()
+
+
+def prepare_schema():
+    """Create tables and seed data unless the schema fingerprint is unchanged."""
+    with readiness.phase("schema"):
+        readiness.schema_changed = database.create_db_and_tables()
+
+
+def warmup(connections: int = config.WARMUP_CONNECTIONS):
+    """
+    Prime the connection pool, statement caches and courier cache, then
+    mark the app ready.
+
+    Args:
+        connections: Pooled connections to open (capped at the pool size)
+    """
+    engine = database.engine
+
+    with readiness.phase("pool"):
+        pool_size = getattr(engine.pool, "size", lambda: connections)()
+        opened = []
+        try:
+            for _ in range(min(connections, pool_size)):
+                connection = engine.connect()
+                opened.append(connection)
+                # Also primes the driver's per-connection statement cache
+                connection.execute(_DUPLICATE_CHECK, {"order_id": ""})
+        finally:
+            for connection in opened:
+                connection.close()
+
+    with readiness.phase("statements"):
+        # Compile the ORM statements used by submit, login and the dashboard
+        with Session(engine) as session:
+            session.get(Courier, 0)
+            session.exec(select(AdminUser).where(AdminUser.username == "")).first()
+            session.exec(select(Feedback).order_by(Feedback.created_at.desc()).limit(1)).first()
+
+    with readiness.phase("couriers"):
+        cached = CourierService.prime_cache()
+
+    readiness.ready = True
+    logger.info(
+        "Ready in %.0fms (%s; %d connection(s), %d courier(s) cached)",
+        sum(readiness.phases.values()) * 1000,
+        ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in readiness.phases.items()),
+        len(opened),
+        cached,
+    )
+
+
+async def start():
+    """
+    Run the schema phase before serving, then warm up in the background.
+
+    Call from the app's startup hook.
+    """
+    await asyncio.to_thread(prepare_schema)
+    readiness._task = asyncio.create_task(asyncio.to_thread(warmup))
+    readiness._task.add_done_callback(_report_warmup_failure)
+
+
+def _report_warmup_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Warmup failed; /ready stays unavailable", exc_info=task.exception())
@@ -1,117 +1,134 @@
 import reflex as rx
 from typing import Optional
-import bcrypt
-from sqlmodel import Session, select, text
-from ..database import AdminUser, Feedback, Courier, engine
+from ..admin_tokens import admin_tokens
+from ..change_feed import change_feed
+from ..dashboard_queries import DASHBOARD_FILTER_CHANGES, DASHBOARD_QUERIES, QueryCancelled, dashboard_queries
+from ..loop_monitor import state_lock, track_background
+from ..password_verifier import AuthRejectedError
+from ..records import FeedbackFilters, FeedbackRow
+from ..services import AuthService, DashboardService, DeadLetterService
+from ..sync import retry_scheduler
+import asyncio
 import csv
 import io
 import datetime
 import logging
-import json
+import time
+
+from config import config
 
 
 logger = logging.getLogger(__name__)
 
+# Feedback table geometry (see pages/admin_dashboard.py). Rows have a fixed
+# height so a scroll offset maps straight to a row index.
+ROW_HEIGHT_PX = 56
+VIEWPORT_ROWS = 12
+FEEDBACK_VIEWPORT_ID = "feedback-viewport"
+
 
 class AdminState(rx.State):
     is_authenticated: bool = False
+    # Signed session token (see app.admin_tokens); the cookie lets new tabs
+    # and reconnects skip the bcrypt login
+    admin_token: str = rx.Cookie("", name="admin_token", max_age=config.ADMIN_TOKEN_TTL, same_site="strict")
     username: str = ""
-    password: str = ""
     error_message: str = ""
-    feedbacks: list[dict] = []
     filter_from_date: str = ""
     filter_to_date: str = ""
     filter_ratings: list[int] = []
+    sync_metrics: dict[str, int] = {}
+    dead_letters: list[dict] = []
+    # Windowed feedback table: only rows [window_start, window_start +
+    # len(_window)) of the filtered result are loaded and rendered. The
+    # rows are backend-only; the client receives visible_feedbacks.
+    total_rows: int = 0
+    window_start: int = 0
+    _window: list[FeedbackRow] = []
+    # Bumped on every filter change; a refresh for an older value is stale
+    _query_generation: int = 0
+    # Live updates: the table holds every matching row with id <= _last_id;
+    # newer rows are prepended as they are written (see watch_feedback)
+    live: bool = False
+    _last_id: int = 0
+    _live_generation: int = 0
+    # Filters the table holds rows for; loading again with the same filters
+    # only fetches rows past _last_id (see load_feedback)
+    _loaded_filters: Optional[FeedbackFilters] = None
 
-    @rx.var
-    def filtered_feedbacks(self) -> list[dict]:
-        """Filter feedbacks based on current filter settings."""
-        feedbacks = self.feedbacks
-
-        if self.filter_from_date:
-            try:
-                from_date = datetime.datetime.fromisoformat(
-                    self.filter_from_date
-                ).date()
-                feedbacks = [
-                    f
-                    for f in feedbacks
-                    if datetime.datetime.fromisoformat(f["created_at"]).date()
-                    >= from_date
-                ]
-            except (ValueError, TypeError) as e:
-                logger.exception(f"Error parsing from_date: {e}")
-
-        if self.filter_to_date:
-            try:
-                to_date = datetime.datetime.fromisoformat(self.filter_to_date).date()
-                feedbacks = [
-                    f
-                    for f in feedbacks
-                    if datetime.datetime.fromisoformat(f["created_at"]).date()
-                    <= to_date
-                ]
-            except (ValueError, TypeError) as e:
-                logger.exception(f"Error parsing to_date: {e}")
-
-        if self.filter_ratings:
-            feedbacks = [f for f in feedbacks if f["rating"] in self.filter_ratings]
-
-        return feedbacks
-
-    @rx.var
-    def parsed_feedbacks(self) -> list[dict]:
-        """Parse JSON reasons field for display."""
-        parsed_data = []
-        for feedback in self.filtered_feedbacks:
-            new_feedback = feedback.copy()
-            try:
-                reasons_str = new_feedback.get("reasons", "[]")
-                new_feedback["reasons"] = json.loads(reasons_str) if reasons_str else []
-            except (json.JSONDecodeError, TypeError) as e:
-                logger.exception(f"Error parsing reasons: {e}")
-                new_feedback["reasons"] = []
-            parsed_data.append(new_feedback)
-        return parsed_data
-
-    def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify password using bcrypt."""
-        try:
-            return bcrypt.checkpw(
-                plain_password.encode("utf-8"),
-                hashed_password.encode("utf-8")
-            )
-        except Exception as e:
-            logger.error(f"Password verification error: {e}")
-            return False
+    def _update(self, **values):
+        """Assign only changed values; every assignment is sent in the next delta."""
+        for name, value in values.items():
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+
+    def _filters(self) -> FeedbackFilters:
+        return FeedbackFilters(self.filter_from_date, self.filter_to_date, tuple(sorted(self.filter_ratings)))
+
+    @rx.var(deps=["_window"], auto_deps=False)
+    def visible_feedbacks(self) -> list[dict]:
+        """The loaded window of filtered feedback, for display."""
+        return [row.to_dict() for row in self._window]
+
+    @rx.var(deps=["window_start"], auto_deps=False)
+    def top_spacer_px(self) -> int:
+        """Height standing in for the unloaded rows above the window."""
+        return self.window_start * ROW_HEIGHT_PX
+
+    @rx.var(deps=["total_rows", "window_start", "_window"], auto_deps=False)
+    def bottom_spacer_px(self) -> int:
+        """Height standing in for the unloaded rows below the window."""
+        return max(self.total_rows - self.window_start - len(self._window), 0) * ROW_HEIGHT_PX
+
+    def _authorized(self) -> bool:
+        """Check the session token (no DB or bcrypt work) and sync is_authenticated."""
+        claims = admin_tokens.verify(self.admin_token)
+        self._update(is_authenticated=claims is not None)
+        if claims is not None:
+            self._update(username=claims["sub"])
+        return self.is_authenticated
 
     @rx.event
     async def login(self, form_data: dict):
         """Handle admin login."""
         self.username = form_data.get("username", "")
-        self.password = form_data.get("password", "")
+        # Never stored in state, so it is not kept or sent back to the client
+        password = form_data.get("password", "")
 
-        with Session(engine) as session:
-            admin_user = session.exec(
-                select(AdminUser).where(AdminUser.username == self.username)
-            ).first()
+        try:
+            admin_user = await AuthService.authenticate_async(
+                self.username, password, client_ip=self.router.session.client_ip,
+            )
+        except AuthRejectedError:
+            self.error_message = "Too many login attempts. Please try again shortly."
+            return
 
-        if admin_user and self._verify_password(self.password, admin_user.password_hash):
+        if admin_user:
+            self.admin_token = admin_tokens.issue(admin_user.username)
             self.is_authenticated = True
             self.error_message = ""
-            self.password = ""  # Clear password from state
             return rx.redirect("/admin/dashboard")
         else:
             self.error_message = "Invalid username or password."
-            self.password = ""
 
     @rx.event
     def logout(self):
         """Handle admin logout."""
+        admin_tokens.revoke(self.admin_token)
+        self.admin_token = ""
         self.is_authenticated = False
         self.username = ""
-        self.password = ""
-        self.feedbacks = []
+        self._query_generation += 1
+        dashboard_queries.cancel(self.router.session.client_token)
+        self._live_generation += 1
+        self.live = False
+        self._last_id = 0
+        self._loaded_filters = None
+        self.total_rows = 0
+        self.window_start = 0
+        self._window = []
+        self.sync_metrics = {}
+        self.dead_letters = []
         self.filter_from_date = ""
         self.filter_to_date = ""
         self.filter_ratings = []
@@ -121,38 +138,276 @@ class AdminState(rx.State):
     @rx.event
     async def check_auth_and_load(self):
         """Check authentication and load feedback data."""
-        if not self.is_authenticated:
+        if not self._authorized():
             return rx.redirect("/admin")
 
         # Load feedback data
-        await self.load_feedback()
+        scroll = await self.load_feedback()
+        self.load_sync_status()
+        return [scroll, AdminState.watch_feedback]
 
     @rx.event
-    async def load_feedback(self):
-        """Load feedback data from database."""
+    async def load_feedback(self, full: bool = False):
+        """
+        Bring the feedback table up to date.
+
+        When the table already holds the current filters (re-entering the
+        dashboard, a page refresh), only feedback written since _last_id is
+        counted and fetched, and merged on top; the cost follows new
+        feedback, not history. Otherwise, or with full=True, the count and
+        first window are loaded from scratch.
+        """
+        if not self._authorized():
+            return rx.redirect("/admin")
+        filters = self._filters()
         try:
-            with Session(engine) as session:
-                stmt = text("""
-                    SELECT
-                        f.id,
-                        f.order_id,
-                        c.name as courier_name,
-                        f.rating,
-                        f.comment,
-                        f.reasons,
-                        f.publish_consent,
-                        f.needs_follow_up,
-                        f.created_at
-                    FROM feedback f
-                    JOIN courier c ON f.courier_id = c.id
-                    ORDER BY f.created_at DESC
-                """)
-                results = session.exec(stmt).mappings().all()
-                self.feedbacks = [dict(row) for row in results]
-                logger.info(f"Loaded {len(self.feedbacks)} feedback entries")
+            if not full and filters == self._loaded_filters:
+                return self._catch_up(filters)
+            last_id, total, rows = self._first_window(filters)
         except Exception as e:
-            logger.exception(f"Error loading feedback: {e}")
-            self.feedbacks = []
+            logger.exception("Error loading feedback: %s", e)
+            filters, last_id, total, rows = None, self._last_id, 0, []
+        return self._show_first_window(filters, last_id, total, rows)
+
+    @rx.event
+    async def reload_feedback(self):
+        """Reload the table from scratch."""
+        return await self.load_feedback(full=True)
+
+    def _catch_up(self, filters: FeedbackFilters):
+        """Merge feedback written since _last_id into the loaded table."""
+        last_id = DashboardService.high_water_id()
+        if last_id < self._last_id:
+            # Feedback was removed or the database restored: the ids no
+            # longer describe what the table holds
+            return self._show_first_window(filters, *self._first_window(filters))
+        if last_id > self._last_id:
+            count, rows = DashboardService.load_window(
+                filters, 0, config.DASHBOARD_WINDOW_ROWS, until_id=last_id, after_id=self._last_id,
+            )
+            self._merge_new(count, rows, last_id)
+            logger.info("Feedback table caught up: %d new matching entries", count)
+        # A remounted viewport starts at the top; put it back on the window
+        return rx.call_script(
+            f"document.getElementById('{FEEDBACK_VIEWPORT_ID}')?.scrollTo(0, {self.window_start * ROW_HEIGHT_PX})"
+        )
+
+    @staticmethod
+    def _first_window(filters: FeedbackFilters, query=None) -> tuple[int, int, list[FeedbackRow]]:
+        """High-water id, then the count and first window up to it."""
+        last_id = DashboardService.high_water_id()
+        total, rows = DashboardService.load_window(
+            filters, 0, config.DASHBOARD_WINDOW_ROWS, query, until_id=last_id,
+        )
+        return last_id, total, rows
+
+    def _show_first_window(
+        self, filters: Optional[FeedbackFilters], last_id: int, total: int, rows: list[FeedbackRow],
+    ):
+        # Rows are frozen dataclasses, so an unchanged window is not resent
+        self._update(total_rows=total, window_start=0, _window=rows)
+        self._last_id = last_id
+        self._loaded_filters = filters
+        logger.info("Feedback table has %d matching entries", total)
+        return rx.call_script(f"document.getElementById('{FEEDBACK_VIEWPORT_ID}')?.scrollTo(0, 0)")
+
+    def _filters_changed(self):
+        """Invalidate in-flight table queries and schedule a refresh."""
+        DASHBOARD_FILTER_CHANGES.inc()
+        self._query_generation += 1
+        return AdminState.refresh_table
+
+    @rx.event(background=True)
+    @track_background
+    async def refresh_table(self):
+        """
+        Reload the table for the current filters.
+
+        Runs in the background so a newer filter change can interrupt the
+        query for this one (see app.dashboard_queries); a result for a
+        superseded filter state is discarded.
+        """
+        async with state_lock(self):
+            if not self._authorized():
+                return rx.redirect("/admin")
+            generation = self._query_generation
+            filters = self._filters()
+            client = self.router.session.client_token
+
+        try:
+            last_id, total, rows = await dashboard_queries.run(
+                client, lambda query: AdminState._first_window(filters, query),
+            )
+        except QueryCancelled:
+            return
+        except Exception as e:
+            logger.exception("Error loading feedback: %s", e)
+            last_id, total, rows = None, 0, []
+
+        async with state_lock(self):
+            if generation != self._query_generation:
+                DASHBOARD_QUERIES.labels("discarded").inc()
+                return
+            if last_id is None:
+                return self._show_first_window(None, self._last_id, total, rows)
+            return self._show_first_window(filters, last_id, total, rows)
+
+    @rx.event(background=True)
+    @track_background
+    async def watch_feedback(self):
+        """
+        Follow new feedback while the dashboard is open.
+
+        Sleeps until feedback is written (see DashboardService.wait_for_writes),
+        then reads only rows newer than _last_id and prepends the matching
+        ones; total_rows grows by the same count. Stops after
+        DASHBOARD_LIVE_SECONDS, on logout, when the page unmounts or when a
+        newer watcher starts for this session.
+        """
+        async with state_lock(self):
+            if not self._authorized():
+                return
+            self._live_generation += 1
+            generation = self._live_generation
+            self.live = True
+
+        deadline = time.monotonic() + config.DASHBOARD_LIVE_SECONDS
+        # Taken before the first read, so a write during it wakes the loop again
+        sequence = change_feed.sequence
+        changed, queried = True, None
+        try:
+            while time.monotonic() < deadline:
+                async with state_lock(self):
+                    if generation != self._live_generation or not self._authorized():
+                        return
+                    current = (self._filters(), self._last_id)
+
+                # A reload moves _last_id, so it is followed even without a write
+                if changed or current != queried:
+                    rows = await asyncio.to_thread(DashboardService.rows_since, *current)
+                    async with state_lock(self):
+                        if generation != self._live_generation:
+                            return
+                        # Dropped if the table was reloaded while reading
+                        shift = None
+                        if rows and current == (self._filters(), self._last_id):
+                            shift = self._prepend(rows)
+                        queried = (current[0], self._last_id)
+                    changed = len(rows) == DashboardService.TAIL_BATCH
+                    if shift is not None:
+                        yield shift
+                    if changed:
+                        continue
+
+                latest = await DashboardService.wait_for_writes(sequence)
+                changed, sequence = latest != sequence, latest
+        finally:
+            async with state_lock(self):
+                if generation == self._live_generation:
+                    self.live = False
+
+    def _prepend(self, rows: list[FeedbackRow]):
+        """Add rows newer than the table, oldest first as rows_since returns them."""
+        return self._merge_new(len(rows), rows[::-1], rows[-1].id)
+
+    def _merge_new(self, count: int, rows: list[FeedbackRow], last_id: int):
+        """
+        Put `count` matching rows with ids up to `last_id` on top of the table.
+
+        `rows` are the newest of them, newest first; at most a window's
+        worth is needed, since only a window is kept. Returns a script that
+        keeps a scrolled-down viewport on the rows it was showing; at the
+        top, the new rows come into view.
+        """
+        self._last_id = last_id
+        self.total_rows += count
+        if self.window_start == 0:
+            self._window = (rows + self._window)[:config.DASHBOARD_WINDOW_ROWS]
+        else:
+            self.window_start += count
+        return rx.call_script(
+            f"(v => v && v.scrollTop > 0 && v.scrollBy(0, {count * ROW_HEIGHT_PX}))"
+            f"(document.getElementById('{FEEDBACK_VIEWPORT_ID}'))"
+        )
+
+    @rx.event
+    def stop_watching(self):
+        """Stop following new feedback (the dashboard was left)."""
+        self._live_generation += 1
+        self.live = False
+
+    def _load_window(self, start: int):
+        self._update(
+            window_start=start,
+            _window=DashboardService.page(self._filters(), start, config.DASHBOARD_WINDOW_ROWS),
+        )
+
+    @rx.event
+    def scroll_table(self, scroll_top: float):
+        """
+        Move the loaded window to follow the table viewport.
+
+        Nothing is fetched while the visible rows stay inside the window;
+        otherwise the window is re-centred on them.
+        """
+        if not self._authorized():
+            return rx.redirect("/admin")
+        first = max(int((scroll_top or 0) // ROW_HEIGHT_PX), 0)
+        last = min(first + VIEWPORT_ROWS, self.total_rows)
+        if self.window_start <= first and last <= self.window_start + len(self._window):
+            return
+        overscan = max((config.DASHBOARD_WINDOW_ROWS - VIEWPORT_ROWS) // 2, 0)
+        start = min(max(first - overscan, 0), max(self.total_rows - config.DASHBOARD_WINDOW_ROWS, 0))
+        try:
+            self._load_window(start)
+        except Exception as e:
+            logger.exception("Error loading feedback rows: %s", e)
+
+    @rx.event
+    def load_sync_status(self):
+        """Load offline queue retry metrics and dead-lettered items."""
+        if not self._authorized():
+            return rx.redirect("/admin")
+        self.sync_metrics = retry_scheduler.metrics()
+        self.dead_letters = [
+            {
+                "order_id": item["order_id"],
+                "attempts": item["attempts"],
+                "reason": item["reason"],
+                "failed_at": datetime.datetime.fromtimestamp(item["failed_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            for item in DeadLetterService.list_dead_letters()
+        ]
+
+    @rx.event
+    def retry_dead_letters(self):
+        """Try to store dead-lettered items again; those that succeed are removed."""
+        if not self._authorized():
+            return rx.redirect("/admin")
+        count = DeadLetterService.retry()
+        logger.info("Stored %d dead-lettered feedback item(s) on retry", count)
+        self.load_sync_status()
+
+    @rx.event
+    def clear_dead_letters(self):
+        """Discard dead-lettered items after they have been handled."""
+        if not self._authorized():
+            return rx.redirect("/admin")
+        count = DeadLetterService.clear()
+        logger.info("Cleared %d dead-lettered feedback item(s)", count)
+        self.load_sync_status()
+
+    @rx.event
+    def update_from_date(self, value: str):
+        """Set the start date filter and reload the table."""
+        self.filter_from_date = value
+        return self._filters_changed()
+
+    @rx.event
+    def update_to_date(self, value: str):
+        """Set the end date filter and reload the table."""
+        self.filter_to_date = value
+        return self._filters_changed()
 
     @rx.event
     def toggle_rating_filter(self, rating: int):
@@ -161,6 +416,7 @@ class AdminState(rx.State):
             self.filter_ratings.remove(rating)
         else:
             self.filter_ratings.append(rating)
+        return self._filters_changed()
 
     @rx.event
     def reset_filters(self):
@@ -168,10 +424,13 @@ class AdminState(rx.State):
         self.filter_from_date = ""
         self.filter_to_date = ""
         self.filter_ratings = []
+        return self._filters_changed()
 
     @rx.event
     def get_csv(self):
         """Export filtered feedback as CSV."""
+        if not self._authorized():
+            return rx.redirect("/admin")
         output = io.StringIO()
         writer = csv.writer(output)
 
@@ -190,20 +449,8 @@ class AdminState(rx.State):
         writer.writerow(headers)
 
         # Write data
-        for feedback in self.filtered_feedbacks:
-            writer.writerow(
-                [
-                    feedback.get("id", ""),
-                    feedback.get("order_id", ""),
-                    feedback.get("courier_name", ""),
-                    feedback.get("rating", ""),
-                    feedback.get("comment", ""),
-                    feedback.get("reasons", ""),
-                    feedback.get("publish_consent", ""),
-                    feedback.get("needs_follow_up", ""),
-                    feedback.get("created_at", ""),
-                ]
-            )
+        # Streamed from the database; the table itself only holds a window
+        writer.writerows(row.to_csv_row() for row in DashboardService.iter_rows(self._filters()))
 
         # FIXED: Return download with proper encoding
         csv_data = output.getvalue()
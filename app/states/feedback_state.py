@@ -2,17 +2,33 @@
 import reflex as rx
 from typing import Optional, cast
 from sqlalchemy import text
-import json
 import asyncio
 import logging
+import time
 from datetime import datetime
 
+from app.change_feed import change_feed
 from app.database import Courier, engine
-from app.utils import QueueManager, validate_feedback_data, generate_request_id
+from app.loop_monitor import state_lock, track_background
+from app.metrics import submit_timings
+from app.records import FeedbackRecord
+from app.offline_queue import OfflineQueueBridge
+from app.services import CourierService
+from app.utils import validate_feedback_data, generate_request_id
 from config import config
 
 logger = logging.getLogger(__name__)
 
+# A flush whose result never arrived (script error, dropped connection) stops
+# blocking new flushes after this long
+FLUSH_TIMEOUT_SECONDS = 60
+
+
+async def _simulated_delay(seconds: float):
+    """Sleep only when SIMULATE_NETWORK_DELAY is enabled (development)."""
+    if config.SIMULATE_NETWORK_DELAY:
+        await asyncio.sleep(seconds)
+
 
 class FeedbackState(rx.State):
     """State management for feedback submission with offline queue."""
@@ -36,10 +52,12 @@ class FeedbackState(rx.State):
     toast_type: str = "info"  # info, success, warning, error
     show_toast: bool = False
 
-    # Queue management (mode-dependent)
-    pending_queue: list[dict] = []
+    # Queue management (mode-dependent). Queued items live in the browser
+    # (see app/offline_queue.py); only their count is mirrored here.
+    pending_count: int = 0
     jazz_initialized: bool = False
     syncing: bool = False
+    _syncing_since: float = 0.0
 
     # Mode indicator
     app_mode: str = config.APP_MODE
@@ -54,18 +72,13 @@ class FeedbackState(rx.State):
         """Validate form completeness."""
         return self.rating > 0 and self.comment_length <= 500
 
-    @rx.var
-    def pending_count(self) -> int:
-        """Get count of pending offline submissions."""
-        return len(self.pending_queue)
-
     @rx.var
     def can_submit(self) -> bool:
         """Check if submission is allowed."""
         return (
             self.is_form_valid
             and self.submission_status not in ["submitting", "syncing"]
-            and len(self.pending_queue) < config.MAX_QUEUE_SIZE
+            and self.pending_count < config.MAX_QUEUE_SIZE
         )
 
     @rx.var
@@ -86,15 +99,12 @@ class FeedbackState(rx.State):
     @rx.event
     async def on_load(self):
         """Handle page load, get URL params, and fetch courier info."""
-        # Check online status
-        self.is_online = True  # Will be updated by JS
-
         # Parse URL parameters
         self.order_id = self.router.page.params.get("order_id", "")
         try:
             self.courier_id = int(self.router.page.params.get("courier_id", "0"))
         except (ValueError, TypeError) as e:
-            logger.exception(f"Invalid courier_id parameter: {e}")
+            logger.exception("Invalid courier_id parameter: %s", e)
             self.courier_id = 0
             self.submission_status = "error"
             self.error_message = "Invalid Courier ID."
@@ -117,35 +127,41 @@ class FeedbackState(rx.State):
         # Load courier info
         yield FeedbackState.check_existing_feedback
 
-        # Process queue in background
+        # Install background delivery and report the real online status;
+        # update_online_status then flushes anything queued earlier
         if config.ENABLE_OFFLINE_MODE:
-            yield FeedbackState.process_queue
+            yield rx.call_script(
+                OfflineQueueBridge.install(),
+                callback=FeedbackState.update_online_status,
+            )
 
     @rx.event(background=True)
+    @track_background
     async def init_jazz(self):
         """Initialize Jazz system - PLACEHOLDER."""
-        async with self:
+        async with state_lock(self):
             if self.jazz_initialized:
                 return
 
-            logger.info(f"🎺 Initializing Jazz (mode: {config.APP_MODE})...")
+            logger.info("🎺 Initializing Jazz (mode: %s)...", config.APP_MODE)
 
             # FIXED: This is a placeholder - actual Jazz init needs proper implementation
             # Reflex doesn't have call_script method - this would need custom JS interop
             try:
                 # Simulate initialization
-                await asyncio.sleep(0.5)
+                await _simulated_delay(0.5)
                 self.jazz_initialized = True
                 logger.info("✅ Jazz initialized (simulated)")
                 self._show_toast("Jazz sync ready", "success")
             except Exception as e:
-                logger.exception(f"Jazz initialization error: {e}")
+                logger.exception("Jazz initialization error: %s", e)
                 self._show_toast(f"Jazz error: {str(e)}", "error")
 
     @rx.event(background=True)
+    @track_background
     async def check_existing_feedback(self):
         """Check if feedback exists and load courier info."""
-        async with self:
+        async with state_lock(self):
             # FIXED: Only check backend in non-Jazz-only modes
             if config.JAZZ_ONLY_MODE:
                 logger.info("Jazz-only mode - skipping database check")
@@ -179,23 +195,17 @@ class FeedbackState(rx.State):
                     else:
                         self.submission_status = "idle"
 
-                        # Fetch courier information
-                        courier_result = session.execute(
-                            text(
-                                "SELECT id, name, phone, contact_link FROM courier WHERE id = :courier_id"
-                            ),
-                            {"courier_id": self.courier_id},
-                        )
-                        courier_data = courier_result.first()
+                        # Fetch courier information (cached in-process)
+                        courier_data = CourierService.find_courier(self.courier_id)
 
                         if courier_data:
                             self.courier = cast(
                                 Courier,
                                 {
-                                    "id": courier_data[0],
-                                    "name": courier_data[1],
-                                    "phone": courier_data[2],
-                                    "contact_link": courier_data[3],
+                                    "id": courier_data.id,
+                                    "name": courier_data.name,
+                                    "phone": courier_data.phone,
+                                    "contact_link": courier_data.contact_link,
                                 },
                             )
                         else:
@@ -240,186 +250,202 @@ class FeedbackState(rx.State):
     @rx.event
     def update_online_status(self, is_online: bool):
         """Update online status from JavaScript."""
-        self.is_online = is_online
-        if is_online and self.pending_count > 0:
-            self._show_toast(f"Back online! Syncing {self.pending_count} pending items...", "info")
+        self.is_online = bool(is_online)
+        if self.is_online:
+            if self.pending_count > 0:
+                self._show_toast(f"Back online! Syncing {self.pending_count} pending items...", "info")
             return FeedbackState.process_queue
 
     @rx.event(background=True)
+    @track_background
     async def submit_feedback(self):
-        """Submit feedback with offline queue support."""
-        async with self:
+        """
+        Submit feedback with offline queue support.
+
+        Stage durations (validation, queueing, db_write, commit, state_push,
+        total) are recorded in app.metrics.submit_timings.
+        """
+        started = time.perf_counter()
+        async with state_lock(self):
             if not self.can_submit:
                 self._show_toast("Please complete all required fields", "warning")
                 return
 
             self.submission_status = "submitting"
 
-            # Prepare feedback data
-            feedback_data = {
-                "order_id": self.order_id,
-                "courier_id": self.courier_id,
-                "rating": self.rating,
-                "comment": self.comment,
-                "reasons": self.reasons,
-                "publish_consent": self.publish_consent,
-                "timestamp": datetime.utcnow().isoformat(),
-                "request_id": generate_request_id({
+            # Prepare feedback record
+            feedback_data = FeedbackRecord(
+                order_id=self.order_id,
+                courier_id=self.courier_id,
+                rating=self.rating,
+                comment=self.comment,
+                reasons=tuple(self.reasons),
+                publish_consent=self.publish_consent,
+                timestamp=datetime.utcnow().isoformat(),
+                request_id=generate_request_id({
                     "order_id": self.order_id,
                     "courier_id": self.courier_id
-                })
-            }
+                }),
+            )
 
             # Validate data
             is_valid, error_msg = validate_feedback_data(feedback_data)
+            submit_timings.observe("validation", time.perf_counter() - started)
             if not is_valid:
                 self.submission_status = "error"
                 self.error_message = error_msg
                 self._show_toast(error_msg, "error")
                 return
 
-        # Simulate network delay
-        await asyncio.sleep(0.5)
+        await _simulated_delay(0.5)
 
-        async with self:
+        async with state_lock(self):
             # Handle submission based on mode
+            queue_event = None
             if config.JAZZ_ONLY_MODE:
                 await self._submit_to_jazz_collection(feedback_data)
             elif config.USE_BACKEND:
                 if self.is_online or not config.ENABLE_OFFLINE_MODE:
-                    await self._submit_to_backend(feedback_data)
+                    queue_event = await self._submit_to_backend(feedback_data)
                 else:
-                    await self._queue_feedback(feedback_data)
+                    queue_event = await self._queue_feedback(feedback_data)
             else:
                 # Fallback to queue
-                await self._queue_feedback(feedback_data)
+                queue_event = await self._queue_feedback(feedback_data)
+            # Leaving the block pushes the state delta to the client
+            push_started = time.perf_counter()
+        submit_timings.observe("state_push", time.perf_counter() - push_started)
+        submit_timings.observe("total", time.perf_counter() - started)
+
+        if queue_event is not None:
+            yield queue_event
 
-    async def _submit_to_jazz_collection(self, feedback_data: dict):
+    async def _submit_to_jazz_collection(self, feedback_data: FeedbackRecord):
         """Submit feedback directly to Jazz collection - PLACEHOLDER."""
         # FIXED: This needs proper Jazz integration
         # For now, simulate success
         try:
-            logger.info(f"Submitting to Jazz: {feedback_data['order_id']}")
-            await asyncio.sleep(0.3)
+            logger.info("Submitting to Jazz: %s", feedback_data.order_id)
+            await _simulated_delay(0.3)
             self.submission_status = "success"
             self._show_toast("Feedback submitted to Jazz!", "success")
         except Exception as e:
-            logger.exception(f"Jazz submission error: {e}")
+            logger.exception("Jazz submission error: %s", e)
             self.submission_status = "error"
             self.error_message = str(e)
             self._show_toast("Error submitting to Jazz", "error")
 
-    async def _submit_to_backend(self, feedback_data: dict):
-        """Submit feedback to the backend."""
+    async def _submit_to_backend(self, feedback_data: FeedbackRecord) -> Optional[rx.event.EventSpec]:
+        """
+        Submit feedback to the backend.
+
+        Returns:
+            Event that stores the record in the browser queue if the
+            submission failed and offline mode is enabled
+        """
         try:
             from sqlmodel import Session
 
             with Session(engine) as session:
-                # Check for duplicate again
-                result = session.execute(
-                    text("SELECT 1 FROM feedback WHERE order_id = :order_id"),
-                    {"order_id": self.order_id},
-                )
-                if result.scalar_one_or_none():
-                    self.submission_status = "duplicate"
-                    self._show_toast("Feedback already exists", "warning")
-                    return
-
-                # Insert feedback
-                needs_follow_up = self.rating <= 4
-                session.execute(
-                    text(
-                        "INSERT INTO feedback (order_id, courier_id, rating, comment, reasons, publish_consent, needs_follow_up, created_at) VALUES (:order_id, :courier_id, :rating, :comment, :reasons, :publish_consent, :needs_follow_up, CURRENT_TIMESTAMP)"
-                    ),
-                    {
-                        "order_id": self.order_id,
-                        "courier_id": self.courier_id,
-                        "rating": self.rating,
-                        "comment": self.comment,
-                        "reasons": json.dumps(self.reasons),
-                        "publish_consent": self.publish_consent,
-                        "needs_follow_up": needs_follow_up,
-                    },
-                )
-                session.commit()
+                with submit_timings.time("db_write"):
+                    # Check for duplicate again
+                    result = session.execute(
+                        text("SELECT 1 FROM feedback WHERE order_id = :order_id"),
+                        {"order_id": feedback_data.order_id},
+                    )
+                    if result.scalar_one_or_none():
+                        self.submission_status = "duplicate"
+                        self._show_toast("Feedback already exists", "warning")
+                        return None
+
+                    # Insert feedback
+                    session.execute(
+                        text(
+                            "INSERT INTO feedback (order_id, courier_id, rating, comment, reasons, publish_consent, needs_follow_up, created_at) VALUES (:order_id, :courier_id, :rating, :comment, :reasons, :publish_consent, :needs_follow_up, CURRENT_TIMESTAMP)"
+                        ),
+                        feedback_data.to_params(),
+                    )
+                with submit_timings.time("commit"):
+                    session.commit()
+                change_feed.publish()
 
             self.submission_status = "success"
             self._show_toast("Feedback submitted successfully!", "success")
-
-            # Remove from queue if it was queued
-            await self._dequeue_feedback(feedback_data)
+            return None
 
         except Exception as e:
-            logger.exception(f"Submission error: {e}")
+            logger.exception("Submission error: %s", e)
             # If submission fails and offline mode is enabled, queue it
             if config.ENABLE_OFFLINE_MODE:
-                await self._queue_feedback(feedback_data)
-            else:
-                self.submission_status = "error"
-                self.error_message = str(e)
-                self._show_toast(f"Submission failed: {str(e)}", "error")
+                return await self._queue_feedback(feedback_data)
+            self.submission_status = "error"
+            self.error_message = str(e)
+            self._show_toast(f"Submission failed: {str(e)}", "error")
+            return None
+
+    async def _queue_feedback(self, feedback_data: FeedbackRecord) -> Optional[rx.event.EventSpec]:
+        """
+        Hand feedback to the browser-side offline queue.
 
-    async def _queue_feedback(self, feedback_data: dict, show_toast=True):
-        """Add feedback to the queue."""
+        The queue lives in the customer's browser, so it survives reloads
+        and backend restarts and costs no server memory; the browser reports
+        the new pending count back through set_pending_count.
+        """
         if config.ENABLE_OFFLINE_MODE:
-            self.pending_queue = QueueManager.add_to_queue(
-                self.pending_queue,
-                feedback_data,
-                config.MAX_QUEUE_SIZE
-            )
-            self.submission_status = "queued"
-            if show_toast:
-                self._show_toast(
-                    f"Saved offline ({self.pending_count} pending)",
-                    "info"
+            with submit_timings.time("queueing"):
+                self.submission_status = "queued"
+                return rx.call_script(
+                    OfflineQueueBridge.enqueue(feedback_data),
+                    callback=FeedbackState.set_pending_count,
                 )
-        else:
-            self.submission_status = "error"
-            self.error_message = "No internet connection"
-            self._show_toast("No internet connection", "error")
-
-    async def _dequeue_feedback(self, feedback_data: dict):
-        """Remove feedback from the queue."""
-        self.pending_queue = QueueManager.remove_from_queue(
-            self.pending_queue,
-            feedback_data
-        )
+        self.submission_status = "error"
+        self.error_message = "No internet connection"
+        self._show_toast("No internet connection", "error")
+        return None
 
-    @rx.event(background=True)
-    async def process_queue(self):
-        """Process pending offline submissions."""
-        async with self:
-            if self.syncing or not self.is_online or self.pending_count == 0:
-                return
+    @rx.event
+    def set_pending_count(self, count: int):
+        """Mirror the browser queue size after an enqueue."""
+        self.pending_count = int(count or 0)
+        if self.submission_status == "queued":
+            self._show_toast(f"Saved offline ({self.pending_count} pending)", "info")
 
-            self.syncing = True
-            logger.info(f"Processing {self.pending_count} queued items...")
+    @rx.event
+    def process_queue(self):
+        """Flush the browser-side offline queue through the batch API."""
+        if not self.is_online:
+            return
+        if self.syncing and time.time() - self._syncing_since < FLUSH_TIMEOUT_SECONDS:
+            return
+        self.syncing = True
+        self._syncing_since = time.time()
+        return rx.call_script(
+            OfflineQueueBridge.flush(),
+            callback=FeedbackState.finish_queue_flush,
+        )
 
-        synced_count = 0
-        failed_items = []
+    @rx.event
+    def finish_queue_flush(self, result: dict):
+        """Handle the outcome of a browser queue flush."""
+        self.syncing = False
+        result = result or {}
+        synced_count = int(result.get("synced", 0))
+        remaining = int(result.get("remaining", 0))
+        if remaining < 0:
+            # The flush failed in the browser; the queue is untouched
+            logger.warning("Offline queue flush failed; %d items still pending", self.pending_count)
+            self._show_toast("Sync failed, will retry", "warning")
+            return
+        self.pending_count = remaining
 
-        for item in self.pending_queue[:]:  # Copy to avoid mutation issues
-            try:
-                # FIXED: Process queue items
-                await self._submit_to_backend(item)
-                synced_count += 1
-            except Exception as e:
-                logger.exception(f"Queue sync error for {item.get('order_id')}: {e}")
-                failed_items.append(item)
-
-        async with self:
-            # Update queue with only failed items
-            self.pending_queue = failed_items
-            self.syncing = False
-
-            if synced_count > 0:
-                self._show_toast(
-                    f"✓ Synced {synced_count} feedback item(s)",
-                    "success"
-                )
-            if len(failed_items) > 0:
-                logger.warning(f"{len(failed_items)} items failed to sync")
-                self._show_toast(
-                    f"{len(failed_items)} items still pending",
-                    "warning"
-                )
+        if synced_count > 0:
+            self._show_toast(
+                f"✓ Synced {synced_count} feedback item(s)",
+                "success"
+            )
+        if self.pending_count > 0:
+            logger.warning("%d items failed to sync", self.pending_count)
+            self._show_toast(
+                f"{self.pending_count} items still pending",
+                "warning"
+            )
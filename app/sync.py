@@ -0,0 +1,341 @@
+"""Offline queue synchronization: flush coalescing, retries and dead letters."""
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set
+
+from app.metrics import FLUSH_BATCH_SIZE, SYNC_OUTCOMES, CallbackCounter, Gauge
+from app.records import FeedbackRecord
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def _store_dead_letter(record: FeedbackRecord, attempts: int, reason: str, failed_at: float):
+    """Default RetryScheduler dead-letter store: the dead_letter table."""
+    # Imported here because app.services depends on this module
+    from app.services import DeadLetterService
+
+    DeadLetterService.store(record, attempts, reason, failed_at)
+
+
+class RetryScheduler:
+    """
+    Per-item retry bookkeeping for queue sync, keyed by order_id.
+
+    Each failed item gets its own exponential backoff with full jitter
+    (a uniform delay in [0, min(max_delay, base_delay * 2**(attempt - 1))]),
+    so clients that reconnect together after an outage spread their retries
+    out instead of hitting the backend in lockstep. Items arriving before
+    their retry time are deferred without touching the database.
+
+    An item runs out of retries after max_attempts failures or once it
+    has been failing for retry_window seconds, whichever comes first
+    (0 disables either limit). It is then handed to the durable
+    dead-letter store for the admin. Only once that store has accepted it
+    is the item reported as dead-lettered (and dropped by the browser); if
+    the store fails too, the item is simply retried again later.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = config.SYNC_RETRY_ATTEMPTS,
+        retry_window: float = config.SYNC_RETRY_WINDOW,
+        base_delay: float = config.SYNC_RETRY_DELAY,
+        max_delay: float = config.SYNC_RETRY_MAX_DELAY,
+        dead_letter: Callable[[FeedbackRecord, int, str, float], None] = _store_dead_letter,
+        max_tracked: int = 10_000,
+        rng: Callable[[], float] = random.random,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_attempts = max_attempts
+        self.retry_window = retry_window
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_tracked = max_tracked
+        self._dead_letter = dead_letter
+        self._rng = rng
+        self._clock = clock
+        self._lock = threading.Lock()
+        # order_id -> (attempts, next_attempt_at, first_failed_at)
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters = {
+            "retries_scheduled": 0,
+            "retries_deferred": 0,
+            "recovered": 0,
+            "dead_lettered": 0,
+        }
+
+    def backoff(self, attempt: int) -> float:
+        """Jittered delay in seconds before retry number `attempt` (1-based)."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return self._rng() * ceiling
+
+    def retry_after(self, order_id: str) -> float:
+        """
+        Seconds until an item may be retried (0 if it is due or unknown).
+
+        A positive result counts as a deferred retry.
+        """
+        with self._lock:
+            entry = self._pending.get(order_id)
+            if entry is None:
+                return 0.0
+            remaining = entry[1] - self._clock()
+            if remaining <= 0:
+                return 0.0
+            self._counters["retries_deferred"] += 1
+            return remaining
+
+    def record_success(self, order_id: str):
+        """Forget an item once it has been stored."""
+        if order_id not in self._pending:
+            return
+        with self._lock:
+            if self._pending.pop(order_id, None) is not None:
+                self._counters["recovered"] += 1
+
+    def record_failure(self, record: FeedbackRecord, reason: str) -> Optional[float]:
+        """
+        Schedule the next attempt for a failed item.
+
+        Returns:
+            Seconds until the next attempt, or None if the item ran out of
+            attempts or time and was dead-lettered
+        """
+        now = self._clock()
+        with self._lock:
+            attempts, _, first_failed_at = self._pending.pop(record.order_id, (0, 0.0, now))
+            attempts += 1
+
+        if self._exhausted(attempts, now - first_failed_at):
+            # Outside the lock: the store writes to the database
+            try:
+                self._dead_letter(record, attempts, reason, now)
+            except Exception as e:
+                logger.error("Could not dead-letter %s, retrying it instead: %s", record.order_id, e)
+            else:
+                with self._lock:
+                    self._counters["dead_lettered"] += 1
+                logger.error(
+                    "Dead-lettered %s after %d attempts over %.0fs: %s",
+                    record.order_id, attempts, now - first_failed_at, reason,
+                )
+                return None
+
+        delay = self.backoff(attempts)
+        with self._lock:
+            self._pending[record.order_id] = (attempts, now + delay, first_failed_at)
+            while len(self._pending) > self.max_tracked:
+                self._pending.popitem(last=False)
+            self._counters["retries_scheduled"] += 1
+        return delay
+
+    def _exhausted(self, attempts: int, failing_for: float) -> bool:
+        if self.max_attempts > 0 and attempts >= self.max_attempts:
+            return True
+        return self.retry_window > 0 and failing_for >= self.retry_window
+
+    def metrics(self) -> Dict[str, int]:
+        """Retry and dead-letter counters plus the number of pending retries."""
+        with self._lock:
+            return {
+                **self._counters,
+                "pending_retries": len(self._pending),
+            }
+
+
+# Process-wide scheduler shared by all sessions and the batch endpoint
+retry_scheduler = RetryScheduler()
+
+
+def _write_batch(records: List[FeedbackRecord]) -> List[dict]:
+    """Default FlushScheduler writer: one FeedbackService batch transaction."""
+    # Imported here because app.services depends on this module
+    from app.services import FeedbackService
+
+    return FeedbackService.create_feedback_batch(records)
+
+
+class FlushScheduler:
+    """
+    Process-wide scheduler that coalesces queue flushes from all sessions.
+
+    Every client flush hands its items to submit(). Items are deduplicated by
+    order_id across callers (an item already waiting or being written is
+    shared, not written twice), grouped into transactions of up to
+    batch_size items, and written off the event loop with at most
+    max_concurrency writes in flight. Each caller gets back the per-item
+    outcome of its own items, so backend load during a mass reconnect is
+    bounded by batch_size * max_concurrency rather than by the number of
+    reconnecting clients.
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[List[FeedbackRecord]], List[dict]] = _write_batch,
+        batch_size: int = config.FLUSH_BATCH_SIZE,
+        max_concurrency: int = config.FLUSH_MAX_CONCURRENCY,
+        linger: float = config.FLUSH_LINGER_MS / 1000,
+    ):
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.linger = linger
+        self._writer = writer
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters = {
+            "items_submitted": 0,
+            "items_coalesced": 0,
+            "batches_written": 0,
+            "items_written": 0,
+        }
+        self._reset()
+
+    def _reset(self):
+        """Drop per-loop state (futures and primitives are bound to a loop)."""
+        # order_id -> record waiting for a batch (insertion ordered)
+        self._pending: Dict[str, FeedbackRecord] = {}
+        # order_id -> outcome future, for waiting and in-flight items
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._worker: Optional[asyncio.Task] = None
+        self._writes: Set[asyncio.Task] = set()
+
+    async def submit(self, records: List[FeedbackRecord]) -> List[dict]:
+        """
+        Queue records for writing and wait for their outcomes.
+
+        Args:
+            records: Records from one client flush; for repeated order_ids
+                the latest record wins
+
+        Returns:
+            One result per distinct order_id, as from
+            FeedbackService.create_feedback_batch
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._reset()
+
+        waiting: Dict[str, asyncio.Future] = {}
+        for record in records:
+            order_id = record.order_id
+            self._counters["items_submitted"] += 1
+            future = self._futures.get(order_id)
+            if future is None:
+                future = self._futures[order_id] = loop.create_future()
+                self._pending[order_id] = record
+            else:
+                # Already waiting (latest record wins) or being written
+                # (the caller shares the in-flight outcome)
+                self._counters["items_coalesced"] += 1
+                if order_id in self._pending:
+                    self._pending[order_id] = record
+            waiting[order_id] = future
+
+        if self._worker is None and self._pending:
+            # Batches serve many requests, so they must not run in (and
+            # report timings to) the context of whichever request started them
+            self._worker = loop.create_task(self._drain(), context=contextvars.Context())
+
+        return list(await asyncio.gather(*waiting.values()))
+
+    async def _drain(self):
+        """Hand waiting items to writers, batch_size at a time."""
+        try:
+            # Let concurrent flushes arrive so they share transactions
+            await asyncio.sleep(self.linger)
+            while self._pending:
+                await self._semaphore.acquire()
+                batch = []
+                for order_id in list(self._pending)[:self.batch_size]:
+                    batch.append(self._pending.pop(order_id))
+                write = asyncio.create_task(self._write(batch))
+                self._writes.add(write)
+                write.add_done_callback(self._writes.discard)
+        finally:
+            self._worker = None
+
+    async def _write(self, batch: List[FeedbackRecord]):
+        """Write one batch in a worker thread and resolve its futures."""
+        try:
+            FLUSH_BATCH_SIZE.observe(len(batch))
+            results = await asyncio.to_thread(self._writer, batch)
+            by_order_id = {result["order_id"]: result for result in results}
+            self._counters["batches_written"] += 1
+            self._counters["items_written"] += len(batch)
+        except Exception as e:
+            logger.exception("Error flushing feedback batch: %s", e)
+            by_order_id = {}
+        finally:
+            self._semaphore.release()
+
+        for record in batch:
+            future = self._futures.pop(record.order_id, None)
+            result = by_order_id.get(record.order_id, {
+                "order_id": record.order_id,
+                "status": "error",
+                "detail": "Failed to create feedback",
+            })
+            SYNC_OUTCOMES.labels(result["status"]).inc()
+            if future is not None and not future.done():
+                future.set_result(result)
+
+    def metrics(self) -> Dict[str, int]:
+        """Flush counters plus current queue sizes."""
+        return {
+            **self._counters,
+            "waiting": len(self._pending),
+            "in_flight": len(self._futures) - len(self._pending),
+        }
+
+
+# Process-wide flush scheduler shared by every client flush
+flush_scheduler = FlushScheduler()
+
+
+def _dead_letter_count() -> float:
+    """Dead letters currently stored (for the gauge below)."""
+    from app.services import DeadLetterService
+
+    try:
+        return DeadLetterService.count()
+    except Exception:
+        # Keep /metrics up while the database is unavailable
+        return float("nan")
+
+
+# Queue internals exported by /metrics
+Gauge(
+    "feedback_flush_queue_depth",
+    "Offline-queue items in the flush scheduler, by state.",
+    labelnames=("state",),
+    fn=lambda: {
+        key: value for key, value in flush_scheduler.metrics().items() if key in ("waiting", "in_flight")
+    },
+)
+Gauge(
+    "feedback_retry_pending",
+    "Offline-queue items waiting for a retry.",
+    fn=lambda: retry_scheduler.metrics()["pending_retries"],
+)
+Gauge(
+    "feedback_dead_letters",
+    "Dead-lettered offline-queue items held for the admin.",
+    fn=_dead_letter_count,
+)
+CallbackCounter(
+    "feedback_retry_events_total",
+    "Offline-queue retry events (scheduled, deferred, recovered, dead_lettered).",
+    labelnames=("event",),
+    fn=lambda: {
+        key.replace("retries_", ""): value
+        for key, value in retry_scheduler.metrics().items()
+        if key != "pending_retries"
+    },
+)
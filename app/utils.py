@@ -1,8 +1,14 @@
 """Utility functions and helpers."""
+import copy
 import hashlib
 import json
+from collections import deque
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from app.records import FeedbackRecord
+
+QueueItem = Union[Dict[str, Any], FeedbackRecord]
 
 
 def generate_request_id(data: Dict[str, Any]) -> str:
@@ -45,28 +51,36 @@ def deserialize_feedback(data: str) -> Dict[str, Any]:
     return json.loads(data)
 
 
-def validate_feedback_data(data: Dict[str, Any]) -> Tuple[bool, str]:
+def validate_feedback_data(data: Union[Dict[str, Any], FeedbackRecord]) -> Tuple[bool, str]:
     """
     Validate feedback data structure.
 
     Args:
-        data: Feedback data to validate
+        data: Feedback data (dict or FeedbackRecord) to validate
 
     Returns:
         Tuple of (is_valid, error_message)
     """
+    if isinstance(data, FeedbackRecord):
+        return data.validate()
+
     required_fields = ["order_id", "courier_id", "rating"]
 
     for field in required_fields:
         if field not in data:
             return False, f"Missing required field: {field}"
 
+    if not isinstance(data["order_id"], str):
+        return False, "order_id must be a string"
+
     rating = data.get("rating")
     if not isinstance(rating, int) or rating < 1 or rating > 5:
         return False, "Rating must be between 1 and 5"
 
-    comment = data.get("comment", "")
-    if len(comment) > 500:
+    comment = data.get("comment")
+    if comment is not None and not isinstance(comment, str):
+        return False, "Comment must be a string"
+    if len(comment or "") > 500:
         return False, "Comment exceeds 500 characters"
 
     return True, ""
@@ -85,65 +99,185 @@ def format_datetime(dt: datetime) -> str:
     return dt.strftime("%Y-%m-%d %H:%M:%S")
 
 
-class QueueManager:
-    """Manage local storage queue operations."""
+def latest_by_order_id(items: List[QueueItem]) -> List[QueueItem]:
+    """
+    Deduplicate items by order_id, keeping the latest of each.
 
-    @staticmethod
-    def add_to_queue(queue: List[dict], item: dict, max_size: int = 50) -> List[dict]:
-        """
-        Add item to queue with size limit (FIFO).
+    Args:
+        items: Dicts or FeedbackRecords with an order_id
 
-        Args:
-            queue: Current queue list
-            item: Item to add
-            max_size: Maximum queue size
+    Returns:
+        One item per order_id, ordered by each order_id's last occurrence
+    """
+    latest: Dict[str, QueueItem] = {}
+    for item in items:
+        order_id = FeedbackQueue._key(item)
+        latest.pop(order_id, None)
+        latest[order_id] = item
+    return list(latest.values())
 
-        Returns:
-            Updated queue list
-        """
-        # Create new list to avoid mutation issues
-        new_queue = queue.copy()
 
-        if len(new_queue) >= max_size:
-            # Remove oldest item (FIFO)
-            new_queue.pop(0)
+class FeedbackQueue:
+    """
+    Ordered offline queue keyed by order_id.
+
+    Items live in a dict index (order_id -> (seq, item)) while a deque keeps
+    FIFO order as (seq, order_id) pairs. Removing an item only drops it from
+    the index; its deque slot becomes a tombstone that is skipped when the
+    head is reached and swept away once tombstones outnumber live items.
+    Enqueue, eviction, dequeue and remove-by-order_id are all amortized O(1).
 
-        new_queue.append(item)
-        return new_queue
+    Re-enqueueing an order_id that is already queued replaces the old entry
+    and moves it to the tail, so the queue never holds duplicates.
+    """
+
+    __slots__ = ("max_size", "_order", "_index", "_seq")
+
+    def __init__(self, items: Optional[List[QueueItem]] = None, max_size: int = 50):
+        self.max_size = max_size
+        self._order: Deque[Tuple[int, str]] = deque()
+        self._index: Dict[str, Tuple[int, QueueItem]] = {}
+        self._seq = 0
+        for item in items or []:
+            self.enqueue(item)
 
     @staticmethod
-    def remove_from_queue(queue: List[dict], item: dict) -> List[dict]:
+    def _key(item: Any) -> str:
+        """Get the order_id an item is keyed by."""
+        if isinstance(item, dict):
+            return item.get("order_id")
+        return getattr(item, "order_id")
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __bool__(self) -> bool:
+        return bool(self._index)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._index
+
+    def __iter__(self) -> Iterator[QueueItem]:
+        """Iterate live items in FIFO order."""
+        for seq, order_id in self._order:
+            entry = self._index.get(order_id)
+            if entry is not None and entry[0] == seq:
+                yield entry[1]
+
+    def _is_live(self, seq: int, order_id: str) -> bool:
+        entry = self._index.get(order_id)
+        return entry is not None and entry[0] == seq
+
+    def _drop_stale_head(self):
+        """Discard tombstones sitting at the head of the deque."""
+        order = self._order
+        while order and not self._is_live(*order[0]):
+            order.popleft()
+
+    def _maybe_compact(self):
+        """Sweep tombstones once they outnumber live items."""
+        if len(self._order) > 2 * len(self._index) + 16:
+            self._order = deque(
+                (seq, order_id)
+                for seq, order_id in self._order
+                if self._is_live(seq, order_id)
+            )
+
+    def enqueue(self, item: QueueItem) -> Optional[QueueItem]:
         """
-        Remove item from queue by matching order_id.
+        Add item to the tail, evicting the oldest item when full.
 
         Args:
-            queue: Current queue list
-            item: Item with order_id to remove
+            item: Item with an order_id
 
         Returns:
-            Updated queue list
+            The evicted item, if any
+        """
+        order_id = self._key(item)
+        evicted = None
+
+        if order_id in self._index:
+            # Replace in place: the old slot becomes a tombstone
+            del self._index[order_id]
+        elif self.max_size and len(self._index) >= self.max_size:
+            evicted = self.dequeue()
+
+        self._seq += 1
+        self._order.append((self._seq, order_id))
+        self._index[order_id] = (self._seq, item)
+        self._maybe_compact()
+        return evicted
+
+    def dequeue(self) -> Optional[QueueItem]:
         """
-        return [q for q in queue if q.get("order_id") != item.get("order_id")]
+        Remove and return the oldest item.
 
-    @staticmethod
-    def get_pending_count(queue: List[dict]) -> int:
+        Returns:
+            Oldest item, or None if the queue is empty
         """
-        Get count of pending items.
+        self._drop_stale_head()
+        if not self._order:
+            return None
+        _, order_id = self._order.popleft()
+        return self._index.pop(order_id)[1]
+
+    def peek(self) -> Optional[QueueItem]:
+        """Return the oldest item without removing it."""
+        self._drop_stale_head()
+        if not self._order:
+            return None
+        return self._index[self._order[0][1]][1]
+
+    def get(self, order_id: str) -> Optional[QueueItem]:
+        """Get a queued item by order_id."""
+        entry = self._index.get(order_id)
+        return entry[1] if entry is not None else None
+
+    def remove(self, order_id: str) -> Optional[QueueItem]:
+        """
+        Remove item by order_id.
 
         Args:
-            queue: Queue list
+            order_id: Order ID of the item to remove
 
         Returns:
-            Number of items in queue
+            The removed item, or None if it was not queued
         """
-        return len(queue)
-
-    @staticmethod
-    def clear_queue(queue: List[dict]) -> List[dict]:
+        entry = self._index.pop(order_id, None)
+        if entry is None:
+            return None
+        self._drop_stale_head()
+        self._maybe_compact()
+        return entry[1]
+
+    def clear(self):
+        """Remove all items."""
+        self._order.clear()
+        self._index.clear()
+
+    def to_state(self) -> List[Any]:
         """
-        Clear all items from queue.
+        Serialize to a compact FIFO list of live items.
 
-        Returns:
-            Empty list
+        Tombstones, sequence numbers and the index are dropped, leaving only
+        the items themselves (dicts or FeedbackRecords) to store in state.
         """
-        return []
+        return list(self)
+
+    @classmethod
+    def from_state(cls, items: List[QueueItem], max_size: int = 50) -> "FeedbackQueue":
+        """Rebuild a queue from the output of to_state()."""
+        return cls(items, max_size=max_size)
+
+    def __getstate__(self) -> Tuple[int, List[QueueItem]]:
+        return self.max_size, self.to_state()
+
+    def __setstate__(self, state: Tuple[int, List[QueueItem]]):
+        max_size, items = state
+        self.__init__(items, max_size=max_size)
+
+    def __deepcopy__(self, memo: dict) -> "FeedbackQueue":
+        return FeedbackQueue(copy.deepcopy(self.to_state(), memo), max_size=self.max_size)
+
+    def __repr__(self) -> str:
+        return f"FeedbackQueue(size={len(self)}, max_size={self.max_size})"
@@ -0,0 +1,283 @@
+/**
+ * Client-side offline feedback queue.
+ *
+ * Pending submissions are stored in IndexedDB (localStorage when IndexedDB is
+ * unavailable) so they survive reloads and backend restarts. Each item keeps
+ * the compact positional entry produced by FeedbackRecord.to_queue_entry().
+ * Flushing posts due entries to the batch endpoint and drops every item the
+ * server has settled (created, duplicate, invalid or dead_letter; the server
+ * reports dead_letter only once it holds the item durably). Items the
+ * server asks to retry keep their own next_attempt_at, taken from the
+ * jittered retry_after in the response, and are skipped until then.
+ *
+ * install() wires up delivery that does not depend on the page staying
+ * open: a service worker (assets/sw.js) flushes on Background Sync when the
+ * connection returns, and a sendBeacon fallback posts the queue on pagehide.
+ * The sync is registered whenever items are queued or left pending, so it
+ * is in place before the page goes away, online or not.
+ *
+ * Written against `self` so it also loads in a service worker.
+ */
+(function (scope) {
+  const DB_NAME = "courier-feedback";
+  const STORE = "pending";
+  const LS_KEY = "feedback_pending_queue";
+  const SETTLED = ["created", "duplicate", "invalid", "dead_letter"];
+  const SYNC_TAG = "feedback-flush";
+
+  let dbPromise = null;
+  let installed = false;
+  let retryTimer = null;
+  // Last known queue contents, so pagehide can send a beacon synchronously
+  let snapshot = [];
+
+  function openDb() {
+    if (!("indexedDB" in scope)) {
+      return Promise.resolve(null);
+    }
+    if (!dbPromise) {
+      dbPromise = new Promise((resolve) => {
+        const req = scope.indexedDB.open(DB_NAME, 1);
+        req.onupgradeneeded = () => {
+          req.result.createObjectStore(STORE, { keyPath: "order_id" });
+        };
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => resolve(null);
+      });
+    }
+    return dbPromise;
+  }
+
+  function withStore(db, mode, fn) {
+    return new Promise((resolve, reject) => {
+      const tx = db.transaction(STORE, mode);
+      const req = fn(tx.objectStore(STORE));
+      tx.oncomplete = () => resolve(req ? req.result : undefined);
+      tx.onerror = () => reject(tx.error);
+    });
+  }
+
+  function lsRead() {
+    try {
+      return JSON.parse(scope.localStorage.getItem(LS_KEY) || "[]");
+    } catch (e) {
+      return [];
+    }
+  }
+
+  function lsWrite(items) {
+    scope.localStorage.setItem(LS_KEY, JSON.stringify(items));
+  }
+
+  async function all() {
+    const db = await openDb();
+    const items = db ? await withStore(db, "readonly", (s) => s.getAll()) : lsRead();
+    snapshot = items.sort((a, b) => a.queued_at - b.queued_at);
+    return snapshot;
+  }
+
+  async function count() {
+    const db = await openDb();
+    return db ? withStore(db, "readonly", (s) => s.count()) : lsRead().length;
+  }
+
+  async function remove(orderIds) {
+    if (!orderIds.length) {
+      return;
+    }
+    const db = await openDb();
+    if (db) {
+      await withStore(db, "readwrite", (s) => {
+        orderIds.forEach((id) => s.delete(id));
+      });
+    } else {
+      const drop = new Set(orderIds);
+      lsWrite(lsRead().filter((item) => !drop.has(item.order_id)));
+    }
+  }
+
+  async function enqueue(entry, maxSize) {
+    registerSync();
+    const item = { order_id: entry[0], entry: entry, queued_at: Date.now() };
+    const db = await openDb();
+    if (db) {
+      await withStore(db, "readwrite", (s) => s.put(item));
+    } else {
+      lsWrite(lsRead().filter((i) => i.order_id !== item.order_id).concat([item]));
+    }
+    // Evict the oldest items beyond maxSize (FIFO)
+    const items = await all();
+    if (maxSize && items.length > maxSize) {
+      await remove(items.slice(0, items.length - maxSize).map((i) => i.order_id));
+    }
+    return count();
+  }
+
+  // Concurrent flush() calls share one in-flight request sequence
+  let inFlight = null;
+
+  function flush(url, chunkSize) {
+    // Always resolves, so callers waiting on the result (the page's syncing
+    // flag) are never left hanging; remaining -1 means the flush itself
+    // failed (e.g. storage or a malformed response) and nothing is known.
+    if (!inFlight) {
+      inFlight = doFlush(url, chunkSize)
+        .catch(() => ({ synced: 0, remaining: -1 }))
+        .finally(() => {
+          inFlight = null;
+        });
+    }
+    return inFlight;
+  }
+
+  async function doFlush(url, chunkSize) {
+    const queued = await all();
+    const now = Date.now();
+    const items = queued.filter((item) => !(item.next_attempt_at > now));
+    let synced = 0;
+    if (!items.length || scope.navigator.onLine === false) {
+      scheduleRetry(url, chunkSize, queued);
+      keepSyncing(queued);
+      return { synced: synced, remaining: queued.length };
+    }
+    for (let i = 0; i < items.length; i += chunkSize) {
+      const chunk = items.slice(i, i + chunkSize);
+      let response;
+      try {
+        response = await fetch(url, { method: "POST", body: batchBody(chunk) });
+      } catch (e) {
+        break;
+      }
+      if (!response.ok) {
+        break;
+      }
+      const { results } = await response.json();
+      await remove(
+        results.filter((r) => SETTLED.includes(r.status)).map((r) => r.order_id)
+      );
+      await deferRetries(chunk, results);
+      synced += results.filter((r) => r.status === "created").length;
+    }
+    const remaining = await all();
+    scheduleRetry(url, chunkSize, remaining);
+    keepSyncing(remaining);
+    return { synced: synced, remaining: remaining.length };
+  }
+
+  async function deferRetries(chunk, results) {
+    // Each item keeps its own backoff, so one failing item does not hold
+    // back (or speed up) the others.
+    const byId = new Map(chunk.map((item) => [item.order_id, item]));
+    const deferred = results
+      .filter((r) => r.status === "retry" && byId.has(r.order_id))
+      .map((r) =>
+        Object.assign({}, byId.get(r.order_id), {
+          next_attempt_at: Date.now() + r.retry_after * 1000,
+        })
+      );
+    if (!deferred.length) {
+      return;
+    }
+    const db = await openDb();
+    if (db) {
+      await withStore(db, "readwrite", (s) => {
+        deferred.forEach((item) => s.put(item));
+      });
+    } else {
+      const updated = new Map(deferred.map((item) => [item.order_id, item]));
+      lsWrite(lsRead().map((item) => updated.get(item.order_id) || item));
+    }
+  }
+
+  function scheduleRetry(url, chunkSize, items) {
+    // One timer for the earliest deferred item; later items wait their turn
+    const due = items.map((item) => item.next_attempt_at || 0).filter((t) => t > 0);
+    if (retryTimer || !due.length) {
+      return;
+    }
+    const delay = Math.max(0, Math.min(...due) - Date.now());
+    retryTimer = setTimeout(() => {
+      retryTimer = null;
+      flush(url, chunkSize);
+    }, delay);
+  }
+
+  function batchBody(items) {
+    // text/plain keeps this a CORS "simple" request (no preflight)
+    return new Blob([JSON.stringify({ items: items.map((item) => item.entry) })], {
+      type: "text/plain",
+    });
+  }
+
+  function beacon(url, chunkSize) {
+    // Fire-and-forget: items stay queued until a later flush sees them
+    // settled (the server reports re-sent items as duplicates).
+    for (let i = 0; i < snapshot.length; i += chunkSize) {
+      scope.navigator.sendBeacon(url, batchBody(snapshot.slice(i, i + chunkSize)));
+    }
+  }
+
+  async function registerSync() {
+    // Background Sync delivers even after the tab is closed and coalesces
+    // repeated registrations of the same tag into one flush. Resolves to
+    // whether a sync was registered.
+    try {
+      const registration = await scope.navigator.serviceWorker.getRegistration();
+      if (registration && registration.sync) {
+        await registration.sync.register(SYNC_TAG);
+        return true;
+      }
+    } catch (e) {
+      // No service worker or no Background Sync support
+    }
+    return false;
+  }
+
+  function keepSyncing(items) {
+    // Items left behind get another Background Sync. The service worker
+    // itself rejects the sync event instead, which the browser retries.
+    if (items.length && scope.document) {
+      registerSync();
+    }
+  }
+
+  async function requestSync(url, chunkSize) {
+    if (!(await registerSync())) {
+      await flush(url, chunkSize);
+    }
+  }
+
+  function install(url, chunkSize, workerUrl, jitterMs) {
+    const nav = scope.navigator;
+    if (!installed) {
+      installed = true;
+      if ("serviceWorker" in nav) {
+        const query = "?batch=" + encodeURIComponent(url) + "&chunk=" + chunkSize;
+        nav.serviceWorker.register(workerUrl + query).catch(() => {});
+      }
+      // Spread mass reconnects (e.g. a whole area coming back online) over
+      // a random window instead of flushing all clients at once
+      scope.addEventListener("online", () => {
+        setTimeout(() => requestSync(url, chunkSize), Math.random() * (jitterMs || 0));
+      });
+      scope.addEventListener("pagehide", () => {
+        if (!snapshot.length) {
+          return;
+        }
+        if (nav.onLine !== false && "sendBeacon" in nav) {
+          beacon(url, chunkSize);
+        } else {
+          // A beacon cannot leave while offline; leave delivery to the
+          // service worker once the connection returns
+          registerSync();
+        }
+      });
+      all();
+    }
+    return nav.onLine !== false;
+  }
+
+  scope.feedbackQueue = {
+    all, beacon, count, enqueue, flush, install, registerSync, remove, requestSync,
+  };
+})(self);
@@ -0,0 +1,30 @@
+/**
+ * Service worker that flushes the offline feedback queue on Background Sync.
+ *
+ * Registered by feedbackQueue.install() as /sw.js?batch=<url>&chunk=<n>.
+ * The "feedback-flush" sync fires once connectivity returns, even if every
+ * tab has been closed, and the browser retries it if the flush rejects.
+ */
+importScripts("/offline_queue.js");
+
+const params = new URL(self.location).searchParams;
+const BATCH_URL = params.get("batch");
+const CHUNK_SIZE = parseInt(params.get("chunk") || "50", 10);
+
+self.addEventListener("install", () => self.skipWaiting());
+self.addEventListener("activate", (event) => event.waitUntil(self.clients.claim()));
+
+self.addEventListener("sync", (event) => {
+  if (event.tag !== "feedback-flush" || !BATCH_URL) {
+    return;
+  }
+  event.waitUntil(
+    self.feedbackQueue.flush(BATCH_URL, CHUNK_SIZE).then((result) => {
+      if (result.remaining !== 0) {
+        // Rejecting asks the browser to retry the sync later (remaining is
+        // -1 when the flush itself failed)
+        throw new Error("feedback flush incomplete (remaining: " + result.remaining + ")");
+      }
+    })
+  );
+});
@@ -3,6 +3,7 @@ import os
 import logging
 from typing import Literal
 from dotenv import load_dotenv
+from app import logging_pipeline
 from app.enums import AppMode
 
 load_dotenv()
@@ -13,14 +14,44 @@ class Config:
 
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./reflx.db")
+    SLOW_QUERY_MS: int = int(os.getenv("SLOW_QUERY_MS", "200"))  # 0 disables slow-query logging
+    QUERY_STATS_MAX_FINGERPRINTS: int = int(os.getenv("QUERY_STATS_MAX_FINGERPRINTS", "500"))
 
     # Admin defaults
     DEFAULT_ADMIN_USERNAME: str = os.getenv("DEFAULT_ADMIN_USERNAME", "admin")
     DEFAULT_ADMIN_PASSWORD: str = os.getenv("DEFAULT_ADMIN_PASSWORD")  # No default to avoid hardcoding credentials
+    # HMAC key for admin session tokens; set it when running several workers
+    ADMIN_TOKEN_SECRET: str = os.getenv("ADMIN_TOKEN_SECRET", "")
+    ADMIN_TOKEN_TTL: int = int(os.getenv("ADMIN_TOKEN_TTL", "28800"))  # seconds
 
     # Application
     APP_ENV: Literal["development", "production"] = os.getenv("APP_ENV", "development")
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: Literal["text", "json"] = os.getenv("LOG_FORMAT", "text")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records buffered before dropping
+    LOG_INFO_SAMPLE_RATE: float = float(os.getenv("LOG_INFO_SAMPLE_RATE", "1.0"))  # WARNING+ always kept
+    ACCESS_LOG_SAMPLE_RATE: float = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.1"))  # 5xx always logged
+    LOOP_MONITOR_ENABLED: bool = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+    LOOP_MONITOR_INTERVAL_MS: int = int(os.getenv("LOOP_MONITOR_INTERVAL_MS", "500"))
+    LOOP_BLOCK_THRESHOLD_MS: int = int(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+    # Development aid: add fake network/Jazz latency to submissions (never in production)
+    SIMULATE_NETWORK_DELAY: bool = (
+        os.getenv("SIMULATE_NETWORK_DELAY", "false").lower() == "true" and APP_ENV == "development"
+    )
+
+    # Admin authentication (bcrypt runs on a dedicated thread pool)
+    # bcrypt cost; pick one with `python -m app.calibrate_bcrypt`. Stored hashes
+    # with another cost are rehashed on the next successful login.
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    AUTH_WORKERS: int = int(os.getenv("AUTH_WORKERS", "2"))
+    AUTH_MAX_QUEUE: int = int(os.getenv("AUTH_MAX_QUEUE", "8"))  # waiting checks before fast rejection
+    AUTH_MAX_CONCURRENT_PER_KEY: int = int(os.getenv("AUTH_MAX_CONCURRENT_PER_KEY", "2"))  # per username and per IP
+
+    # Admin dashboard: rows fetched per table window (the table renders only these)
+    DASHBOARD_WINDOW_ROWS: int = int(os.getenv("DASHBOARD_WINDOW_ROWS", "60"))
+    DASHBOARD_CACHE_SIZE: int = int(os.getenv("DASHBOARD_CACHE_SIZE", "256"))  # results shared by sessions, 0 disables
+    # Seconds a live view (dashboard or /api/admin/feedback/stream) follows new feedback before pausing
+    DASHBOARD_LIVE_SECONDS: int = int(os.getenv("DASHBOARD_LIVE_SECONDS", "3600"))
 
     # Deployment Mode
     APP_MODE: str = os.getenv("APP_MODE", "hybrid")  # traditional, jazz_only, hybrid, offline_first
@@ -28,8 +59,19 @@ class Config:
     # Cache & Offline
     ENABLE_OFFLINE_MODE: bool = os.getenv("ENABLE_OFFLINE_MODE", "true").lower() == "true"
     MAX_QUEUE_SIZE: int = int(os.getenv("MAX_QUEUE_SIZE", "50"))
-    SYNC_RETRY_ATTEMPTS: int = int(os.getenv("SYNC_RETRY_ATTEMPTS", "3"))
+    SYNC_RETRY_ATTEMPTS: int = int(os.getenv("SYNC_RETRY_ATTEMPTS", "3"))  # 0 disables
+    SYNC_RETRY_WINDOW: int = int(os.getenv("SYNC_RETRY_WINDOW", "86400"))  # seconds of failures, 0 disables
     SYNC_RETRY_DELAY: int = int(os.getenv("SYNC_RETRY_DELAY", "2"))  # seconds
+    SYNC_RETRY_MAX_DELAY: int = int(os.getenv("SYNC_RETRY_MAX_DELAY", "300"))  # seconds
+    SYNC_DEAD_LETTER_SIZE: int = int(os.getenv("SYNC_DEAD_LETTER_SIZE", "500"))
+    FLUSH_BATCH_SIZE: int = int(os.getenv("FLUSH_BATCH_SIZE", "200"))
+    FLUSH_MAX_CONCURRENCY: int = int(os.getenv("FLUSH_MAX_CONCURRENCY", "2"))
+    FLUSH_LINGER_MS: int = int(os.getenv("FLUSH_LINGER_MS", "20"))
+    COURIER_CACHE_TTL: int = int(os.getenv("COURIER_CACHE_TTL", "300"))  # seconds, 0 disables
+    COURIER_CACHE_SIZE: int = int(os.getenv("COURIER_CACHE_SIZE", "1024"))
+    # Max staleness (ms) of in-process caches after another worker writes (SQLite; 0 disables)
+    CACHE_COHERENCE_INTERVAL_MS: int = int(os.getenv("CACHE_COHERENCE_INTERVAL_MS", "1000"))
+    WARMUP_CONNECTIONS: int = int(os.getenv("WARMUP_CONNECTIONS", "5"))  # pooled connections opened before /ready
 
     # Jazz Configuration
     JAZZ_SYNC_SERVER: str = os.getenv("JAZZ_SYNC_SERVER", "wss://cloud.jazz.tools")
@@ -106,23 +148,37 @@ class Config:
         return {"check_same_thread": False} if self.is_sqlite else {}
 
     def setup_logging(self):
-        """Configure application logging."""
-        log_format = f'[{self.APP_MODE.upper()}] %(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        logging.basicConfig(
-            level=getattr(logging, self.LOG_LEVEL),
-            format=log_format,
-            handlers=[
-                logging.StreamHandler(),
-                logging.FileHandler('app.log') if self.APP_ENV == 'production' else logging.NullHandler()
-            ]
+        """
+        Configure application logging.
+
+        Handlers run on a background listener thread behind a bounded queue
+        (see app.logging_pipeline), so logging never does I/O on the caller.
+        """
+        if self.LOG_FORMAT == "json":
+            formatter = logging_pipeline.JsonFormatter({"mode": self.APP_MODE})
+        else:
+            formatter = logging.Formatter(
+                f'[{self.APP_MODE.upper()}] %(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+        handlers = [logging.StreamHandler()]
+        if self.APP_ENV == 'production':
+            handlers.append(logging.FileHandler('app.log'))
+
+        queue_handler = logging_pipeline.install(
+            handlers,
+            formatter,
+            queue_size=self.LOG_QUEUE_SIZE,
+            sample_rate=self.LOG_INFO_SAMPLE_RATE,
+            exempt=("app.access", __name__),
         )
+        logging.basicConfig(level=getattr(logging, self.LOG_LEVEL), handlers=[queue_handler])
 
         logger = logging.getLogger(__name__)
-        logger.info(f"🚀 App Mode: {self.APP_MODE.upper()}")
-        logger.info(f"   Backend: {'✅' if self.USE_BACKEND else '❌'}")
-        logger.info(f"   Jazz Sync: {'✅' if self.USE_JAZZ_SYNC else '❌'}")
-        logger.info(f"   Jazz-Only: {'✅' if self.JAZZ_ONLY_MODE else '❌'}")
-        logger.info(f"   Offline-First: {'✅' if self.OFFLINE_FIRST else '❌'}")
+        logger.info("🚀 App Mode: %s", self.APP_MODE.upper())
+        logger.info("   Backend: %s", '✅' if self.USE_BACKEND else '❌')
+        logger.info("   Jazz Sync: %s", '✅' if self.USE_JAZZ_SYNC else '❌')
+        logger.info("   Jazz-Only: %s", '✅' if self.JAZZ_ONLY_MODE else '❌')
+        logger.info("   Offline-First: %s", '✅' if self.OFFLINE_FIRST else '❌')
 
 
 config = Config()
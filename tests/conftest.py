@@ -30,6 +30,12 @@ def db_engine():
         echo=False
     )
     SQLModel.metadata.create_all(engine)
+
+    # Each test gets a fresh database, so previously cached couriers are stale
+    from app.dashboard_cache import dashboard_cache
+    from app.services import CourierService
+    CourierService.clear_cache()
+    dashboard_cache.clear()
     
     yield engine
     
@@ -79,6 +85,13 @@ def sample_admin(db_session) -> AdminUser:
     return admin
 
 
+@pytest.fixture
+def admin_headers() -> dict:
+    """Authorization header with a signed admin session token."""
+    from app.admin_tokens import admin_tokens
+    return {"Authorization": f"Bearer {admin_tokens.issue('testadmin')}"}
+
+
 @pytest.fixture
 def sample_feedback(db_session, sample_courier) -> Feedback:
     """Create sample feedback."""
@@ -0,0 +1,118 @@
+"""Tests for signed admin session tokens."""
+import pytest
+from fastapi import status
+
+from app.admin_tokens import AdminTokens
+
+
+class _Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.unit
+@pytest.mark.security
+class TestAdminTokens:
+    """Tests for issuing, verifying and revoking tokens."""
+
+    def test_issue_and_verify(self):
+        """Test a fresh token verifies with its claims."""
+        tokens = AdminTokens(b"secret", ttl=60)
+        claims = tokens.verify(tokens.issue("admin"))
+
+        assert claims["sub"] == "admin"
+        assert claims["exp"] - claims["iat"] == 60
+
+    def test_rejects_tampered_and_foreign_tokens(self):
+        """Test changed payloads and other secrets fail verification."""
+        tokens = AdminTokens(b"secret")
+        token = tokens.issue("admin")
+        payload, signature = token.split(".")
+        forged = tokens.issue("root").split(".")[0] + "." + signature
+
+        assert tokens.verify(forged) is None
+        assert AdminTokens(b"other-secret").verify(token) is None
+        assert tokens.verify("garbage") is None
+        assert tokens.verify("") is None
+
+    def test_rejects_non_ascii_tokens(self):
+        """Test a non-ASCII token is invalid rather than an encoding error."""
+        tokens = AdminTokens(b"secret")
+        payload, signature = tokens.issue("admin").split(".")
+
+        assert tokens.verify("tökén") is None
+        assert tokens.verify(f"{payload}ä.{signature}") is None
+        assert tokens.verify(f"{payload}.{signature}é") is None
+
+    def test_scoped_tokens_verify_only_for_their_scope(self):
+        """Test a ticket issued for one scope is not a session token, and vice versa."""
+        tokens = AdminTokens(b"secret", ttl=3600)
+        ticket = tokens.issue("admin", ttl=60, scope="feedback_stream")
+
+        claims = tokens.verify(ticket, scope="feedback_stream")
+        assert claims["exp"] - claims["iat"] == 60
+        assert tokens.verify(ticket) is None
+        assert tokens.verify(tokens.issue("admin"), scope="feedback_stream") is None
+
+    def test_expiry(self):
+        """Test tokens stop verifying after the TTL."""
+        clock = _Clock()
+        tokens = AdminTokens(b"secret", ttl=60, clock=clock)
+        token = tokens.issue("admin")
+
+        clock.now += 59
+        assert tokens.verify(token) is not None
+        clock.now += 1
+        assert tokens.verify(token) is None
+
+    def test_revocation_is_bounded_and_pruned(self):
+        """Test revoked tokens fail and the list never exceeds its bound."""
+        clock = _Clock()
+        tokens = AdminTokens(b"secret", ttl=60, max_revoked=2, clock=clock)
+        issued = [tokens.issue("admin") for _ in range(3)]
+
+        assert all(tokens.revoke(token) for token in issued)
+        assert tokens.verify(issued[-1]) is None
+        assert len(tokens._revoked) == 2
+        assert tokens.revoke(issued[-1]) is False  # already revoked
+
+        clock.now += 61
+        tokens.revoke(tokens.issue("admin"))
+        assert len(tokens._revoked) == 1
+
+
+@pytest.mark.api
+@pytest.mark.security
+class TestAdminApiAuth:
+    """Tests for token auth on the admin API."""
+
+    def test_admin_routes_require_auth(self, api_client):
+        """Test admin endpoints reject anonymous and bad-token requests."""
+        assert api_client.get("/api/admin/latency").status_code == status.HTTP_401_UNAUTHORIZED
+        response = api_client.get("/api/admin/queries", headers={"Authorization": "Bearer nope"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_non_ascii_token_is_unauthorized(self, api_client):
+        """Test a Latin-1 Bearer token gets 401, not a server error."""
+        headers = {"Authorization": "Bearer t\xe4st.sig".encode("latin-1")}
+        response = api_client.get("/api/admin/latency", headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_feedback_reads_and_sync_status_are_admin_only(self, api_client, admin_headers, sample_feedback):
+        """Test stored feedback and sync status keep their paths but need an admin."""
+        for path in ("/api/feedback", f"/api/feedback/{sample_feedback.id}", "/api/sync/status"):
+            assert api_client.get(path).status_code == status.HTTP_401_UNAUTHORIZED
+            assert api_client.get(path, headers=admin_headers).status_code == status.HTTP_200_OK
+
+    def test_token_login_and_logout(self, api_client, sample_admin):
+        """Test Basic credentials buy a token that works until logout."""
+        response = api_client.post("/api/admin/token", auth=("testadmin", "testpass123"))
+        assert response.status_code == status.HTTP_200_OK
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        assert api_client.get("/api/admin/latency", headers=headers).status_code == status.HTTP_200_OK
+        assert api_client.post("/api/admin/logout", headers=headers).json() == {"revoked": True}
+        assert api_client.get("/api/admin/latency", headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
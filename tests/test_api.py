@@ -33,33 +33,33 @@ class TestFeedbackEndpoints:
 
         assert response.status_code == status.HTTP_409_CONFLICT
 
-    def test_get_feedback_by_id_success(self, api_client, sample_feedback):
+    def test_get_feedback_by_id_success(self, api_client, admin_headers, sample_feedback):
         """Test GET /api/feedback/{id} success."""
-        response = api_client.get(f"/api/feedback/{sample_feedback.id}")
+        response = api_client.get(f"/api/feedback/{sample_feedback.id}", headers=admin_headers)
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert data["id"] == sample_feedback.id
         assert data["order_id"] == sample_feedback.order_id
 
-    def test_get_feedback_not_found(self, api_client):
+    def test_get_feedback_not_found(self, api_client, admin_headers):
         """Test GET /api/feedback/{id} not found."""
-        response = api_client.get("/api/feedback/999")
+        response = api_client.get("/api/feedback/999", headers=admin_headers)
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
-    def test_list_feedback_all(self, api_client, sample_feedback):
+    def test_list_feedback_all(self, api_client, admin_headers, sample_feedback):
         """Test GET /api/feedback list all."""
-        response = api_client.get("/api/feedback")
+        response = api_client.get("/api/feedback", headers=admin_headers)
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert isinstance(data, list)
         assert len(data) >= 1
 
-    def test_list_feedback_filter_by_courier(self, api_client, sample_courier, sample_feedback):
+    def test_list_feedback_filter_by_courier(self, api_client, admin_headers, sample_courier, sample_feedback):
         """Test GET /api/feedback with courier filter."""
-        response = api_client.get(f"/api/feedback?courier_id={sample_courier.id}")
+        response = api_client.get(f"/api/feedback?courier_id={sample_courier.id}", headers=admin_headers)
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -85,3 +85,38 @@ class TestCourierEndpoints:
         response = api_client.get("/api/courier/999")
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.api
+@pytest.mark.unit
+class TestReadiness:
+    """Tests for warmup and the /ready endpoint."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_readiness(self):
+        from app.services import CourierService
+        from app.startup import readiness
+        readiness.reset()
+        CourierService.clear_cache()
+        yield readiness
+        readiness.reset()
+
+    def test_not_ready_before_warmup(self, api_client):
+        """Test /ready returns 503 until warmup has run."""
+        response = api_client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+
+    def test_ready_after_warmup(self, api_client, sample_courier):
+        """Test warmup primes caches, records phases and flips /ready."""
+        from app.services import CourierService
+        from app.startup import warmup
+
+        warmup(connections=2)
+
+        response = api_client.get("/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert set(data["phases_ms"]) == {"pool", "statements", "couriers"}
+        assert sample_courier.id in CourierService._cache
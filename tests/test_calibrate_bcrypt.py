@@ -0,0 +1,44 @@
+"""Tests for the bcrypt cost calibration command."""
+import pytest
+
+from app.calibrate_bcrypt import calibrate, main, save_rounds
+
+
+@pytest.mark.unit
+@pytest.mark.security
+class TestCalibrateBcrypt:
+    """Tests for benchmarking and saving a bcrypt cost."""
+
+    def test_recommends_highest_cost_within_target(self):
+        """Test the recommendation is the last cost under the target."""
+        result = calibrate(target_ms=10_000, min_rounds=4, max_rounds=6, samples=1)
+
+        assert list(result["timings_ms"]) == [4, 5, 6]
+        assert result["recommended"] == 6
+
+    def test_no_recommendation_below_minimum(self):
+        """Test an unreachable target yields no recommendation."""
+        result = calibrate(target_ms=0, min_rounds=4, max_rounds=6, samples=1)
+
+        assert result["recommended"] is None
+        assert list(result["timings_ms"]) == [4]
+
+    def test_save_rounds_replaces_existing_setting(self, tmp_path):
+        """Test BCRYPT_ROUNDS is updated in place, other lines kept."""
+        env_file = tmp_path / ".env"
+        env_file.write_text("APP_ENV=production\nBCRYPT_ROUNDS=12\n")
+
+        save_rounds(env_file, 11)
+        assert env_file.read_text() == "APP_ENV=production\nBCRYPT_ROUNDS=11\n"
+
+        other = tmp_path / "new.env"
+        save_rounds(other, 10)
+        assert other.read_text() == "BCRYPT_ROUNDS=10\n"
+
+    def test_main_saves_recommendation(self, tmp_path, capsys):
+        """Test the command prints timings and saves the cost."""
+        env_file = tmp_path / ".env"
+
+        assert main(["--target-ms", "10000", "--max-rounds", "5", "--samples", "1", "--env-file", str(env_file)]) == 0
+        assert "Recommended: BCRYPT_ROUNDS=5" in capsys.readouterr().out
+        assert env_file.read_text() == "BCRYPT_ROUNDS=5\n"
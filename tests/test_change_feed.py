@@ -0,0 +1,261 @@
+"""Tests for the feedback change feed and live, incremental dashboard updates."""
+import asyncio
+import threading
+
+import pytest
+
+from app.change_feed import ChangeFeed
+from app.records import FeedbackRow
+
+
+def _row(id_: int) -> FeedbackRow:
+    return FeedbackRow(id_, f"LIVE{id_}", "Test Courier", 5, None, (), False, False, "2024-01-01 12:00:00")
+
+
+@pytest.mark.unit
+@pytest.mark.timeout(30)
+class TestChangeFeed:
+    """Tests for ChangeFeed."""
+
+    async def test_publish_from_another_thread_wakes_waiter(self):
+        """Test a write committed on a worker thread wakes an async waiter at once."""
+        feed = ChangeFeed()
+        waiter = asyncio.create_task(feed.wait(feed.sequence, timeout=10))
+        await asyncio.sleep(0.01)
+        assert feed.waiters == 1
+
+        await asyncio.to_thread(feed.publish)
+
+        assert await asyncio.wait_for(waiter, 2) == 1
+        assert feed.waiters == 0
+
+    async def test_wait_times_out_without_writes(self):
+        """Test the sequence comes back unchanged when nothing was written."""
+        feed = ChangeFeed()
+
+        assert await feed.wait(0, timeout=0.01) == 0
+
+    async def test_missed_write_returns_immediately(self):
+        """Test a write published before the wait started is not lost."""
+        feed = ChangeFeed()
+        seen = feed.sequence
+        feed.publish()
+
+        assert await feed.wait(seen, timeout=10) == seen + 1
+
+    def test_listeners_run_before_waiters_wake(self):
+        """Test sync listeners (the result cache) see the write first."""
+        feed = ChangeFeed()
+        order = []
+        feed.subscribe(lambda: order.append(feed.sequence))
+
+        feed.publish()
+
+        assert order == [0]
+        assert feed.sequence == 1
+
+
+@pytest.mark.api
+@pytest.mark.integration
+@pytest.mark.timeout(30)
+class TestFeedbackStream:
+    """Tests for GET /api/admin/feedback/stream."""
+
+    @pytest.fixture
+    def short_stream(self, monkeypatch):
+        from config import config
+        monkeypatch.setattr(config, "DASHBOARD_LIVE_SECONDS", 1)
+
+    def _events(self, api_client, admin_headers, **kwargs):
+        with api_client.stream("GET", "/api/admin/feedback/stream", headers=admin_headers, **kwargs) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            return [line for line in response.iter_lines() if line.startswith("id: ")]
+
+    def test_requires_admin(self, api_client):
+        """Test the stream is admin-only."""
+        assert api_client.get("/api/admin/feedback/stream").status_code == 401
+
+    def test_browser_opens_stream_with_ticket(self, api_client, admin_headers, sample_courier, short_stream):
+        """Test an EventSource-style request (no headers) authenticates by ticket."""
+        from app.services import FeedbackService
+        first = FeedbackService.create_feedback({"order_id": "SSE_T1", "courier_id": sample_courier.id, "rating": 4})
+        second = FeedbackService.create_feedback({"order_id": "SSE_T2", "courier_id": sample_courier.id, "rating": 4})
+        ticket = api_client.post("/api/admin/feedback/stream/ticket", headers=admin_headers).json()["ticket"]
+
+        events = self._events(api_client, {}, params={"ticket": ticket, "after_id": first.id})
+
+        assert events == [f"id: {second.id}"]
+
+    def test_ticket_only_opens_the_stream(self, api_client, admin_headers):
+        """Test a stream ticket is not an admin session and forged tickets fail."""
+        ticket = api_client.post("/api/admin/feedback/stream/ticket", headers=admin_headers).json()["ticket"]
+
+        latency = api_client.get("/api/admin/latency", headers={"Authorization": f"Bearer {ticket}"})
+        assert latency.status_code == 401
+        assert api_client.get("/api/admin/feedback/stream", params={"ticket": "forged"}).status_code == 401
+
+    def test_resumes_after_last_event_id(self, api_client, admin_headers, sample_courier, short_stream):
+        """Test a reconnect gets only rows newer than the last one it saw."""
+        from app.services import FeedbackService
+        ids = [
+            FeedbackService.create_feedback({"order_id": f"SSE{i}", "courier_id": sample_courier.id, "rating": 4}).id
+            for i in range(3)
+        ]
+
+        events = self._events(api_client, {**admin_headers, "Last-Event-ID": str(ids[0])})
+
+        assert events == [f"id: {ids[1]}", f"id: {ids[2]}"]
+
+    def test_pushes_feedback_written_while_open(self, api_client, admin_headers, sample_courier, short_stream):
+        """Test a write during the stream is delivered without a reconnect."""
+        from app.services import FeedbackService
+        FeedbackService.create_feedback({"order_id": "SSE_OLD", "courier_id": sample_courier.id, "rating": 4})
+        created = []
+        writer = threading.Timer(
+            0.3,
+            lambda: created.append(FeedbackService.create_feedback(
+                {"order_id": "SSE_NEW", "courier_id": sample_courier.id, "rating": 5}
+            ).id),
+        )
+        writer.start()
+        try:
+            events = self._events(api_client, admin_headers)
+        finally:
+            writer.join()
+
+        # Starts after the newest feedback: only the live write is sent
+        assert events == [f"id: {created[0]}"]
+
+
+@pytest.mark.unit
+@pytest.mark.state
+class TestLiveDashboard:
+    """Tests for prepending live rows to the admin table."""
+
+    @pytest.fixture
+    def state(self):
+        from reflex.state import State
+        from app.states.admin_state import AdminState
+        root = State(_reflex_internal_init=True)
+        return root.substates[AdminState.get_name()]
+
+    def test_new_rows_go_on_top(self, state):
+        """Test new rows are prepended newest first and counted."""
+        from config import config
+        state._window = [_row(i) for i in range(config.DASHBOARD_WINDOW_ROWS, 0, -1)]
+        state.total_rows = 100
+
+        state._prepend([_row(101), _row(102)])
+
+        assert [row.id for row in state._window[:3]] == [102, 101, config.DASHBOARD_WINDOW_ROWS]
+        assert len(state._window) == config.DASHBOARD_WINDOW_ROWS
+        assert state.total_rows == 102
+        assert state._last_id == 102
+
+    def test_scrolled_window_keeps_its_rows(self, state):
+        """Test a window further down shifts instead of changing its rows."""
+        window = [_row(i) for i in range(40, 30, -1)]
+        state._window = list(window)
+        state.window_start = 20
+        state.total_rows = 60
+
+        state._prepend([_row(61)])
+
+        assert state._window == window
+        assert state.window_start == 21
+        assert state.total_rows == 61
+
+
+@pytest.mark.integration
+@pytest.mark.state
+@pytest.mark.database
+class TestIncrementalLoad:
+    """Tests for loading only feedback newer than the table's high-water id."""
+
+    @pytest.fixture
+    def dashboard(self, db_engine, sample_courier, monkeypatch):
+        """An authenticated AdminState and a helper adding n feedback rows."""
+        import app.services
+        from reflex.state import State
+        from app.admin_tokens import admin_tokens
+        from app.services import FeedbackService
+        from app.states.admin_state import AdminState
+
+        monkeypatch.setattr(app.services, "engine", db_engine)
+        root = State(_reflex_internal_init=True)
+        state = root.substates[AdminState.get_name()]
+        state.admin_token = admin_tokens.issue("testadmin")
+        added = []
+
+        def add(n, rating=5):
+            for _ in range(n):
+                FeedbackService.create_feedback(
+                    {"order_id": f"INC{len(added)}", "courier_id": sample_courier.id, "rating": rating}
+                )
+                added.append(1)
+
+        return state, add
+
+    def _no_full_load(self, monkeypatch):
+        from app.states.admin_state import AdminState
+        monkeypatch.setattr(AdminState, "_first_window", staticmethod(lambda *a: pytest.fail("full reload")))
+
+    async def test_reload_fetches_only_new_rows(self, dashboard, monkeypatch):
+        """Test loading again with the same filters merges new rows on top."""
+        state, add = dashboard
+        add(3)
+        await state.load_feedback()
+        first_ids = [row.id for row in state._window]
+
+        add(2, rating=1)
+        add(1, rating=5)
+        self._no_full_load(monkeypatch)
+        await state.load_feedback()
+
+        assert state.total_rows == 6
+        assert [row.rating for row in state._window[:3]] == [5, 1, 1]
+        assert [row.id for row in state._window[3:]] == first_ids
+        assert state._last_id == state._window[0].id
+
+    async def test_new_rows_respect_filters(self, dashboard, monkeypatch):
+        """Test only new rows matching the loaded filters are merged."""
+        state, add = dashboard
+        state.filter_ratings = [1]
+        add(2, rating=1)
+        await state.load_feedback()
+
+        add(3, rating=5)
+        add(1, rating=1)
+        self._no_full_load(monkeypatch)
+        await state.load_feedback()
+
+        assert state.total_rows == 3
+        assert {row.rating for row in state._window} == {1}
+
+    async def test_filter_change_and_explicit_reload_load_in_full(self, dashboard):
+        """Test a new filter state or Reload reads from scratch."""
+        state, add = dashboard
+        add(4)
+        await state.load_feedback()
+        state._window = []
+        state.total_rows = 0
+
+        await state.reload_feedback()
+        assert state.total_rows == 4
+
+        state.filter_ratings = [1]
+        await state.load_feedback()
+        assert state.total_rows == 0
+
+    async def test_high_water_going_back_reloads(self, dashboard):
+        """Test a table that lost rows since the last load is reloaded."""
+        state, add = dashboard
+        add(2)
+        await state.load_feedback()
+        state._last_id += 10
+        state.total_rows = 99
+
+        await state.load_feedback()
+
+        assert state.total_rows == 2
@@ -0,0 +1,179 @@
+"""Tests for cross-worker cache coherence."""
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.coherence import DataVersionWatcher, track_writes
+from app.database import Courier, Feedback
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Caches the feedback count and courier 1, waits for a line on stdin, then
+# reads both again after the staleness bound
+_READER = textwrap.dedent("""
+    import sys, time
+    from app.records import FeedbackFilters
+    from app.services import CourierService, DashboardService
+
+    def snapshot():
+        print(DashboardService.count(FeedbackFilters()), CourierService.find_courier(1).name, flush=True)
+
+    snapshot()
+    sys.stdin.readline()
+    time.sleep(0.2)
+    snapshot()
+""")
+
+_WRITER = textwrap.dedent("""
+    from sqlmodel import Session, text
+    from app.database import engine
+    from app.services import FeedbackService
+
+    FeedbackService.create_feedback({"order_id": "OTHER_WORKER", "courier_id": 1, "rating": 5})
+    with Session(engine) as session:
+        session.exec(text("UPDATE courier SET name = 'Renamed' WHERE id = 1"))
+        session.commit()
+""")
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestDataVersionWatcher:
+    """Tests for DataVersionWatcher within one process."""
+
+    def _watch(self, engine):
+        """A bound watcher and the tables its invalidations ran for."""
+        watcher = DataVersionWatcher(interval=0.001)
+        calls = []
+        watcher.subscribe(lambda: calls.append("courier"), "courier")
+        watcher.subscribe(lambda: calls.append("feedback"), "feedback")
+        watcher.check(engine)  # binds and records the current versions
+        return watcher, calls
+
+    def _check(self, watcher, engine):
+        watcher._next_check = 0
+        return watcher.check(engine)
+
+    def test_other_writer_invalidates_the_tables_it_wrote(self, db_engine):
+        """Test a commit from another writer runs only that table's subscribers, once."""
+        track_writes(db_engine)
+        watcher, calls = self._watch(db_engine)
+        other = create_engine(db_engine.url, connect_args={"check_same_thread": False})
+        track_writes(other, writer="other-worker")
+        try:
+            with Session(other) as session:
+                session.add(Courier(name="Elsewhere", phone="+1"))
+                session.commit()
+
+            assert self._check(watcher, db_engine) is True
+            assert self._check(watcher, db_engine) is False
+            assert calls == ["courier"]
+        finally:
+            watcher.close()
+            other.dispose()
+
+    def test_own_writes_do_not_invalidate(self, db_engine, sample_courier):
+        """Test this process's commits on other pooled connections are ignored."""
+        track_writes(db_engine)
+        watcher, calls = self._watch(db_engine)
+        try:
+            with Session(db_engine) as session:
+                session.add(Feedback(order_id="OWN1", courier_id=sample_courier.id, rating=5))
+                session.commit()
+
+            assert self._check(watcher, db_engine) is False
+            assert calls == []
+        finally:
+            watcher.close()
+
+    def test_feedback_write_keeps_courier_cache(self, db_engine, sample_courier, monkeypatch):
+        """Test a local feedback insert leaves cached couriers in place."""
+        import app.services
+        from app.coherence import coherence
+        from app.services import CourierService, FeedbackService
+
+        monkeypatch.setattr(app.services, "engine", db_engine)
+        monkeypatch.setattr(coherence, "interval", 0.001)
+        track_writes(db_engine)
+        try:
+            self._check(coherence, db_engine)
+            CourierService.find_courier(sample_courier.id)
+
+            FeedbackService.create_feedback({"order_id": "KEEP1", "courier_id": sample_courier.id, "rating": 5})
+
+            assert self._check(coherence, db_engine) is False
+            assert sample_courier.id in CourierService._cache
+        finally:
+            coherence.close()
+
+    def test_checks_are_rate_limited(self, db_engine):
+        """Test calls within the interval do not touch the database."""
+        watcher = DataVersionWatcher(interval=60)
+        watcher.check(db_engine)
+        watcher._read = lambda: pytest.fail("read inside the interval")
+        try:
+            assert watcher.check(db_engine) is False
+        finally:
+            watcher.close()
+
+
+@pytest.mark.integration
+@pytest.mark.slow
+class TestTwoWorkers:
+    """Two worker processes sharing one SQLite database."""
+
+    @pytest.fixture
+    def database_url(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'shared.db'}"
+        engine = create_engine(url)
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(Courier(id=1, name="Original", phone="+1"))
+            session.commit()
+        engine.dispose()
+        return url
+
+    def _env(self, database_url, interval_ms):
+        return {
+            **os.environ,
+            "DATABASE_URL": database_url,
+            "APP_ENV": "testing",
+            "APP_MODE": "traditional",
+            "LOG_LEVEL": "ERROR",
+            "CACHE_COHERENCE_INTERVAL_MS": str(interval_ms),
+        }
+
+    def _observe(self, database_url, interval_ms):
+        """What the reader worker sees before and after the writer worker runs."""
+        env = self._env(database_url, interval_ms)
+        reader = subprocess.Popen(
+            [sys.executable, "-c", _READER], cwd=_ROOT, env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            before = reader.stdout.readline().split()
+            subprocess.run([sys.executable, "-c", _WRITER], cwd=_ROOT, env=env, check=True, timeout=60)
+            reader.stdin.write("\n")
+            reader.stdin.flush()
+            after = reader.stdout.readline().split()
+            assert reader.wait(timeout=60) == 0
+        finally:
+            reader.kill()
+        return before, after
+
+    def test_caches_follow_writes_from_another_worker(self, database_url):
+        """Test cached dashboard counts and couriers refresh within the bound."""
+        before, after = self._observe(database_url, interval_ms=50)
+
+        assert before == ["0", "Original"]
+        assert after == ["1", "Renamed"]
+
+    def test_without_coherence_caches_stay_stale(self, database_url):
+        """Test the other worker's write is invisible to cached reads when disabled."""
+        before, after = self._observe(database_url, interval_ms=0)
+
+        assert before == after == ["0", "Original"]
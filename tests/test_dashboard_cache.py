@@ -0,0 +1,105 @@
+"""Tests for the shared dashboard result cache."""
+import pytest
+
+from app.dashboard_cache import ResultCache
+from app.records import FeedbackFilters, FeedbackRow
+
+
+def _loader(value):
+    """A load function that counts its calls."""
+    def load():
+        load.calls += 1
+        return value
+    load.calls = 0
+    return load
+
+
+@pytest.mark.unit
+class TestResultCache:
+    """Tests for ResultCache."""
+
+    def test_identical_queries_share_one_load(self):
+        """Test a second lookup for the same key is a hit."""
+        cache = ResultCache(max_entries=8)
+        load = _loader(42)
+
+        assert cache.get_or_load(("count", FeedbackFilters(ratings=(5,))), load) == 42
+        assert cache.get_or_load(("count", FeedbackFilters(ratings=(5,))), load) == 42
+
+        assert load.calls == 1
+        assert cache.hit_ratio == 0.5
+
+    def test_write_version_invalidates(self):
+        """Test a write makes every cached result stale."""
+        cache = ResultCache(max_entries=8)
+        cache.get_or_load("key", _loader("old"))
+
+        cache.bump()
+
+        assert cache.get_or_load("key", _loader("new")) == "new"
+
+    def test_result_read_before_a_write_is_not_stored(self):
+        """Test a query that overlaps a write is never served afterwards."""
+        cache = ResultCache(max_entries=8)
+
+        def load_during_write():
+            cache.bump()  # another worker commits while this query runs
+            return "maybe stale"
+
+        assert cache.get_or_load("key", load_during_write) == "maybe stale"
+        assert cache.entries == 0
+        assert cache.get_or_load("key", _loader("fresh")) == "fresh"
+
+    def test_lru_eviction_and_memory(self):
+        """Test the size bound evicts least recently used entries and frees their memory."""
+        cache = ResultCache(max_entries=2)
+        row = FeedbackRow(1, "ORD1", "Alex", 5, "Great", ("Punctuality",), True, False, "2024-01-15")
+        cache.get_or_load("a", _loader((row,)))
+        cache.get_or_load("b", _loader((row, row)))
+        cache.get_or_load("a", _loader(None))  # "a" becomes most recent
+        used = cache.memory_bytes
+
+        cache.get_or_load("c", _loader(()))
+
+        assert cache.entries == 2
+        assert cache.get_or_load("a", _loader(None)) == (row,)
+        assert cache.memory_bytes < used
+        assert cache.memory_bytes > 0
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestDashboardCaching:
+    """Tests for DashboardService results through the cache."""
+
+    def test_insert_refreshes_cached_count(self, db_engine, sample_courier, monkeypatch):
+        """Test a submit through the service is visible to the next dashboard query."""
+        import app.services
+        from app.dashboard_cache import dashboard_cache
+        from app.services import DashboardService, FeedbackService
+
+        monkeypatch.setattr(app.services, "engine", db_engine)
+        filters = FeedbackFilters()
+        assert DashboardService.count(filters) == 0
+        hits = dashboard_cache.hits
+        assert DashboardService.count(FeedbackFilters(ratings=())) == 0
+        assert dashboard_cache.hits == hits + 1
+
+        FeedbackService.create_feedback({"order_id": "CACHE1", "courier_id": sample_courier.id, "rating": 4})
+
+        assert DashboardService.count(filters) == 1
+        assert DashboardService.load_window(filters, 0, 10)[1][0].order_id == "CACHE1"
+
+    def test_equivalent_filters_share_an_entry(self, db_engine, sample_courier, monkeypatch):
+        """Test filter normalization: rating order and invalid dates don't split the cache."""
+        import app.services
+        from app.dashboard_cache import dashboard_cache
+        from app.services import DashboardService
+
+        monkeypatch.setattr(app.services, "engine", db_engine)
+        DashboardService.page(FeedbackFilters(ratings=(5, 1)), 0, 10)
+        hits = dashboard_cache.hits
+
+        DashboardService.page(FeedbackFilters(from_date="bogus", ratings=(1, 5, 5)), 0, 10)
+
+        assert dashboard_cache.hits == hits + 1
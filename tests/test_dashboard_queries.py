@@ -0,0 +1,101 @@
+"""Tests for latest-wins dashboard queries."""
+import asyncio
+import time
+
+import pytest
+from sqlmodel import Session, text
+
+from app.dashboard_queries import DASHBOARD_QUERIES, LatestQueries, QueryCancelled
+
+# Counts to 10^9: minutes of work unless interrupted
+_SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+    "SELECT count(*) FROM c"
+)
+
+
+def _outcome(name: str) -> float:
+    return DASHBOARD_QUERIES.labels(name).value
+
+
+@pytest.mark.unit
+@pytest.mark.database
+@pytest.mark.timeout(30)
+class TestLatestQueries:
+    """Tests for LatestQueries."""
+
+    @pytest.fixture
+    def run_sql(self, db_engine):
+        """Query factory: runs a statement on an attached session."""
+        def factory(statement, started=None):
+            def fn(query):
+                with Session(db_engine) as session, query.attached(session):
+                    if started is not None:
+                        started.set()
+                    return session.exec(statement).one()[0]
+            return fn
+        return factory
+
+    async def test_new_query_interrupts_running_one(self, run_sql):
+        """Test a newer query for the same client interrupts the older one."""
+        import threading
+
+        queries = LatestQueries()
+        started = threading.Event()
+        cancelled_before = _outcome("cancelled")
+
+        slow = asyncio.create_task(queries.run("client", run_sql(_SLOW_QUERY, started)))
+        await asyncio.to_thread(started.wait, 5)
+        start = time.perf_counter()
+        latest = await queries.run("client", run_sql(text("SELECT 42")))
+
+        with pytest.raises(QueryCancelled):
+            await slow
+        assert latest == 42
+        assert time.perf_counter() - start < 5
+        assert _outcome("cancelled") == cancelled_before + 1
+
+    async def test_burst_of_changes_completes_one_query(self, run_sql):
+        """Test coalescing: rapid changes finish only the latest query."""
+        queries = LatestQueries()
+        completed_before = _outcome("completed")
+        cancelled_before = _outcome("cancelled")
+
+        tasks = [asyncio.create_task(queries.run("client", run_sql(_SLOW_QUERY))) for _ in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(queries.run("client", run_sql(text("SELECT 1")))))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert all(isinstance(result, QueryCancelled) for result in results[:4])
+        assert results[4] == 1
+        assert _outcome("completed") == completed_before + 1
+        assert _outcome("cancelled") == cancelled_before + 4
+
+    async def test_clients_do_not_cancel_each_other(self, run_sql):
+        """Test queries for different clients run independently."""
+        queries = LatestQueries()
+
+        results = await asyncio.gather(
+            queries.run("a", run_sql(text("SELECT 1"))),
+            queries.run("b", run_sql(text("SELECT 2"))),
+        )
+
+        assert results == [1, 2]
+        assert not queries.cancel("a")
+
+    async def test_cancel_before_statement_starts(self, db_engine):
+        """Test a cancel between statements stops the next one from running."""
+        queries = LatestQueries()
+
+        def fn(query):
+            with Session(db_engine) as session, query.attached(session):
+                session.exec(text("SELECT 1")).one()
+                queries.cancel("client")
+                return session.exec(_SLOW_QUERY).one()[0]
+
+        with pytest.raises(QueryCancelled):
+            await queries.run("client", fn)
+
+        # The hooks are gone: the pooled connection runs queries normally
+        with Session(db_engine) as session:
+            assert session.exec(text("SELECT 7")).one()[0] == 7
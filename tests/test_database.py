@@ -91,3 +91,69 @@ class TestPasswordFunctions:
         """Test password verification with invalid hash."""
         result = verify_password("password", "invalid_hash")
         assert result is False
+
+    def test_hash_uses_configured_rounds(self, monkeypatch):
+        """Test hashes are made at BCRYPT_ROUNDS unless rounds is given."""
+        from app.database import config, hash_rounds
+
+        monkeypatch.setattr(config, "BCRYPT_ROUNDS", 5)
+        assert hash_rounds(hash_password("pw")) == 5
+        assert hash_rounds(hash_password("pw", rounds=4)) == 4
+        assert hash_rounds("invalid_hash") is None
+
+    def test_verify_and_update(self, monkeypatch):
+        """Test a new hash is returned only for a matching, outdated hash."""
+        from app.database import config, hash_rounds, verify_and_update
+
+        monkeypatch.setattr(config, "BCRYPT_ROUNDS", 5)
+        old_hash = hash_password("pw", rounds=4)
+
+        assert verify_and_update("wrong", old_hash) == (False, None)
+        matches, new_hash = verify_and_update("pw", old_hash)
+        assert matches is True
+        assert hash_rounds(new_hash) == 5
+        assert verify_password("pw", new_hash)
+        assert verify_and_update("pw", new_hash) == (True, None)
+
+
+@pytest.mark.database
+@pytest.mark.unit
+class TestSchemaFingerprint:
+    """Tests for skipping DDL and seeding when the schema is unchanged."""
+
+    @pytest.fixture
+    def patched_engine(self, db_engine, monkeypatch):
+        import app.database
+        monkeypatch.setattr(app.database, "engine", db_engine)
+        return db_engine
+
+    def test_second_run_skips_ddl_and_seeding(self, patched_engine):
+        """Test that an unchanged fingerprint skips setup, even for deleted seed rows."""
+        from app.database import create_db_and_tables
+
+        assert create_db_and_tables() is True
+        assert create_db_and_tables() is False
+
+        with Session(patched_engine) as session:
+            session.delete(session.get(Courier, 123))
+            session.commit()
+
+        assert create_db_and_tables() is False
+        with Session(patched_engine) as session:
+            assert session.get(Courier, 123) is None
+
+        assert create_db_and_tables(force=True) is True
+        with Session(patched_engine) as session:
+            assert session.get(Courier, 123) is not None
+
+    def test_seed_version_change_reruns_setup(self, patched_engine, monkeypatch):
+        """Test that bumping SEED_VERSION changes the fingerprint."""
+        import app.database
+        from app.database import create_db_and_tables, schema_fingerprint
+
+        create_db_and_tables()
+        before = schema_fingerprint()
+        monkeypatch.setattr(app.database, "SEED_VERSION", app.database.SEED_VERSION + 1)
+
+        assert schema_fingerprint() != before
+        assert create_db_and_tables() is True
@@ -7,7 +7,7 @@ from fastapi import status
 class TestFeedbackSubmissionFlow:
     """Test complete feedback submission workflow."""
 
-    def test_complete_feedback_flow(self, api_client, sample_courier):
+    def test_complete_feedback_flow(self, api_client, admin_headers, sample_courier):
         """Test end-to-end feedback submission."""
         # 1. Create feedback
         feedback_data = {
@@ -24,7 +24,7 @@ class TestFeedbackSubmissionFlow:
         feedback_id = create_response.json()["id"]
 
         # 2. Retrieve feedback
-        get_response = api_client.get(f"/api/feedback/{feedback_id}")
+        get_response = api_client.get(f"/api/feedback/{feedback_id}", headers=admin_headers)
         assert get_response.status_code == status.HTTP_200_OK
         feedback = get_response.json()
 
@@ -33,7 +33,7 @@ class TestFeedbackSubmissionFlow:
         assert feedback["needs_follow_up"] is False
 
         # 3. List all feedback (should include our new one)
-        list_response = api_client.get("/api/feedback")
+        list_response = api_client.get("/api/feedback", headers=admin_headers)
         assert list_response.status_code == status.HTTP_200_OK
         all_feedback = list_response.json()
 
@@ -63,7 +63,7 @@ class TestFeedbackSubmissionFlow:
 class TestCourierWorkflow:
     """Test courier-related workflows."""
 
-    def test_courier_with_multiple_feedback(self, api_client, db_session, sample_courier):
+    def test_courier_with_multiple_feedback(self, api_client, admin_headers, db_session, sample_courier):
         """Test courier with multiple feedback entries."""
         # Create multiple feedback for same courier
         for i in range(3):
@@ -78,7 +78,7 @@ class TestCourierWorkflow:
             assert response.status_code == status.HTTP_200_OK
 
         # Get courier's feedback
-        response = api_client.get(f"/api/feedback?courier_id={sample_courier.id}")
+        response = api_client.get(f"/api/feedback?courier_id={sample_courier.id}", headers=admin_headers)
         assert response.status_code == status.HTTP_200_OK
 
         feedback_list = response.json()
@@ -0,0 +1,96 @@
+"""Tests for the queued, non-blocking logging pipeline."""
+import json
+import logging
+import queue
+
+import pytest
+
+from app import logging_pipeline
+from app.logging_pipeline import BoundedQueueHandler, JsonFormatter, SamplingFilter
+
+
+def _record(level: int = logging.INFO, msg: str = "hello %s", args=("world",), name: str = "app.test"):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+@pytest.mark.unit
+class TestBoundedQueueHandler:
+    """Queueing, lazy formatting and the drop policy."""
+
+    def test_prepare_merges_args(self):
+        handler = BoundedQueueHandler(queue.Queue())
+        handler.handle(_record())
+
+        queued = handler.queue.get_nowait()
+        assert queued.msg == "hello world"
+        assert queued.args is None
+
+    def test_full_queue_drops_info(self):
+        handler = BoundedQueueHandler(queue.Queue(maxsize=2))
+        for _ in range(5):
+            handler.handle(_record())
+
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+
+    def test_full_queue_keeps_warnings_by_evicting_oldest(self):
+        handler = BoundedQueueHandler(queue.Queue(maxsize=2))
+        handler.handle(_record(msg="first", args=()))
+        handler.handle(_record(msg="second", args=()))
+        handler.handle(_record(logging.ERROR, msg="disk full", args=()))
+
+        messages = [handler.queue.get_nowait().msg for _ in range(2)]
+        assert messages == ["second", "disk full"]
+        assert handler.dropped == 1
+
+
+@pytest.mark.unit
+class TestSamplingFilter:
+    """Sampling of high-volume INFO logs."""
+
+    def test_warnings_and_exempt_loggers_always_pass(self):
+        sampler = SamplingFilter(0.0, exempt=("app.access",))
+        assert sampler.filter(_record(logging.WARNING))
+        assert sampler.filter(_record(name="app.access"))
+        assert not sampler.filter(_record())
+
+    def test_keeps_roughly_rate(self):
+        sampler = SamplingFilter(0.25)
+        kept = sum(sampler.filter(_record()) for _ in range(4000))
+        assert 800 < kept < 1200
+
+
+@pytest.mark.unit
+class TestPipeline:
+    """End-to-end delivery through the listener thread."""
+
+    def test_install_delivers_json_records(self, monkeypatch):
+        # Leave the application's own pipeline running
+        monkeypatch.setattr(logging_pipeline, "_listener", None)
+        monkeypatch.setattr(logging_pipeline, "_queue_handler", None)
+        target = _ListHandler()
+        handler = logging_pipeline.install([target], JsonFormatter({"mode": "hybrid"}))
+        logger = logging.getLogger("app.test_pipeline")
+        logger.addHandler(handler)
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        try:
+            logger.warning("order %s failed", "ORD1")
+        finally:
+            logging_pipeline.stop()
+            logger.removeHandler(handler)
+            logger.propagate = True
+
+        entry = json.loads(target.lines[0])
+        assert entry["message"] == "order ORD1 failed"
+        assert entry["level"] == "WARNING"
+        assert entry["mode"] == "hybrid"
@@ -0,0 +1,144 @@
+"""Tests for the event-loop monitor and background-task instrumentation."""
+import asyncio
+import logging
+import time
+
+import pytest
+
+from app.loop_monitor import (
+    BACKGROUND_TASK_SECONDS,
+    EVENT_LOOP_BLOCKS,
+    EVENT_LOOP_LAG_SECONDS,
+    STATE_LOCK_HOLD_SECONDS,
+    STATE_LOCK_WAIT_SECONDS,
+    LoopMonitor,
+    _running,
+    state_lock,
+    track_background,
+)
+
+
+class _FakeState:
+    """Stand-in for a StateProxy: an async context manager with a lock."""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.lock.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.lock.release()
+
+
+def _count(histogram, label: str) -> int:
+    return histogram.labels(label).snapshot()["count"]
+
+
+@pytest.mark.unit
+class TestBackgroundTracking:
+    """Running-task counts and state-lock timings per handler."""
+
+    async def test_coroutine_handler_counted_while_running(self):
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        @track_background
+        async def slow_handler():
+            started.set()
+            await release.wait()
+            return "done"
+
+        name = slow_handler.__qualname__
+        before = _count(BACKGROUND_TASK_SECONDS, name)
+        task = asyncio.create_task(slow_handler())
+        await started.wait()
+        assert _running[name] == 1
+
+        release.set()
+        assert await task == "done"
+        assert _running[name] == 0
+        assert _count(BACKGROUND_TASK_SECONDS, name) == before + 1
+
+    async def test_async_generator_handler_yields_updates(self):
+        @track_background
+        async def gen_handler():
+            yield "first"
+            yield "second"
+
+        assert [item async for item in gen_handler()] == ["first", "second"]
+        assert _running[gen_handler.__qualname__] == 0
+
+    async def test_state_lock_attributed_to_handler(self):
+        state = _FakeState()
+
+        @track_background
+        async def locking_handler():
+            async with state_lock(state):
+                await asyncio.sleep(0.02)
+
+        name = locking_handler.__qualname__
+        await locking_handler()
+
+        assert _count(STATE_LOCK_WAIT_SECONDS, name) == 1
+        hold = STATE_LOCK_HOLD_SECONDS.labels(name).snapshot()
+        assert hold["count"] == 1
+        assert hold["sum"] >= 0.02
+
+    async def test_state_lock_wait_measured_under_contention(self):
+        state = _FakeState()
+
+        @track_background
+        async def contended_handler():
+            async with state_lock(state):
+                await asyncio.sleep(0.03)
+
+        await asyncio.gather(contended_handler(), contended_handler())
+
+        wait = STATE_LOCK_WAIT_SECONDS.labels(contended_handler.__qualname__).snapshot()
+        assert wait["count"] == 2
+        assert wait["sum"] >= 0.03
+
+    async def test_state_lock_outside_handler_is_untracked(self):
+        before = _count(STATE_LOCK_HOLD_SECONDS, "untracked")
+        with pytest.raises(ValueError):
+            async with state_lock(_FakeState()):
+                raise ValueError("boom")
+        assert _count(STATE_LOCK_HOLD_SECONDS, "untracked") == before + 1
+
+
+@pytest.mark.unit
+class TestLoopMonitor:
+    """Loop lag probing and blocking-call detection."""
+
+    async def test_records_loop_lag(self):
+        monitor = LoopMonitor(interval=0.01, block_threshold=1.0)
+        before = EVENT_LOOP_LAG_SECONDS.snapshot()["count"]
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+            assert monitor.running
+        finally:
+            await monitor.stop()
+
+        assert not monitor.running
+        assert EVENT_LOOP_LAG_SECONDS.snapshot()["count"] > before
+
+    async def test_blocking_call_logged_with_stack(self, caplog):
+        monitor = LoopMonitor(interval=0.01, block_threshold=0.05)
+        site = "other"
+        before = EVENT_LOOP_BLOCKS.labels(site).value
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            with caplog.at_level(logging.WARNING, logger="app.loop_monitor"):
+                time.sleep(0.3)  # blocks the loop
+                await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+
+        blocked = [r for r in caplog.records if "Event loop blocked" in r.getMessage()]
+        assert len(blocked) == 1  # reported once per stall
+        assert "test_blocking_call_logged_with_stack" in blocked[0].getMessage()
+        assert EVENT_LOOP_BLOCKS.labels(site).value == before + 1
@@ -0,0 +1,233 @@
+"""Tests for in-process metrics and the /metrics endpoint."""
+import threading
+
+import pytest
+from fastapi import status
+
+from app.metrics import Counter, Gauge, Histogram, Registry, StageTimings, instrument_engine
+
+
+def _scrape(api_client) -> dict:
+    """Scrape /metrics into a {sample line without value: value} dict."""
+    response = api_client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            key, value = line.rsplit(" ", 1)
+            samples[key] = float(value)
+    return samples
+
+
+@pytest.mark.unit
+@pytest.mark.performance
+class TestHistogram:
+    """Tests for the fixed-bucket histogram."""
+
+    def test_empty_histogram(self):
+        """Test an empty histogram reports no quantiles."""
+        histogram = Histogram()
+
+        snapshot = histogram.snapshot()
+        assert snapshot["count"] == 0
+        assert snapshot["p50"] is None
+        assert snapshot["buckets"]["+Inf"] == 0
+
+    def test_observations_are_bucketed_cumulatively(self):
+        """Test bucket counts are cumulative and +Inf counts everything."""
+        histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+        for value in (0.005, 0.05, 0.05, 0.5, 3.0):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["count"] == 5
+        assert snapshot["sum"] == pytest.approx(3.605)
+        assert snapshot["buckets"] == {"0.01": 1, "0.1": 3, "1.0": 4, "+Inf": 5}
+
+    def test_quantiles_fall_in_the_right_bucket(self):
+        """Test quantile estimates stay within the containing bucket."""
+        histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+        for _ in range(90):
+            histogram.observe(0.005)
+        for _ in range(10):
+            histogram.observe(0.5)
+
+        assert 0 < histogram.quantile(0.5) <= 0.01
+        assert 0.1 < histogram.quantile(0.99) <= 1.0
+
+    def test_reset(self):
+        """Test reset discards observations."""
+        histogram = Histogram()
+        histogram.observe(0.2)
+        histogram.reset()
+
+        assert histogram.snapshot()["count"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.performance
+class TestStageTimings:
+    """Tests for submit-path stage timings."""
+
+    def test_time_context_records_stage(self):
+        """Test the timing context records one observation per block."""
+        timings = StageTimings()
+        with timings.time("validation"):
+            pass
+        with timings.time("commit"):
+            pass
+
+        snapshot = timings.snapshot()
+        assert snapshot["validation"]["count"] == 1
+        assert snapshot["commit"]["count"] == 1
+        assert snapshot["db_write"]["count"] == 0
+
+    def test_time_context_records_on_error(self):
+        """Test a failing stage is still timed."""
+        timings = StageTimings()
+        with pytest.raises(RuntimeError):
+            with timings.time("db_write"):
+                raise RuntimeError("boom")
+
+        assert timings.snapshot()["db_write"]["count"] == 1
+
+    def test_unknown_stage_rejected(self):
+        """Test observing an undeclared stage fails loudly."""
+        with pytest.raises(KeyError):
+            StageTimings().observe("nope", 0.1)
+
+
+@pytest.mark.api
+@pytest.mark.performance
+class TestLatencyEndpoint:
+    """Tests for GET /api/admin/latency."""
+
+    def test_latency_endpoint_reports_stages(self, api_client, admin_headers):
+        """Test every submit stage is reported."""
+        from app.metrics import submit_timings
+
+        submit_timings.reset()
+        submit_timings.observe("total", 0.02)
+
+        response = api_client.get("/api/admin/latency", headers=admin_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        stages = response.json()["stages"]
+        assert set(stages) == set(StageTimings.STAGES)
+        assert stages["total"]["count"] == 1
+
+    def test_latency_endpoint_reset(self, api_client, admin_headers):
+        """Test reset=true starts a new window after reporting."""
+        from app.metrics import submit_timings
+
+        submit_timings.observe("commit", 0.001)
+
+        first = api_client.get("/api/admin/latency", params={"reset": True}, headers=admin_headers).json()
+        second = api_client.get("/api/admin/latency", headers=admin_headers).json()
+
+        assert first["stages"]["commit"]["count"] >= 1
+        assert second["stages"]["commit"]["count"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.performance
+class TestPrometheusMetrics:
+    """Tests for counters, gauges and text exposition."""
+
+    def test_counter_is_exact_across_threads(self):
+        """Test per-thread shards lose no increments without locking."""
+        counter = Counter(registry=None)
+
+        def work():
+            for _ in range(10_000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value == 80_000
+
+    def test_labeled_metrics_render(self):
+        """Test labeled counters and histograms in the text format."""
+        registry = Registry()
+        requests = Counter("requests_total", "Requests.", labelnames=("route",), registry=registry)
+        latency = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+        requests.labels('/a"b').inc(2)
+        latency.observe(0.05)
+        latency.observe(2.0)
+
+        text = registry.render()
+
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{route="/a\\"b"} 2' in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+        assert "latency_seconds_count 2" in text
+
+    def test_callback_gauge(self):
+        """Test gauges computed at scrape time, with and without labels."""
+        registry = Registry()
+        Gauge("depth", "Depth.", fn=lambda: 3, registry=registry)
+        Gauge("states", "States.", labelnames=("state",), fn=lambda: {"a": 1}, registry=registry)
+
+        text = registry.render()
+
+        assert "depth 3" in text
+        assert 'states{state="a"} 1' in text
+
+    def test_duplicate_names_rejected(self):
+        """Test a registry refuses two metrics with one name."""
+        registry = Registry()
+        Counter("dup_total", "x", registry=registry)
+
+        with pytest.raises(ValueError):
+            Counter("dup_total", "x", registry=registry)
+
+
+@pytest.mark.api
+@pytest.mark.performance
+class TestMetricsEndpoint:
+    """Tests for GET /metrics (local scrape)."""
+
+    def test_scrape_exposes_app_db_and_queue_metrics(self, api_client, db_engine, sample_courier):
+        """Test a local scrape sees request, DB, pool, cache and queue metrics."""
+        instrument_engine(db_engine)
+        route = 'method="GET",route="/api/courier/{courier_id}",status="200"'
+
+        before = _scrape(api_client)
+        api_client.get(f"/api/courier/{sample_courier.id}")
+        api_client.get(f"/api/courier/{sample_courier.id}")
+        api_client.post(
+            "/api/feedback/batch",
+            json=[{"order_id": "MET1", "courier_id": sample_courier.id, "rating": 5}],
+        )
+        after = _scrape(api_client)
+
+        def delta(key):
+            return after.get(key, 0) - before.get(key, 0)
+
+        assert delta(f"http_request_duration_seconds_count{{{route}}}") == 2
+        assert delta('courier_cache_requests_total{result="hit"}') >= 1
+        assert delta('db_query_duration_seconds_count{statement="SELECT"}') >= 1
+        assert delta('db_query_duration_seconds_count{statement="INSERT"}') >= 1
+        assert delta("db_pool_checkout_seconds_count") >= 1
+        assert delta("feedback_flush_batch_size_count") == 1
+        assert delta('feedback_sync_outcomes_total{status="created"}') == 1
+        assert 'feedback_flush_queue_depth{state="waiting"}' in after
+        assert "feedback_retry_pending" in after
+        assert "feedback_dead_letters" in after
+        assert 'feedback_submit_stage_seconds_count{stage="total"}' in after
+
+    def test_unmatched_routes_share_one_label(self, api_client):
+        """Test unknown paths do not create one series per path."""
+        api_client.get("/api/nope/1")
+        api_client.get("/api/nope/2")
+
+        samples = _scrape(api_client)
+
+        assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}' in samples
+        assert not any("/api/nope" in key for key in samples)
@@ -1,6 +1,8 @@
 """Tests for offline queue functionality."""
+import time
+
 import pytest
-from app.utils import QueueManager
+from app.utils import FeedbackQueue
 from config import config
 
 
@@ -10,12 +12,12 @@ class TestOfflineQueue:
 
     def test_queue_initialization(self):
         """Test queue starts empty."""
-        queue = []
-        assert QueueManager.get_pending_count(queue) == 0
+        queue = FeedbackQueue()
+        assert len(queue) == 0
 
     def test_add_single_item_to_queue(self):
         """Test adding single item to queue."""
-        queue = []
+        queue = FeedbackQueue()
         item = {
             "order_id": "OFF001",
             "courier_id": 1,
@@ -23,39 +25,36 @@ class TestOfflineQueue:
             "timestamp": "2024-01-15T10:00:00"
         }
 
-        queue = QueueManager.add_to_queue(queue, item)
+        queue.enqueue(item)
 
         assert len(queue) == 1
-        assert queue[0]["order_id"] == "OFF001"
+        assert queue.peek()["order_id"] == "OFF001"
 
     def test_queue_fifo_behavior(self):
         """Test queue follows FIFO when limit reached."""
-        queue = []
         max_size = 3
+        queue = FeedbackQueue(max_size=max_size)
 
         # Add 5 items to queue with size limit of 3
         for i in range(5):
-            item = {"order_id": f"OFF{i}"}
-            queue = QueueManager.add_to_queue(queue, item, max_size=max_size)
+            queue.enqueue({"order_id": f"OFF{i}"})
 
         # Should keep last 3 items (OFF2, OFF3, OFF4)
         assert len(queue) == max_size
-        assert queue[0]["order_id"] == "OFF2"
-        assert queue[1]["order_id"] == "OFF3"
-        assert queue[2]["order_id"] == "OFF4"
+        assert [item["order_id"] for item in queue] == ["OFF2", "OFF3", "OFF4"]
 
     def test_remove_specific_item(self):
         """Test removing specific item from queue."""
-        queue = [
+        queue = FeedbackQueue([
             {"order_id": "OFF1"},
             {"order_id": "OFF2"},
             {"order_id": "OFF3"}
-        ]
+        ])
 
-        queue = QueueManager.remove_from_queue(queue, {"order_id": "OFF2"})
+        queue.remove("OFF2")
 
         assert len(queue) == 2
-        assert not any(item["order_id"] == "OFF2" for item in queue)
+        assert "OFF2" not in queue
 
     def test_queue_persistence_simulation(self):
         """Test queue data structure for localStorage compatibility."""
@@ -80,13 +79,12 @@ class TestOfflineQueue:
 
     def test_queue_max_size_from_config(self):
         """Test queue respects config max size."""
-        queue = []
         max_size = config.MAX_QUEUE_SIZE
+        queue = FeedbackQueue(max_size=max_size)
 
         # Add more items than max size
         for i in range(max_size + 10):
-            item = {"order_id": f"OFF{i}"}
-            queue = QueueManager.add_to_queue(queue, item, max_size=max_size)
+            queue.enqueue({"order_id": f"OFF{i}"})
 
         assert len(queue) == max_size
 
@@ -116,3 +114,554 @@ class TestOfflineSubmissionFlow:
         assert "timestamp" in pending_item
         assert "request_id" in pending_item
         assert pending_item["rating"] in range(1, 6)
+
+
+@pytest.mark.offline
+class TestOfflineQueueBridge:
+    """Tests for the browser-side offline queue bridge."""
+
+    def test_enqueue_script_uses_compact_entry(self):
+        """Test enqueue script carries the positional queue entry."""
+        from app.offline_queue import OfflineQueueBridge
+        from app.records import FeedbackRecord
+
+        script = OfflineQueueBridge.enqueue(FeedbackRecord("OFF001", 1, 5, reasons=("Other",)))
+
+        assert "feedbackQueue.enqueue(" in script
+        assert '["OFF001", 1, 5, null, ["Other"], false, "", ""]' in script
+        assert str(config.MAX_QUEUE_SIZE) in script
+
+    def test_flush_script_targets_batch_endpoint(self):
+        """Test flush script posts to the batch endpoint."""
+        from app.offline_queue import OfflineQueueBridge
+
+        script = OfflineQueueBridge.flush()
+
+        assert "feedbackQueue.flush(" in script
+        assert "/api/feedback/batch" in script
+
+    def test_queue_script_asset_exists(self):
+        """Test the queue script is shipped as a static asset."""
+        from pathlib import Path
+        from app.offline_queue import SCRIPT_SRC
+
+        asset = Path(__file__).parent.parent / "assets" / SCRIPT_SRC.lstrip("/")
+        source = asset.read_text()
+
+        assert "indexedDB" in source
+        assert "feedback_pending_queue" in source  # localStorage fallback key
+
+    def test_install_script_registers_worker(self):
+        """Test install script wires the service worker and batch endpoint."""
+        from app.offline_queue import OfflineQueueBridge, WORKER_SRC
+
+        script = OfflineQueueBridge.install()
+
+        assert "feedbackQueue.install(" in script
+        assert "/api/feedback/batch" in script
+        assert WORKER_SRC in script
+
+    def test_service_worker_flushes_on_background_sync(self):
+        """Test the service worker flushes the shared queue on sync."""
+        from pathlib import Path
+        from app.offline_queue import SCRIPT_SRC, WORKER_SRC
+
+        assets = Path(__file__).parent.parent / "assets"
+        worker = (assets / WORKER_SRC.lstrip("/")).read_text()
+        queue = (assets / SCRIPT_SRC.lstrip("/")).read_text()
+
+        assert f'importScripts("{SCRIPT_SRC}")' in worker
+        assert '"sync"' in worker and "feedback-flush" in worker
+        assert "sendBeacon" in queue and "pagehide" in queue
+
+    def test_background_sync_is_registered_while_items_wait(self):
+        """Test queued and left-over items always have a sync registered."""
+        from pathlib import Path
+        from app.offline_queue import SCRIPT_SRC
+
+        queue = (Path(__file__).parent.parent / "assets" / SCRIPT_SRC.lstrip("/")).read_text()
+        enqueue = queue.split("async function enqueue(", 1)[1].split("\n  }\n", 1)[0]
+        pagehide = queue.split('"pagehide"', 1)[1].split("});", 1)[0]
+
+        assert "registerSync()" in enqueue
+        assert queue.count("keepSyncing(") == 3  # definition plus both flush exits
+        assert "registerSync()" in pagehide  # offline: no beacon can leave
+
+
+@pytest.mark.offline
+@pytest.mark.state
+class TestQueueFlushState:
+    """Tests for FeedbackState's handling of browser queue flushes."""
+
+    @pytest.fixture
+    def state(self):
+        from reflex.state import State
+        from app.states.feedback_state import FeedbackState
+        root = State(_reflex_internal_init=True)
+        return root.substates[FeedbackState.get_name()]
+
+    def test_failed_flush_keeps_count_and_clears_syncing(self, state):
+        """Test a flush that failed in the browser leaves the queue count alone."""
+        state.pending_count = 3
+        state.process_queue()
+        assert state.syncing
+
+        state.finish_queue_flush({"synced": 0, "remaining": -1})
+
+        assert not state.syncing
+        assert state.pending_count == 3
+        assert state.toast_type == "warning"
+
+    def test_lost_flush_result_stops_blocking_after_timeout(self, state):
+        """Test a flush whose callback never fired does not block sync forever."""
+        from app.states.feedback_state import FLUSH_TIMEOUT_SECONDS
+
+        assert state.process_queue() is not None
+        assert state.process_queue() is None
+
+        state._syncing_since -= FLUSH_TIMEOUT_SECONDS + 1
+        assert state.process_queue() is not None
+        assert state.syncing
+
+
+@pytest.mark.offline
+@pytest.mark.api
+class TestBatchFlushEndpoint:
+    """Tests for POST /api/feedback/batch."""
+
+    def test_batch_creates_items(self, api_client, admin_headers, sample_courier):
+        """Test a flushed queue is stored in one request."""
+        from app.records import FeedbackRecord
+
+        entries = [
+            FeedbackRecord(f"BATCH{i}", sample_courier.id, 5, reasons=("Punctuality",)).to_queue_entry()
+            for i in range(3)
+        ]
+
+        response = api_client.post("/api/feedback/batch", json={"items": entries})
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == ["created"] * 3
+        assert len(api_client.get("/api/feedback", headers=admin_headers).json()) == 3
+
+    def test_batch_reports_duplicates_and_invalid(self, api_client, sample_feedback):
+        """Test per-item outcomes for duplicates and invalid items."""
+        items = [
+            {"order_id": sample_feedback.order_id, "courier_id": sample_feedback.courier_id, "rating": 5},
+            {"order_id": "BAD1", "courier_id": sample_feedback.courier_id, "rating": 9},
+            {"order_id": "NEW1", "courier_id": sample_feedback.courier_id, "rating": 2},
+        ]
+
+        response = api_client.post("/api/feedback/batch", json=items)
+
+        statuses = {r["order_id"]: r["status"] for r in response.json()["results"]}
+        assert statuses == {
+            sample_feedback.order_id: "duplicate",
+            "BAD1": "invalid",
+            "NEW1": "created",
+        }
+
+    def test_batch_dedupes_by_order_id(self, api_client, admin_headers, sample_courier):
+        """Test repeated order_ids in one batch are stored once."""
+        items = [
+            {"order_id": "DUP1", "courier_id": sample_courier.id, "rating": 1},
+            {"order_id": "DUP1", "courier_id": sample_courier.id, "rating": 4},
+        ]
+
+        response = api_client.post("/api/feedback/batch", json={"items": items})
+
+        assert response.json()["results"] == [{"order_id": "DUP1", "status": "created"}]
+        stored = api_client.get("/api/feedback", headers=admin_headers).json()
+        assert [f["rating"] for f in stored] == [4]
+
+    def test_batch_accepts_text_plain(self, api_client, sample_courier):
+        """Test the body is parsed when posted as text/plain."""
+        import json
+
+        body = json.dumps({"items": [["TXT1", sample_courier.id, 5, None, [], False, "", ""]]})
+        response = api_client.post(
+            "/api/feedback/batch", content=body, headers={"Content-Type": "text/plain"}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["results"][0]["status"] == "created"
+
+    def test_batch_rejects_malformed_payload(self, api_client):
+        """Test malformed payloads are rejected."""
+        response = api_client.post("/api/feedback/batch", content="not json")
+        assert response.status_code == 400
+
+        response = api_client.post("/api/feedback/batch", json={"items": [["too", "short"]]})
+        assert response.status_code == 400
+
+    def test_batch_rejects_oversized_payload(self, api_client):
+        """Test batches larger than the queue limit are rejected."""
+        items = [{"order_id": f"BIG{i}", "courier_id": 1, "rating": 5} for i in range(config.MAX_QUEUE_SIZE + 1)]
+
+        response = api_client.post("/api/feedback/batch", json=items)
+
+        assert response.status_code == 413
+
+    def test_batch_size_is_checked_before_items_are_parsed(self, api_client, monkeypatch):
+        """Test an oversized batch is rejected without building any records."""
+        from app.records import FeedbackRecord
+
+        monkeypatch.setattr(FeedbackRecord, "from_dict", classmethod(lambda cls, data: pytest.fail("parsed")))
+        items = [{"order_id": f"BIG{i}"} for i in range(config.MAX_QUEUE_SIZE + 1)]
+
+        assert api_client.post("/api/feedback/batch", json=items).status_code == 413
+
+    def test_batch_marks_wrongly_typed_item_invalid(self, api_client, sample_courier):
+        """Test a non-string comment makes only that item invalid, not the request fail."""
+        items = [
+            {"order_id": "TYPE1", "courier_id": sample_courier.id, "rating": 5, "comment": 5},
+            {"order_id": "TYPE2", "courier_id": sample_courier.id, "rating": 5},
+        ]
+
+        response = api_client.post("/api/feedback/batch", json=items)
+
+        assert response.status_code == 200
+        statuses = {r["order_id"]: r["status"] for r in response.json()["results"]}
+        assert statuses == {"TYPE1": "invalid", "TYPE2": "created"}
+
+    def test_batch_failure_schedules_retry_then_dead_letters(self, api_client, sample_courier, monkeypatch):
+        """Test a failing backend yields per-item retries, then a dead letter once the window is spent."""
+        import app.services as services
+        from app.sync import RetryScheduler
+
+        stored = []
+        scheduler = RetryScheduler(
+            retry_window=5, base_delay=2, rng=lambda: 1.0,
+            dead_letter=lambda record, *args: stored.append(record.order_id),
+        )
+        monkeypatch.setattr(services, "retry_scheduler", scheduler)
+
+        def broken_session(*args, **kwargs):
+            raise RuntimeError("database is locked")
+
+        monkeypatch.setattr(services, "Session", broken_session)
+        items = [{"order_id": "FAIL1", "courier_id": sample_courier.id, "rating": 5}]
+
+        first = api_client.post("/api/feedback/batch", json=items).json()["results"]
+        assert first == [{"order_id": "FAIL1", "status": "retry", "retry_after": 2.0}]
+
+        # Retried too early: deferred without touching the database
+        early = api_client.post("/api/feedback/batch", json=items).json()["results"]
+        assert early[0]["status"] == "retry"
+        assert scheduler.metrics()["retries_deferred"] == 1
+
+        scheduler._clock = lambda: time.time() + 10
+        last = api_client.post("/api/feedback/batch", json=items).json()["results"]
+        assert last[0]["status"] == "dead_letter"
+        assert stored == ["FAIL1"]
+
+    def test_failing_item_does_not_fail_its_batch(self, api_client, sample_courier, db_engine, monkeypatch):
+        """Test a batch with one item the database rejects stores the others."""
+        import app.services as services
+        from sqlmodel import text
+        from app.sync import RetryScheduler
+
+        scheduler = RetryScheduler(base_delay=2, rng=lambda: 1.0)
+        monkeypatch.setattr(services, "retry_scheduler", scheduler)
+        with db_engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TRIGGER reject_poison BEFORE INSERT ON feedback WHEN NEW.order_id = 'POISON' "
+                "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+            ))
+        order_ids = ["OK1", "OK2", "POISON", "OK3", "OK4"]
+        items = [{"order_id": order_id, "courier_id": sample_courier.id, "rating": 5} for order_id in order_ids]
+
+        results = api_client.post("/api/feedback/batch", json=items).json()["results"]
+
+        assert [r["order_id"] for r in results] == order_ids
+        assert {r["order_id"]: r["status"] for r in results} == {
+            "OK1": "created", "OK2": "created", "POISON": "retry", "OK3": "created", "OK4": "created",
+        }
+        assert scheduler.metrics()["pending_retries"] == 1
+
+    def test_unavailable_database_is_not_bisected(self, api_client, sample_courier, monkeypatch):
+        """Test a locked database fails the batch in one attempt instead of splitting it."""
+        import app.services as services
+        from sqlalchemy.exc import OperationalError
+        from app.sync import RetryScheduler
+
+        monkeypatch.setattr(services, "retry_scheduler", RetryScheduler(base_delay=2, rng=lambda: 1.0))
+        attempts = []
+
+        def locked(*args, **kwargs):
+            attempts.append(1)
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+        monkeypatch.setattr(services, "Session", locked)
+        items = [{"order_id": f"LOCK{i}", "courier_id": sample_courier.id, "rating": 5} for i in range(4)]
+
+        results = api_client.post("/api/feedback/batch", json=items).json()["results"]
+
+        assert {r["status"] for r in results} == {"retry"}
+        assert len(attempts) == 1
+
+    def test_item_is_kept_retrying_when_dead_letter_cannot_be_stored(self, api_client, sample_courier, monkeypatch):
+        """Test the browser is never told to drop an item the server has not stored."""
+        import app.services as services
+        from app.sync import RetryScheduler
+
+        def unavailable(*args):
+            raise RuntimeError("database is locked")
+
+        scheduler = RetryScheduler(max_attempts=1, base_delay=2, rng=lambda: 1.0, dead_letter=unavailable)
+        monkeypatch.setattr(services, "retry_scheduler", scheduler)
+        monkeypatch.setattr(services, "Session", unavailable)
+        items = [{"order_id": "FAIL2", "courier_id": sample_courier.id, "rating": 5}]
+
+        results = api_client.post("/api/feedback/batch", json=items).json()["results"]
+
+        assert results == [{"order_id": "FAIL2", "status": "retry", "retry_after": 2.0}]
+        assert scheduler.metrics()["dead_lettered"] == 0
+
+
+@pytest.mark.offline
+class TestRetryScheduler:
+    """Tests for per-item retry backoff and dead letters."""
+
+    def _record(self, order_id="RETRY1"):
+        from app.records import FeedbackRecord
+
+        return FeedbackRecord(order_id, 1, 5)
+
+    def test_backoff_is_exponential_and_capped(self):
+        """Test the jitter ceiling doubles per attempt up to max_delay."""
+        from app.sync import RetryScheduler
+
+        scheduler = RetryScheduler(base_delay=2, max_delay=10, rng=lambda: 1.0)
+
+        assert [scheduler.backoff(n) for n in range(1, 6)] == [2, 4, 8, 10, 10]
+
+    def test_backoff_is_jittered(self):
+        """Test delays are spread over [0, ceiling] rather than fixed."""
+        from app.sync import RetryScheduler
+
+        scheduler = RetryScheduler(base_delay=2, max_delay=60)
+        delays = {round(scheduler.backoff(3), 6) for _ in range(50)}
+
+        assert len(delays) > 1
+        assert all(0 <= d <= 8 for d in delays)
+
+    def test_items_retry_independently(self):
+        """Test each order_id keeps its own attempt count and due time."""
+        from app.sync import RetryScheduler
+
+        now = [1000.0]
+        scheduler = RetryScheduler(retry_window=60, base_delay=1, rng=lambda: 1.0, clock=lambda: now[0])
+
+        scheduler.record_failure(self._record("A"), "boom")
+        scheduler.record_failure(self._record("A"), "boom")
+        scheduler.record_failure(self._record("B"), "boom")
+
+        assert scheduler.retry_after("A") == 2.0
+        assert scheduler.retry_after("B") == 1.0
+        now[0] += 1.5
+        assert scheduler.retry_after("B") == 0.0
+        assert scheduler.retry_after("C") == 0.0
+
+    def test_success_clears_pending_retry(self):
+        """Test a stored item is forgotten and counted as recovered."""
+        from app.sync import RetryScheduler
+
+        scheduler = RetryScheduler(rng=lambda: 1.0)
+        scheduler.record_failure(self._record(), "boom")
+        scheduler.record_success("RETRY1")
+
+        metrics = scheduler.metrics()
+        assert metrics["pending_retries"] == 0
+        assert metrics["recovered"] == 1
+        assert scheduler.retry_after("RETRY1") == 0.0
+
+    def test_budget_is_time_since_first_failure(self):
+        """Test an item is dead-lettered once it has failed for retry_window, however few attempts."""
+        from app.sync import RetryScheduler
+
+        now = [1000.0]
+        stored = []
+        scheduler = RetryScheduler(
+            max_attempts=0, retry_window=60, base_delay=1, rng=lambda: 1.0, clock=lambda: now[0],
+            dead_letter=lambda record, attempts, reason, failed_at: stored.append((record.order_id, attempts)),
+        )
+
+        for _ in range(5):
+            assert scheduler.record_failure(self._record("DL1"), "boom") is not None
+            now[0] += 10
+        assert stored == []
+
+        now[0] += 10
+        assert scheduler.record_failure(self._record("DL1"), "boom") is None
+        assert stored == [("DL1", 6)]
+        assert scheduler.metrics()["dead_lettered"] == 1
+        assert scheduler.metrics()["pending_retries"] == 0
+
+    def test_attempt_cap_applies_before_the_window(self):
+        """Test max_attempts dead-letters an item well inside its retry window."""
+        from app.sync import RetryScheduler
+
+        stored = []
+        scheduler = RetryScheduler(
+            max_attempts=3, retry_window=3600, rng=lambda: 1.0,
+            dead_letter=lambda record, attempts, reason, failed_at: stored.append(attempts),
+        )
+
+        results = [scheduler.record_failure(self._record(), "boom") for _ in range(3)]
+
+        assert results[-1] is None and None not in results[:-1]
+        assert stored == [3]
+
+    def test_failed_dead_letter_store_keeps_retrying(self):
+        """Test an item whose dead letter could not be stored is scheduled again."""
+        from app.sync import RetryScheduler
+
+        def unavailable(*args):
+            raise RuntimeError("database is locked")
+
+        scheduler = RetryScheduler(max_attempts=1, base_delay=1, rng=lambda: 1.0, dead_letter=unavailable)
+
+        assert scheduler.record_failure(self._record(), "boom") == 1.0
+        assert scheduler.metrics()["pending_retries"] == 1
+        assert scheduler.metrics()["dead_lettered"] == 0
+
+    def test_defaults_come_from_config(self):
+        """Test the scheduler builds on the existing sync config knobs."""
+        from app.sync import RetryScheduler
+
+        scheduler = RetryScheduler()
+
+        assert scheduler.max_attempts == config.SYNC_RETRY_ATTEMPTS
+        assert scheduler.retry_window == config.SYNC_RETRY_WINDOW
+        assert scheduler.base_delay == config.SYNC_RETRY_DELAY
+
+
+@pytest.mark.offline
+@pytest.mark.database
+class TestDeadLetterService:
+    """Tests for the durable dead-letter store."""
+
+    @pytest.fixture
+    def dead_letters(self, db_engine, monkeypatch):
+        import app.services
+        from app.services import DeadLetterService
+
+        monkeypatch.setattr(app.services, "engine", db_engine)
+        return DeadLetterService
+
+    def test_store_replaces_and_lists_newest_first(self, dead_letters):
+        """Test one entry is kept per order, newest first, with the full record."""
+        from app.records import FeedbackRecord
+
+        dead_letters.store(FeedbackRecord("DLA", 1, 5, comment="first"), 3, "boom", 100.0)
+        dead_letters.store(FeedbackRecord("DLB", 1, 4), 2, "boom", 200.0)
+        dead_letters.store(FeedbackRecord("DLA", 1, 5, comment="again"), 7, "locked", 300.0)
+
+        listed = dead_letters.list_dead_letters()
+
+        assert [(d["order_id"], d["attempts"]) for d in listed] == [("DLA", 7), ("DLB", 2)]
+        assert listed[0]["record"]["comment"] == "again"
+        assert dead_letters.count() == 2
+
+    def test_retry_stores_feedback_and_removes_resolved(self, dead_letters, sample_courier):
+        """Test an admin retry creates the feedback and keeps only unresolved items."""
+        from app.records import FeedbackRecord
+        from app.services import FeedbackService
+
+        dead_letters.store(FeedbackRecord("DLOK", sample_courier.id, 5), 3, "locked", 100.0)
+        dead_letters.store(FeedbackRecord("DLBAD", sample_courier.id, 9), 3, "locked", 100.0)
+
+        assert dead_letters.retry() == 1
+        assert [d["order_id"] for d in dead_letters.list_dead_letters()] == ["DLBAD"]
+        assert [f.order_id for f in FeedbackService.list_feedback()] == ["DLOK"]
+
+        assert dead_letters.clear() == 1
+        assert dead_letters.count() == 0
+
+
+@pytest.mark.offline
+class TestFlushScheduler:
+    """Tests for the process-wide flush scheduler."""
+
+    def _records(self, *order_ids):
+        from app.records import FeedbackRecord
+
+        return [FeedbackRecord(order_id, 1, 5) for order_id in order_ids]
+
+    async def test_concurrent_flushes_share_one_batch(self):
+        """Test items from concurrent callers are deduped into one write."""
+        import asyncio
+        from app.sync import FlushScheduler
+
+        batches = []
+
+        def writer(records):
+            batches.append([r.order_id for r in records])
+            return [{"order_id": r.order_id, "status": "created"} for r in records]
+
+        scheduler = FlushScheduler(writer, batch_size=10, max_concurrency=1, linger=0.01)
+        first, second = await asyncio.gather(
+            scheduler.submit(self._records("A", "B")),
+            scheduler.submit(self._records("B", "C")),
+        )
+
+        assert batches == [["A", "B", "C"]]
+        assert [r["order_id"] for r in first] == ["A", "B"]
+        assert [r["order_id"] for r in second] == ["B", "C"]
+        assert scheduler.metrics()["items_coalesced"] == 1
+
+    async def test_latest_record_wins_while_waiting(self):
+        """Test a re-submitted order_id replaces the waiting record."""
+        from app.records import FeedbackRecord
+        from app.sync import FlushScheduler
+
+        written = []
+
+        def writer(records):
+            written.extend(records)
+            return [{"order_id": r.order_id, "status": "created"} for r in records]
+
+        scheduler = FlushScheduler(writer, linger=0.01)
+        await scheduler.submit([FeedbackRecord("A", 1, 1), FeedbackRecord("A", 1, 4)])
+
+        assert [r.rating for r in written] == [4]
+
+    async def test_concurrency_is_capped(self):
+        """Test no more than max_concurrency batches are written at once."""
+        import threading
+        import time as time_module
+        from app.sync import FlushScheduler
+
+        lock = threading.Lock()
+        active = [0, 0]  # current, peak
+
+        def writer(records):
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time_module.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return [{"order_id": r.order_id, "status": "created"} for r in records]
+
+        scheduler = FlushScheduler(writer, batch_size=2, max_concurrency=2, linger=0)
+        results = await scheduler.submit(self._records(*[f"C{i}" for i in range(10)]))
+
+        assert len(results) == 10
+        assert active[1] == 2
+        assert scheduler.metrics()["batches_written"] == 5
+
+    async def test_writer_failure_resolves_every_caller(self):
+        """Test callers get an error outcome instead of hanging."""
+        from app.sync import FlushScheduler
+
+        def writer(records):
+            raise RuntimeError("boom")
+
+        scheduler = FlushScheduler(writer, linger=0)
+        results = await scheduler.submit(self._records("E1", "E2"))
+
+        assert [r["status"] for r in results] == ["error", "error"]
+        assert scheduler.metrics()["in_flight"] == 0
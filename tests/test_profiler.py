@@ -0,0 +1,108 @@
+"""Tests for the on-demand sampling profiler."""
+import threading
+import time
+
+import pytest
+from fastapi import status
+
+from app.profiler import ProfilerBusyError, SamplingProfiler, collapse
+
+
+def busy_handler(stop: threading.Event):
+    """Stand-in for a slow handler: spins until stopped."""
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    """Run busy_handler in a background thread for the test."""
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_handler, args=(stop,), daemon=True)
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+@pytest.mark.unit
+@pytest.mark.performance
+class TestSamplingProfiler:
+    """Tests for stack sampling and focus filtering."""
+
+    def test_samples_running_threads(self, busy_thread):
+        """Test a busy function shows up in the collapsed stacks."""
+        stacks, samples = SamplingProfiler().profile(0.2, interval=0.005)
+
+        assert samples > 5
+        assert any("busy_handler" in stack for stack in stacks)
+
+    def test_focus_trims_to_matching_frame(self, busy_thread):
+        """Test focusing keeps only matching stacks, rooted at the match."""
+        stacks, _ = SamplingProfiler().profile(0.2, interval=0.005, focus=["busy_handler"])
+
+        assert stacks
+        assert all(stack.startswith("tests.test_profiler:busy_handler") for stack in stacks)
+
+    def test_focus_without_match_is_empty(self, busy_thread):
+        """Test a focus that matches nothing yields no stacks."""
+        stacks, samples = SamplingProfiler().profile(0.05, focus=["no_such_handler"])
+
+        assert samples > 0
+        assert not stacks
+
+    def test_one_profile_at_a_time(self, busy_thread):
+        """Test concurrent profiles are rejected instead of stacking up."""
+        profiler = SamplingProfiler()
+        worker = threading.Thread(target=profiler.profile, args=(0.3,))
+        worker.start()
+        time.sleep(0.05)
+        try:
+            with pytest.raises(ProfilerBusyError):
+                profiler.profile(0.01)
+        finally:
+            worker.join()
+        assert not profiler.running
+
+    def test_collapse_format(self):
+        """Test output is one 'stack count' line per stack, hottest first."""
+        from collections import Counter
+
+        text = collapse(Counter({"a:main;a:work": 3, "a:main": 1}))
+
+        assert text == "a:main;a:work 3\na:main 1\n"
+
+
+@pytest.mark.api
+@pytest.mark.security
+class TestProfileEndpoint:
+    """Tests for GET /api/admin/profile."""
+
+    def test_requires_admin_credentials(self, api_client, sample_admin):
+        """Test the profiler is not reachable anonymously or with a bad password."""
+        assert api_client.get("/api/admin/profile").status_code == status.HTTP_401_UNAUTHORIZED
+        response = api_client.get("/api/admin/profile", auth=("testadmin", "wrong"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_returns_collapsed_stacks(self, api_client, sample_admin, busy_thread):
+        """Test an authenticated profile downloads a folded-stack file."""
+        response = api_client.get(
+            "/api/admin/profile",
+            params={"seconds": 0.2, "interval_ms": 5, "focus": "busy_handler"},
+            auth=("testadmin", "testpass123"),
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-disposition"].endswith('.folded"')
+        assert int(response.headers["x-profile-samples"]) > 0
+        first_line = response.text.splitlines()[0]
+        assert first_line.startswith("tests.test_profiler:busy_handler")
+        assert first_line.rsplit(" ", 1)[1].isdigit()
+
+    def test_duration_is_bounded(self, api_client, sample_admin):
+        """Test overly long profiles are rejected up front."""
+        response = api_client.get(
+            "/api/admin/profile", params={"seconds": 3600}, auth=("testadmin", "testpass123")
+        )
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
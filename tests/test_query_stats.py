@@ -0,0 +1,130 @@
+"""Tests for statement fingerprinting and slow-query logging."""
+import logging
+
+import pytest
+from fastapi import status
+from sqlalchemy import text
+
+from app.query_stats import OVERFLOW_FINGERPRINT, QueryStats, fingerprint
+
+
+@pytest.mark.unit
+class TestFingerprint:
+    """Tests for statement normalization."""
+
+    def test_literals_are_stripped(self):
+        """Test string and number literals become placeholders."""
+        assert (
+            fingerprint("SELECT * FROM feedback WHERE order_id = 'ORD1' AND rating > 3")
+            == fingerprint("SELECT * FROM feedback WHERE order_id = 'X''Y'  AND rating > 5")
+            == "SELECT * FROM feedback WHERE order_id = ? AND rating > ?"
+        )
+
+    def test_bind_parameters_are_normalized(self):
+        """Test named and positional parameters share one fingerprint."""
+        assert fingerprint("SELECT 1 FROM feedback WHERE order_id = :order_id") == (
+            "SELECT ? FROM feedback WHERE order_id = ?"
+        )
+        assert fingerprint("SELECT 1 FROM feedback WHERE order_id = %(order_id)s") == (
+            "SELECT ? FROM feedback WHERE order_id = ?"
+        )
+
+    def test_in_lists_collapse(self):
+        """Test IN lists of any length share one fingerprint."""
+        short = fingerprint("SELECT order_id FROM feedback WHERE order_id IN (?, ?)")
+        long = fingerprint("SELECT order_id FROM feedback WHERE order_id IN (?,?,?,?,?)")
+
+        assert short == long == "SELECT order_id FROM feedback WHERE order_id IN (?...)"
+
+
+@pytest.mark.database
+class TestQueryStats:
+    """Tests for per-fingerprint aggregation on a real engine."""
+
+    def test_executions_are_aggregated(self, db_engine, sample_courier):
+        """Test count, timing and rows accumulate per fingerprint."""
+        stats = QueryStats(slow_query_ms=0)
+        stats.install(db_engine)
+
+        with db_engine.begin() as conn:
+            for order_id in ("A", "B", "C"):
+                conn.execute(text("SELECT 1 FROM feedback WHERE order_id = :order_id"), {"order_id": order_id})
+            conn.execute(text("UPDATE courier SET name = 'X' WHERE id = :id"), {"id": sample_courier.id})
+
+        by_fingerprint = {entry["fingerprint"]: entry for entry in stats.top(limit=50)}
+        select = by_fingerprint["SELECT ? FROM feedback WHERE order_id = ?"]
+        update = by_fingerprint["UPDATE courier SET name = ? WHERE id = ?"]
+        assert select["count"] == 3
+        assert select["max_ms"] <= select["total_ms"]
+        assert update["rows"] == 1
+
+    def test_install_is_idempotent(self, db_engine):
+        """Test installing twice does not double count."""
+        stats = QueryStats(slow_query_ms=0)
+        stats.install(db_engine)
+        stats.install(db_engine)
+
+        with db_engine.connect() as conn:
+            conn.execute(text("SELECT 42"))
+
+        assert stats.top(limit=1, sort="count")[0]["count"] == 1
+
+    def test_slow_queries_logged_with_plan(self, db_engine, caplog):
+        """Test statements over the threshold are logged with EXPLAIN QUERY PLAN."""
+        stats = QueryStats(slow_query_ms=1e-9)
+        stats.install(db_engine)
+
+        with caplog.at_level(logging.WARNING, logger="app.query_stats"):
+            with db_engine.connect() as conn:
+                conn.execute(text("SELECT * FROM feedback WHERE rating = :rating"), {"rating": 5}).all()
+
+        assert "Slow query" in caplog.text
+        assert "plan:" in caplog.text and "feedback" in caplog.text
+        entry = stats.top(limit=1)[0]
+        assert entry["slow"] == 1
+        assert entry["last_plan"]
+
+    def test_fingerprints_are_bounded(self):
+        """Test fingerprints beyond the limit go to one overflow bucket."""
+        stats = QueryStats(max_fingerprints=2)
+        for table in ("a", "b", "c", "d"):
+            stats.record(f"SELECT * FROM {table}", 0.001)
+
+        keys = {entry["fingerprint"] for entry in stats.top(limit=10)}
+        assert keys == {"SELECT * FROM a", "SELECT * FROM b", OVERFLOW_FINGERPRINT}
+
+    def test_top_sorts_worst_first(self):
+        """Test top-N ordering by the chosen column."""
+        stats = QueryStats()
+        stats.record("SELECT * FROM fast", 0.001)
+        stats.record("SELECT * FROM fast", 0.001)
+        stats.record("SELECT * FROM slow", 0.5)
+
+        assert stats.top(limit=1, sort="max")[0]["fingerprint"] == "SELECT * FROM slow"
+        assert stats.top(limit=1, sort="count")[0]["fingerprint"] == "SELECT * FROM fast"
+
+
+@pytest.mark.api
+class TestQueryStatsEndpoint:
+    """Tests for GET /api/admin/queries."""
+
+    def test_top_offenders(self, api_client, admin_headers, db_engine, sample_courier):
+        """Test the endpoint reports recorded statements."""
+        from app.query_stats import query_stats
+
+        query_stats.install(db_engine)
+        query_stats.reset()
+        api_client.get("/api/feedback", headers=admin_headers)
+
+        response = api_client.get("/api/admin/queries", params={"limit": 5, "sort": "count"}, headers=admin_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        queries = response.json()["queries"]
+        assert 0 < len(queries) <= 5
+        assert any("FROM feedback" in entry["fingerprint"] for entry in queries)
+
+    def test_invalid_sort_rejected(self, api_client, admin_headers):
+        """Test unknown sort columns are rejected."""
+        response = api_client.get("/api/admin/queries", params={"sort": "bogus"}, headers=admin_headers)
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,105 @@
+"""Tests for typed feedback records."""
+import json
+import pytest
+
+from app.records import FeedbackRecord, FeedbackRow
+from app.utils import FeedbackQueue, validate_feedback_data
+
+
+@pytest.mark.unit
+class TestFeedbackRecord:
+    """Tests for FeedbackRecord conversions and validation."""
+
+    def test_from_dict_roundtrip(self, mock_feedback_data):
+        """Test dict -> record -> dict keeps all submitted fields."""
+        record = FeedbackRecord.from_dict(mock_feedback_data)
+
+        assert record.reasons == ("Punctuality", "Politeness")
+        result = record.to_dict()
+        for key, value in mock_feedback_data.items():
+            assert result[key] == value
+
+    def test_json_roundtrip(self, mock_feedback_data):
+        """Test JSON serialization roundtrip."""
+        record = FeedbackRecord.from_dict(mock_feedback_data)
+        assert FeedbackRecord.from_json(record.to_json()) == record
+
+    def test_queue_entry_roundtrip(self, mock_feedback_data):
+        """Test positional queue entries survive JSON and rebuild."""
+        record = FeedbackRecord.from_dict(mock_feedback_data)
+        entry = json.loads(json.dumps(record.to_queue_entry()))
+
+        assert FeedbackRecord.from_queue_entry(entry) == record
+
+    def test_row_roundtrip(self, mock_feedback_data):
+        """Test DB row tuple conversion."""
+        record = FeedbackRecord.from_dict(mock_feedback_data)
+        row = record.to_row()
+
+        assert row[FeedbackRecord.ROW_COLUMNS.index("reasons")] == '["Punctuality", "Politeness"]'
+        assert FeedbackRecord.from_row(row) == record
+        assert record.to_params()["needs_follow_up"] is False
+
+    def test_reasons_from_json_string(self):
+        """Test reasons stored as a JSON string are parsed."""
+        record = FeedbackRecord.from_dict(
+            {"order_id": "A", "courier_id": 1, "rating": 3, "reasons": '["Other"]'}
+        )
+        assert record.reasons == ("Other",)
+        assert record.needs_follow_up is True
+
+    def test_record_is_immutable_and_slotted(self):
+        """Test records are frozen and carry no __dict__."""
+        record = FeedbackRecord("A", 1, 5)
+
+        with pytest.raises(AttributeError):
+            record.rating = 1
+        assert not hasattr(record, "__dict__")
+
+    def test_validation_matches_dict_validation(self, mock_invalid_feedback_data):
+        """Test record validation agrees with validate_feedback_data."""
+        record = FeedbackRecord.from_dict(mock_invalid_feedback_data)
+
+        assert validate_feedback_data(record) == validate_feedback_data(mock_invalid_feedback_data)
+        assert validate_feedback_data(FeedbackRecord("A", 1, 5, "x" * 500)) == (True, "")
+        assert validate_feedback_data(FeedbackRecord("A", 1, 5, "x" * 501))[0] is False
+
+    def test_wrongly_typed_fields_are_invalid(self):
+        """Test non-string comments and order ids fail validation instead of raising."""
+        for record in (FeedbackRecord("A", 1, 5, comment=5), FeedbackRecord(5, 1, 5)):
+            is_valid, error = record.validate()
+            assert not is_valid and "string" in error
+            assert validate_feedback_data(record.to_dict()) == (is_valid, error)
+
+    def test_records_queue_by_order_id(self):
+        """Test FeedbackQueue keys records by order_id."""
+        queue = FeedbackQueue(max_size=5)
+        queue.enqueue(FeedbackRecord("A", 1, 5))
+        queue.enqueue(FeedbackRecord("B", 1, 4))
+
+        assert queue.remove("A") == FeedbackRecord("A", 1, 5)
+        assert queue.peek().order_id == "B"
+
+
+@pytest.mark.unit
+class TestFeedbackRow:
+    """Tests for dashboard FeedbackRow."""
+
+    def test_from_row(self):
+        """Test building a dashboard row from a query tuple."""
+        row = FeedbackRow.from_row(
+            (1, "ORD1", "Alex", 4, "ok", '["Packaging"]', 1, 1, "2024-01-15 10:00:00.123456")
+        )
+
+        assert row.reasons == ("Packaging",)
+        assert row.publish_consent is True
+        assert row.created_date == "2024-01-15"
+        assert row.to_dict()["reasons"] == ["Packaging"]
+        assert row.to_csv_row()[5] == '["Packaging"]'
+
+    def test_invalid_reasons_json(self):
+        """Test malformed reasons JSON falls back to no reasons."""
+        row = FeedbackRow.from_row((1, "ORD1", "Alex", 4, None, "not json", 0, 1, None))
+
+        assert row.reasons == ()
+        assert row.created_at == ""
@@ -0,0 +1,120 @@
+"""Tests for Server-Timing headers, request IDs and the access log."""
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app import server_timing
+from app.server_timing import ServerTimingMiddleware, TimedJSONResponse
+
+
+def _timing_names(response) -> dict:
+    """Parse a Server-Timing header into {name: milliseconds}."""
+    entries = {}
+    for entry in response.headers["server-timing"].split(","):
+        name, duration = entry.strip().split(";dur=")
+        entries[name] = float(duration)
+    return entries
+
+
+def _small_app(sample_rate: float) -> FastAPI:
+    app = FastAPI(default_response_class=TimedJSONResponse)
+    app.add_middleware(ServerTimingMiddleware, sample_rate=sample_rate)
+
+    @app.get("/api/ok")
+    async def ok():
+        with server_timing.timed("validation"):
+            pass
+        return {"ok": True}
+
+    @app.get("/api/boom")
+    async def boom():
+        raise HTTPException(status_code=503, detail="down")
+
+    return app
+
+
+@pytest.mark.unit
+class TestServerTimingFormat:
+    """Tests for header formatting and accumulation."""
+
+    def test_format_header(self):
+        """Test durations are rendered in milliseconds."""
+        assert server_timing.format_header({"db": 0.0012, "total": 0.0034}) == "db;dur=1.20, total;dur=3.40"
+
+    def test_add_outside_request_is_noop(self):
+        """Test recording without a request context is harmless."""
+        server_timing.add("db", 1.0)
+
+
+@pytest.mark.api
+class TestServerTimingMiddleware:
+    """Tests for the API middleware."""
+
+    def test_api_responses_carry_breakdown(self, api_client, db_engine, sample_courier, mock_feedback_data):
+        """Test db, validation, serialize and total on a real submit."""
+        from app.metrics import instrument_engine
+
+        instrument_engine(db_engine)
+        mock_feedback_data["courier_id"] = sample_courier.id
+
+        response = api_client.post("/api/feedback", json=mock_feedback_data)
+
+        assert response.status_code == 200
+        timings = _timing_names(response)
+        assert {"db", "validation", "serialize", "total"} <= set(timings)
+        assert timings["total"] >= timings["db"]
+        assert len(response.headers["x-request-id"]) == 32
+
+    def test_batch_reports_db_time(self, api_client, sample_courier):
+        """Test coalesced batch writes are reported as db time."""
+        response = api_client.post(
+            "/api/feedback/batch",
+            json=[{"order_id": "ST1", "courier_id": sample_courier.id, "rating": 5}],
+        )
+
+        assert {"db", "validation", "total"} <= set(_timing_names(response))
+
+    def test_request_id_is_echoed_or_replaced(self, api_client, sample_courier):
+        """Test valid incoming IDs are kept and unsafe ones replaced."""
+        url = f"/api/courier/{sample_courier.id}"
+
+        echoed = api_client.get(url, headers={"X-Request-ID": "phone-abc.123"})
+        replaced = api_client.get(url, headers={"X-Request-ID": "bad id\r\n"})
+
+        assert echoed.headers["x-request-id"] == "phone-abc.123"
+        assert replaced.headers["x-request-id"] != "bad id"
+        assert len(replaced.headers["x-request-id"]) == 32
+
+    def test_non_api_paths_untouched(self, api_client):
+        """Test only /api/* responses get the headers."""
+        response = api_client.get("/metrics")
+
+        assert "server-timing" not in response.headers
+        assert "x-request-id" not in response.headers
+
+    def test_access_log_is_structured(self, caplog):
+        """Test sampled requests produce one JSON log line."""
+        client = TestClient(_small_app(sample_rate=1.0))
+
+        with caplog.at_level(logging.INFO, logger="app.access"):
+            response = client.get("/api/ok")
+
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record["request_id"] == response.headers["x-request-id"]
+        assert record["route"] == "/api/ok"
+        assert record["status"] == 200
+        assert "validation_ms" in record and "total_ms" in record
+
+    def test_access_log_sampling_keeps_errors(self, caplog):
+        """Test unsampled successes are skipped but 5xx are always logged."""
+        client = TestClient(_small_app(sample_rate=0.0))
+
+        with caplog.at_level(logging.INFO, logger="app.access"):
+            client.get("/api/ok")
+            client.get("/api/boom")
+
+        statuses = [json.loads(r.getMessage())["status"] for r in caplog.records if r.name == "app.access"]
+        assert statuses == [503]
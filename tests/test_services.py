@@ -1,11 +1,15 @@
 """Tests for service layer."""
+import asyncio
+import datetime
 import pytest
 import json
 from fastapi import HTTPException
 from sqlmodel import Session
 
-from app.services import FeedbackService, CourierService, AuthService
+from app.services import FeedbackService, CourierService, AuthService, DashboardService
 from app.database import Feedback, Courier, AdminUser, hash_password
+from app.password_verifier import AuthBusyError, AuthThrottledError, PasswordVerifier
+from app.records import FeedbackFilters
 
 
 @pytest.mark.unit
@@ -202,6 +206,74 @@ class TestCourierService:
             app.services.engine = original_engine
 
 
+@pytest.mark.unit
+class TestDashboardService:
+    """Tests for the filtered, paged dashboard reads."""
+
+    @pytest.fixture
+    def feedback_rows(self, db_engine, db_session, sample_courier, monkeypatch):
+        """25 entries, one per day from 2024-01-01, ratings cycling 1-5."""
+        import app.services
+        monkeypatch.setattr(app.services, "engine", db_engine)
+        start = datetime.datetime(2024, 1, 1, 12, 0)
+        for i in range(25):
+            db_session.add(Feedback(
+                order_id=f"DASH{i:03d}",
+                courier_id=sample_courier.id,
+                rating=i % 5 + 1,
+                created_at=start + datetime.timedelta(days=i),
+            ))
+        db_session.commit()
+
+    def test_pages_are_newest_first_without_overlap(self, feedback_rows):
+        """Test consecutive windows tile the result in order."""
+        filters = FeedbackFilters()
+        first = DashboardService.page(filters, 0, 10)
+        second = DashboardService.page(filters, 10, 10)
+
+        assert DashboardService.count(filters) == 25
+        assert [row.order_id for row in first[:2]] == ["DASH024", "DASH023"]
+        assert first[0].courier_name == "Test Courier"
+        assert not {row.id for row in first} & {row.id for row in second}
+        assert len(DashboardService.page(filters, 20, 10)) == 5
+
+    def test_filters_apply_in_sql(self, feedback_rows):
+        """Test date bounds are inclusive days and ratings filter."""
+        filters = FeedbackFilters(from_date="2024-01-03", to_date="2024-01-12", ratings=(5,))
+        rows = DashboardService.page(filters, 0, 50)
+
+        assert DashboardService.count(filters) == 2
+        assert [row.order_id for row in rows] == ["DASH009", "DASH004"]
+
+    def test_invalid_date_is_ignored(self, feedback_rows):
+        """Test an unparseable date leaves that bound open."""
+        assert DashboardService.count(FeedbackFilters(from_date="not-a-date")) == 25
+
+    def test_iter_rows_streams_all_matches(self, feedback_rows):
+        """Test the CSV export reads every filtered row."""
+        rows = list(DashboardService.iter_rows(FeedbackFilters(ratings=(1, 2)), batch_size=3))
+
+        assert len(rows) == 10
+        assert {row.rating for row in rows} == {1, 2}
+
+    def test_rows_since_tails_by_id(self, feedback_rows):
+        """Test new rows come oldest first, filtered, in batches after an id."""
+        high = DashboardService.high_water_id()
+        first = DashboardService.rows_since(FeedbackFilters(ratings=(5,)), high - 10, limit=1)
+        rest = DashboardService.rows_since(FeedbackFilters(ratings=(5,)), first[0].id)
+
+        assert [row.order_id for row in first + rest] == ["DASH019", "DASH024"]
+        assert DashboardService.rows_since(FeedbackFilters(), high) == []
+
+    def test_window_up_to_high_water(self, feedback_rows):
+        """Test load_window ignores rows newer than until_id."""
+        high = DashboardService.high_water_id()
+        total, rows = DashboardService.load_window(FeedbackFilters(), 0, 10, until_id=high - 5)
+
+        assert total == 20
+        assert rows[0].order_id == "DASH019"
+
+
 @pytest.mark.unit
 class TestAuthService:
     """Tests for AuthService."""
@@ -245,3 +317,100 @@ class TestAuthService:
             assert result is None
         finally:
             app.services.engine = original_engine
+
+    async def test_authenticate_async(self, db_engine, sample_admin, monkeypatch):
+        """Test async authentication verifies off the event loop."""
+        import app.services
+        monkeypatch.setattr(app.services, "engine", db_engine)
+
+        assert (await AuthService.authenticate_async("testadmin", "testpass123", "10.0.0.1")).username == "testadmin"
+        assert await AuthService.authenticate_async("testadmin", "wrongpassword", "10.0.0.1") is None
+        assert await AuthService.authenticate_async("nonexistent", "password") is None
+
+    async def test_login_rehashes_outdated_cost(self, db_engine, db_session, monkeypatch):
+        """Test a successful login upgrades the stored hash to BCRYPT_ROUNDS."""
+        import app.services
+        from app.database import config, hash_rounds
+        monkeypatch.setattr(app.services, "engine", db_engine)
+        monkeypatch.setattr(config, "BCRYPT_ROUNDS", 5)
+
+        db_session.add(AdminUser(username="oldcost", password_hash=hash_password("pw", rounds=4)))
+        db_session.commit()
+
+        assert await AuthService.authenticate_async("oldcost", "wrong") is None
+        assert hash_rounds(AuthService.find_admin("oldcost").password_hash) == 4
+
+        assert await AuthService.authenticate_async("oldcost", "pw") is not None
+        assert hash_rounds(AuthService.find_admin("oldcost").password_hash) == 5
+        assert AuthService.authenticate("oldcost", "pw") is not None
+
+
+@pytest.mark.unit
+@pytest.mark.security
+class TestPasswordVerifier:
+    """Tests for the bounded password verifier."""
+
+    @pytest.fixture
+    def gate(self, monkeypatch):
+        """Hold every verification until the event is set."""
+        import threading
+        import app.password_verifier
+
+        release = threading.Event()
+
+        def blocked_verify(password, password_hash):
+            release.wait(5)
+            return password == password_hash
+
+        monkeypatch.setattr(app.password_verifier, "verify_password", blocked_verify)
+        yield release
+        release.set()
+
+    async def _started(self, verifier, count):
+        while verifier.outstanding < count:
+            await asyncio.sleep(0.001)
+
+    async def test_per_username_limit(self, gate):
+        """Test a username cannot exceed its concurrent attempt limit."""
+        verifier = PasswordVerifier(workers=2, max_queue=8, per_key_limit=1)
+        first = asyncio.create_task(verifier.verify("pw", "pw", username="admin", client_ip="1.1.1.1"))
+        await self._started(verifier, 1)
+
+        with pytest.raises(AuthThrottledError):
+            await verifier.verify("pw", "pw", username="admin", client_ip="2.2.2.2")
+
+        gate.set()
+        assert await first is True
+        # Slot released after completion
+        assert await verifier.verify("pw", "pw", username="admin") is True
+
+    async def test_per_ip_limit(self, gate):
+        """Test one IP cannot run attempts for many usernames at once."""
+        verifier = PasswordVerifier(workers=2, max_queue=8, per_key_limit=2)
+        tasks = [
+            asyncio.create_task(verifier.verify("pw", "x", username=f"user{i}", client_ip="1.1.1.1"))
+            for i in range(2)
+        ]
+        await self._started(verifier, 2)
+
+        with pytest.raises(AuthThrottledError):
+            await verifier.verify("pw", "x", username="user9", client_ip="1.1.1.1")
+
+        gate.set()
+        assert await asyncio.gather(*tasks) == [False, False]
+
+    async def test_full_queue_rejects_fast(self, gate):
+        """Test attempts beyond workers + queue fail immediately."""
+        verifier = PasswordVerifier(workers=1, max_queue=1, per_key_limit=5)
+        tasks = [
+            asyncio.create_task(verifier.verify("pw", "pw", username=f"user{i}", client_ip=f"10.0.0.{i}"))
+            for i in range(2)
+        ]
+        await self._started(verifier, 2)
+
+        with pytest.raises(AuthBusyError):
+            await verifier.verify("pw", "pw", username="late", client_ip="10.0.0.9")
+
+        gate.set()
+        assert await asyncio.gather(*tasks) == [True, True]
+        assert verifier.outstanding == 0
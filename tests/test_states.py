@@ -1,6 +1,6 @@
 """Tests for state management - SIMPLIFIED."""
 import pytest
-from app.utils import QueueManager, validate_feedback_data
+from app.utils import FeedbackQueue, validate_feedback_data
 
 
 # FIXED: Reflex State is difficult to test in isolation
@@ -47,37 +47,33 @@ class TestQueueLogic:
 
     def test_add_to_queue(self):
         """Test adding items to queue."""
-        queue = []
+        queue = FeedbackQueue()
         item = {"order_id": "TEST1", "rating": 5}
 
-        queue = QueueManager.add_to_queue(queue, item)
+        queue.enqueue(item)
 
         assert len(queue) == 1
-        assert queue[0]["order_id"] == "TEST1"
+        assert queue.get("TEST1") == item
 
     def test_remove_from_queue(self):
         """Test removing items from queue."""
-        queue = [
+        queue = FeedbackQueue([
             {"order_id": "TEST1"},
             {"order_id": "TEST2"}
-        ]
+        ])
 
-        queue = QueueManager.remove_from_queue(queue, {"order_id": "TEST1"})
+        queue.remove("TEST1")
 
         assert len(queue) == 1
-        assert queue[0]["order_id"] == "TEST2"
+        assert queue.peek()["order_id"] == "TEST2"
 
     def test_queue_max_size(self):
         """Test queue respects max size."""
-        queue = []
         max_size = 3
+        queue = FeedbackQueue(max_size=max_size)
 
         for i in range(5):
-            queue = QueueManager.add_to_queue(
-                queue,
-                {"order_id": f"TEST{i}"},
-                max_size=max_size
-            )
+            queue.enqueue({"order_id": f"TEST{i}"})
 
         assert len(queue) == max_size
 
@@ -1,4 +1,5 @@
 """Tests for utility functions."""
+import json
 import pytest
 from datetime import datetime
 from app.utils import (
@@ -7,7 +8,8 @@ from app.utils import (
     deserialize_feedback,
     validate_feedback_data,
     format_datetime,
-    QueueManager
+    latest_by_order_id,
+    FeedbackQueue
 )
 
 
@@ -159,78 +161,106 @@ class TestFormatDatetime:
 
 
 @pytest.mark.unit
-class TestQueueManager:
-    """Tests for queue management."""
-
-    def test_add_to_empty_queue(self):
-        """Test adding to empty queue."""
-        queue = []
-        item = {"order_id": "TEST1"}
-        result = QueueManager.add_to_queue(queue, item)
-
-        assert len(result) == 1
-        assert result[0] == item
-
-    def test_add_multiple_items(self):
-        """Test adding multiple items."""
-        queue = []
-        items = [{"order_id": f"TEST{i}"} for i in range(5)]
-
-        for item in items:
-            queue = QueueManager.add_to_queue(queue, item)
-
-        assert len(queue) == 5
-
-    def test_queue_size_limit(self):
-        """Test queue respects size limit."""
-        queue = []
-        max_size = 3
-
-        for i in range(5):
-            item = {"order_id": f"TEST{i}"}
-            queue = QueueManager.add_to_queue(queue, item, max_size=max_size)
-
-        assert len(queue) == max_size
-        # Should keep most recent items (TEST2, TEST3, TEST4)
-        assert queue[0]["order_id"] == "TEST2"
-        assert queue[-1]["order_id"] == "TEST4"
-
-    def test_remove_from_queue(self):
-        """Test removing item from queue."""
-        queue = [
-            {"order_id": "TEST1"},
-            {"order_id": "TEST2"},
-            {"order_id": "TEST3"}
+class TestLatestByOrderId:
+    """Tests for batch deduplication by order_id."""
+
+    def test_keeps_latest_item_per_order_id(self):
+        """Test a repeated order_id keeps its last item, at its last position."""
+        items = [
+            {"order_id": "TEST1", "rating": 1},
+            {"order_id": "TEST2", "rating": 2},
+            {"order_id": "TEST1", "rating": 3},
         ]
-        item_to_remove = {"order_id": "TEST2"}
 
-        result = QueueManager.remove_from_queue(queue, item_to_remove)
+        assert latest_by_order_id(items) == [items[1], items[2]]
 
-        assert len(result) == 2
-        assert {"order_id": "TEST2"} not in result
+    def test_empty_input(self):
+        """Test deduplicating nothing returns an empty list."""
+        assert latest_by_order_id([]) == []
 
-    def test_remove_nonexistent_item(self):
-        """Test removing item that doesn't exist."""
-        queue = [{"order_id": "TEST1"}]
-        item = {"order_id": "TEST999"}
 
-        result = QueueManager.remove_from_queue(queue, item)
-
-        assert len(result) == 1
-        assert result == queue
-
-    def test_get_pending_count(self):
-        """Test getting pending count."""
-        queue = [{"order_id": f"TEST{i}"} for i in range(7)]
-        count = QueueManager.get_pending_count(queue)
-        assert count == 7
-
-    def test_get_pending_count_empty(self):
-        """Test pending count for empty queue."""
-        assert QueueManager.get_pending_count([]) == 0
-
-    def test_clear_queue(self):
-        """Test clearing queue."""
-        queue = [{"order_id": f"TEST{i}"} for i in range(5)]
-        result = QueueManager.clear_queue(queue)
-        assert len(result) == 0
+@pytest.mark.unit
+class TestFeedbackQueue:
+    """Tests for the order_id-keyed FeedbackQueue."""
+
+    def test_fifo_order(self):
+        """Test items dequeue in insertion order."""
+        queue = FeedbackQueue(max_size=10)
+        for i in range(3):
+            queue.enqueue({"order_id": f"TEST{i}"})
+
+        assert [queue.dequeue()["order_id"] for _ in range(3)] == ["TEST0", "TEST1", "TEST2"]
+        assert queue.dequeue() is None
+
+    def test_eviction_when_full(self):
+        """Test oldest item is evicted when max_size is reached."""
+        queue = FeedbackQueue(max_size=3)
+        evicted = [queue.enqueue({"order_id": f"TEST{i}"}) for i in range(5)]
+
+        assert len(queue) == 3
+        assert evicted[3]["order_id"] == "TEST0"
+        assert evicted[4]["order_id"] == "TEST1"
+        assert [item["order_id"] for item in queue] == ["TEST2", "TEST3", "TEST4"]
+
+    def test_remove_by_order_id(self):
+        """Test removing an item from the middle of the queue."""
+        queue = FeedbackQueue([{"order_id": f"TEST{i}"} for i in range(3)])
+
+        removed = queue.remove("TEST1")
+
+        assert removed == {"order_id": "TEST1"}
+        assert "TEST1" not in queue
+        assert [item["order_id"] for item in queue] == ["TEST0", "TEST2"]
+        assert queue.remove("TEST999") is None
+
+    def test_removed_items_do_not_count_toward_eviction(self):
+        """Test tombstones are not evicted in place of live items."""
+        queue = FeedbackQueue(max_size=2)
+        queue.enqueue({"order_id": "A"})
+        queue.enqueue({"order_id": "B"})
+        queue.remove("A")
+        queue.enqueue({"order_id": "C"})
+
+        assert [item["order_id"] for item in queue] == ["B", "C"]
+
+    def test_requeue_replaces_and_moves_to_tail(self):
+        """Test re-enqueueing an order_id keeps a single, newest copy."""
+        queue = FeedbackQueue(max_size=3)
+        queue.enqueue({"order_id": "A", "rating": 1})
+        queue.enqueue({"order_id": "B"})
+        evicted = queue.enqueue({"order_id": "A", "rating": 5})
+
+        assert evicted is None
+        assert len(queue) == 2
+        assert [item["order_id"] for item in queue] == ["B", "A"]
+        assert queue.get("A")["rating"] == 5
+
+    def test_state_roundtrip(self):
+        """Test compact serialization survives JSON and rebuild."""
+        queue = FeedbackQueue(max_size=5)
+        for i in range(4):
+            queue.enqueue({"order_id": f"TEST{i}", "rating": 5})
+        queue.remove("TEST2")
+
+        state = json.loads(json.dumps(queue.to_state()))
+        restored = FeedbackQueue.from_state(state, max_size=5)
+
+        assert state == [{"order_id": f"TEST{i}", "rating": 5} for i in (0, 1, 3)]
+        assert list(restored) == list(queue)
+
+    def test_pickle_and_deepcopy_drop_tombstones(self):
+        """Test pickled/copied queues hold only live items."""
+        import copy
+        import pickle
+
+        queue = FeedbackQueue(max_size=100)
+        for i in range(50):
+            queue.enqueue({"order_id": f"TEST{i}"})
+        for i in range(40):
+            queue.remove(f"TEST{i}")
+
+        for clone in (pickle.loads(pickle.dumps(queue)), copy.deepcopy(queue)):
+            assert len(clone) == 10
+            assert len(clone._order) == 10
+            assert clone.max_size == 100
+            assert clone.peek()["order_id"] == "TEST40"